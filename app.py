@@ -7,11 +7,26 @@ and the rich visual tradition of the Catholic Church.
 """
 
 import os
-import re
+import threading
 import streamlit as st
+import streamlit.components.v1 as components
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from padregpt import metrics, tracing
+from padregpt.backends import PADRE_BACKEND, create_backend
+from padregpt.citations import extract_citations
+from padregpt.runs import RunFailedError, RunTimeoutError
+from padregpt.sessions import (
+    SESSION_COOKIE,
+    SESSION_IDLE_SECONDS,
+    SessionStore,
+    is_session_id,
+    new_session_id,
+)
+from padregpt.thread_pool import get_thread_pool
+from padregpt.transport import openai_http_client
+
 # Load environment variables
 load_dotenv()
 
@@ -488,38 +503,78 @@ st.markdown("""
 
 @st.cache_resource
 def get_client():
-    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=openai_http_client())
 
 client = get_client()
 ASSISTANT_ID = os.getenv("ASSISTANT_ID") or os.getenv("OPENAI_ASSISTANT_ID")
 FILE_IDS = os.getenv("FILE_IDS", "").split(",") if os.getenv("FILE_IDS") else []
 
+@st.cache_resource
+def get_backend():
+    if PADRE_BACKEND == "assistants" and not ASSISTANT_ID:
+        return None  # The page shows setup instructions instead of a chat
+    # File attachments for each user message (Assistants backend only)
+    attachments = [
+        {"file_id": fid.strip(), "tools": [{"type": "file_search"}]}
+        for fid in FILE_IDS if fid and fid.strip()
+    ]
+    thread_pool = None
+    if PADRE_BACKEND == "assistants":
+        # Warms in the background; page load itself makes no OpenAI calls
+        thread_pool = get_thread_pool(client)
+    backend = create_backend(
+        ASSISTANT_ID,
+        client=client,
+        thread_pool=thread_pool,
+        attachments=attachments,
+    )
+    # Chat backend: load the retrieval index in the background, not on the first question
+    threading.Thread(target=backend.warm, name="retriever-warm", daemon=True).start()
+    return backend
+
+backend = get_backend()
+
+@st.cache_resource
+def start_metrics_server():
+    # One local /metrics endpoint per server process (0 disables)
+    return metrics.start_http_server(int(os.getenv("WEB_METRICS_PORT", "9465")))
+
+start_metrics_server()
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore()
+
+def set_session_cookie(session_id):
+    # Streamlit can't set response headers, so the cookie is written from the
+    # page; it is renewed on every save so it lapses with the stored session
+    components.html(
+        f"<script>window.parent.document.cookie = '{SESSION_COOKIE}={session_id}; "
+        f"path=/; max-age={int(SESSION_IDLE_SECONDS)}; SameSite=Lax' + "
+        f"(window.parent.location.protocol === 'https:' ? '; Secure' : '');</script>",
+        height=0,
+    )
+
+def get_session():
+    # Only the session ID lives in this process; the chat itself is in the store
+    if "session_id" not in st.session_state:
+        session_id = st.context.cookies.get(SESSION_COOKIE)
+        if not is_session_id(session_id):
+            session_id = new_session_id()
+            set_session_cookie(session_id)
+        st.session_state.session_id = session_id
+    return get_session_store().load(st.session_state.session_id)
+
+def save_session(session):
+    get_session_store().save(session)
+    set_session_cookie(session.id)
+
+session = get_session()
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def extract_citations(text):
-    """
-    Extract citation references from the response and format them.
-    OpenAI Assistants API uses 【number†source】 format for citations.
-    """
-    # Pattern to match citation markers like 【4:0†source】
-    citation_pattern = r'【(\d+):?\d*†([^】]+)】'
-    
-    citations = []
-    matches = re.findall(citation_pattern, text)
-    
-    for idx, source in matches:
-        citations.append({
-            'index': idx,
-            'source': source.strip()
-        })
-    
-    # Clean the text by removing or simplifying citation markers
-    clean_text = re.sub(citation_pattern, lambda m: f' [{m.group(1)}]', text)
-    
-    return clean_text, citations
-
 def format_response_with_citations(response_text):
     """Format the response and display any citations in an expandable section."""
     clean_text, citations = extract_citations(response_text)
@@ -573,8 +628,8 @@ st.markdown("""
 <div class="divider"><span class="divider-icon">✝</span></div>
 """, unsafe_allow_html=True)
 
-# Check for assistant ID
-if not ASSISTANT_ID:
+# Check for assistant ID (get_backend() built nothing without one)
+if backend is None:
     st.error("⚠️ Assistant not configured. Please set ASSISTANT_ID or OPENAI_ASSISTANT_ID in environment variables.")
     st.info("Run `python scripts/create_assistant.py` to create the assistant, then update your .env file.")
     st.stop()
@@ -657,19 +712,13 @@ with tab_about:
     """)
 
 with tab_chat:
-    # Initialize session state
-    if "thread_id" not in st.session_state:
-        thread = client.beta.threads.create()
-        st.session_state.thread_id = thread.id
-    
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-    
+    # Conversation and messages come from the session store (any thread is
+    # created lazily on first question)
     if "selected_suggestion" not in st.session_state:
         st.session_state.selected_suggestion = None
     
     # Welcome message for new conversations
-    if len(st.session_state.messages) == 0:
+    if len(session.messages) == 0:
         st.markdown("""
         <div class="welcome-box">
             <h4 class="welcome-title">🕊️ Welcome, Seeker of Truth</h4>
@@ -697,13 +746,26 @@ with tab_chat:
                     st.rerun()
     
     # Display chat messages
-    for message in st.session_state.messages:
-        avatar = "🙏" if message["role"] == "assistant" else "👤"
-        with st.chat_message(message["role"], avatar=avatar):
-            if message["role"] == "assistant":
-                format_response_with_citations(message["content"])
+    # Older messages are paged out of memory; read them back only on request
+    # (a button is only True for one rerun, so the choice lives in session_state)
+    older = []
+    if session.messages.paged_out:
+        if st.session_state.get("show_older"):
+            older = get_session_store().older_messages(session)
+            if st.button("Hide earlier messages", key="hide_older_button"):
+                st.session_state.show_older = False
+                st.rerun()
+        elif st.button(f"Show {session.messages.paged_out} earlier messages", key="show_older_button"):
+            st.session_state.show_older = True
+            st.rerun()
+
+    for message in [*older, *session.messages]:
+        avatar = "🙏" if message.role == "assistant" else "👤"
+        with st.chat_message(message.role, avatar=avatar):
+            if message.role == "assistant":
+                format_response_with_citations(message.content)
             else:
-                st.markdown(message["content"])
+                st.markdown(message.content)
     
     # Handle suggestion click
     if st.session_state.selected_suggestion:
@@ -715,7 +777,8 @@ with tab_chat:
     # Chat input handling
     if prompt:
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        session.messages.append("user", prompt)
+        save_session(session)
         with st.chat_message("user", avatar="👤"):
             st.markdown(prompt)
         
@@ -724,47 +787,20 @@ with tab_chat:
             loading_msg = random.choice(LOADING_MESSAGES)
             with st.spinner(loading_msg):
                 try:
-                    # Add message to thread with file attachments
-                    attachments = [
-                        {"file_id": fid.strip(), "tools": [{"type": "file_search"}]} 
-                        for fid in FILE_IDS if fid and fid.strip()
-                    ]
-                    
-                    client.beta.threads.messages.create(
-                        thread_id=st.session_state.thread_id,
-                        role="user",
-                        content=prompt,
-                        attachments=attachments if attachments else None
-                    )
-                    
-                    # Run the assistant
-                    run = client.beta.threads.runs.create_and_poll(
-                        thread_id=st.session_state.thread_id,
-                        assistant_id=ASSISTANT_ID
-                    )
+                    with tracing.span("web.chat", backend=backend.name):
+                        reply = backend.ask(session.conversation, prompt)
+                    response = reply.text
                     
-                    # Get the response
-                    if run.status == "completed":
-                        messages = client.beta.threads.messages.list(
-                            thread_id=st.session_state.thread_id
-                        )
-                        # Get the latest assistant message
-                        response = ""
-                        for msg in messages.data:
-                            if msg.role == "assistant":
-                                for content in msg.content:
-                                    if hasattr(content, 'text'):
-                                        response = content.text.value
-                                        break
-                                break
-                        
-                        format_response_with_citations(response)
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                    else:
-                        st.error(f"I apologize, but I encountered an issue: {run.status}")
-                        if hasattr(run, 'last_error') and run.last_error:
-                            st.caption(f"Details: {run.last_error.message}")
-                            
+                    format_response_with_citations(response)
+                    session.messages.append("assistant", response)
+                    save_session(session)
+                
+                except RunFailedError as e:
+                    st.error(f"I apologize, but I encountered an issue: {e.run.status}")
+                    if getattr(e.run, 'last_error', None):
+                        st.caption(f"Details: {e.run.last_error.message}")
+                except RunTimeoutError:
+                    st.error("I apologize, but this answer is taking too long. Please try again.")
                 except Exception as e:
                     st.error("I apologize, but something went wrong. Please try again.")
                     st.caption(f"Error: {str(e)}")
@@ -784,9 +820,8 @@ with st.sidebar:
     st.markdown("---")
     
     if st.button("🔄 New Conversation", use_container_width=True):
-        thread = client.beta.threads.create()
-        st.session_state.thread_id = thread.id
-        st.session_state.messages = []
+        get_session_store().reset(session)
+        st.session_state.show_older = False
         st.rerun()
     
     st.markdown("---")
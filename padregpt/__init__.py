@@ -0,0 +1,13 @@
+"""
+Shared runtime for the PadreGPT front-ends.
+
+Both the Streamlit app (`app.py`) and the Telegram bot
+(`scripts/telegram_chatgpt_bot.py`) import from here so that thread
+management, metrics, and other plumbing live in one place.
+"""
+
+from dotenv import load_dotenv
+
+# Modules read their settings from the environment at import time, so make
+# sure `.env` is applied before any of them load.
+load_dotenv()
@@ -0,0 +1,136 @@
+"""
+Admission control in front of the answer backend.
+
+When OpenAI slows down, accepting every question just means every user
+waits until their run times out. The `AdmissionController` caps runs in
+flight; past the cap, questions queue in arrival order (the caller is told
+its position and a wait estimate from recent latencies) and once the
+queue is full, or the estimated wait is too long, they are shed with
+`Overloaded` so the caller can answer from the fallback instead.
+"""
+
+import asyncio
+import math
+import os
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+from padregpt import metrics
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "60"))
+# Recent answer latencies kept for wait estimates
+ADMISSION_LATENCY_WINDOW = 50
+
+IN_FLIGHT = metrics.gauge(
+    "padregpt_admission_in_flight",
+    "Questions currently being answered by the backend.",
+)
+QUEUED = metrics.gauge(
+    "padregpt_admission_queued",
+    "Questions waiting for a backend slot.",
+)
+WAIT_SECONDS = metrics.histogram(
+    "padregpt_admission_wait_seconds",
+    "Time questions spent queued before reaching the backend.",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+SHED = metrics.counter(
+    "padregpt_admission_shed_total",
+    "Questions turned away because the backend was saturated, by reason.",
+)
+
+# Called with (queue position, estimated wait in seconds) when a question is queued
+OnQueued = Callable[[int, float], None]
+
+
+class Overloaded(Exception):
+    """The backend is saturated and the question was not admitted."""
+
+    def __init__(self, reason: str, position: int = 0) -> None:
+        super().__init__(f"Backend saturated ({reason})")
+        self.reason = reason
+        self.position = position
+
+
+class AdmissionController:
+    """FIFO gate with a cap on concurrent backend calls."""
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._latencies: deque[float] = deque(maxlen=ADMISSION_LATENCY_WINDOW)
+
+    def typical_latency(self) -> float:
+        """Median of recent answer times (0 until there are any)."""
+        return statistics.median(self._latencies) if self._latencies else 0.0
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until the question at `position` in the queue gets a slot."""
+        return math.ceil(position / self.max_in_flight) * self.typical_latency()
+
+    @asynccontextmanager
+    async def admit(self, on_queued: Optional[OnQueued] = None) -> AsyncIterator[None]:
+        """Hold a backend slot for the body; raises `Overloaded` if shed."""
+        await self._acquire(on_queued)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._latencies.append(time.monotonic() - start)
+            self._release()
+
+    async def _acquire(self, on_queued: Optional[OnQueued]) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            IN_FLIGHT.set(self.in_flight)
+            return
+
+        position = len(self._waiters) + 1
+        if position > self.max_queue:
+            SHED.inc(reason="queue_full")
+            raise Overloaded("queue full", position)
+        eta = self.estimated_wait(position)
+        if eta > self.max_wait:
+            SHED.inc(reason="wait_too_long")
+            raise Overloaded(f"~{eta:.0f}s wait", position)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        QUEUED.set(len(self._waiters))
+        if on_queued:
+            on_queued(position, eta)
+        start = time.monotonic()
+        try:
+            # A finishing call hands its slot straight to the oldest waiter
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # Got the slot just as we gave up: pass it on
+            else:
+                self._waiters.remove(waiter)
+                QUEUED.set(len(self._waiters))
+            raise
+        WAIT_SECONDS.observe(time.monotonic() - start)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            QUEUED.set(len(self._waiters))
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        IN_FLIGHT.set(self.in_flight)
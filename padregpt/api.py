@@ -0,0 +1,298 @@
+"""
+Async JSON API over the same answer engine as the bot and web app.
+
+    uvicorn padregpt.api:app --host 0.0.0.0 --port 8000
+
+Endpoints (JSON bodies; send `Authorization: Bearer $PADRE_API_KEY`). The
+API refuses to start without a key, since every answer is paid for; set
+PADRE_API_ALLOW_ANONYMOUS=1 to run it open, e.g. bound to 127.0.0.1 only.
+Everything but /healthz needs the key, /metrics included:
+
+    POST   /v1/conversations                     -> {"conversation_id"}
+    DELETE /v1/conversations/{id}                clear its history
+    POST   /v1/ask          {"question", "conversation_id"?}
+    POST   /v1/ask/stream   same body; Server-Sent Events "delta" then "done"
+    GET    /v1/conversations/{id}/citations      sources cited in each answer
+    GET    /healthz, /metrics
+
+Conversations live in the same `SessionStore` as web chats, so any number
+of API workers (sharing SESSION_DB_PATH) can serve them. A turn holds the
+conversation's lease in the store while it runs, so a second question to
+the same conversation waits for the first, whichever worker has it, and
+gets 409 if it waits longer than API_TURN_WAIT_SECONDS. A conversation
+idle for SESSION_IDLE_SECONDS is deleted; its ID then gets 404, like one
+that was never created.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+import weakref
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
+
+from padregpt import metrics, tracing
+from padregpt.admission import AdmissionController, Overloaded
+from padregpt.backends import PADRE_BACKEND, create_backend
+from padregpt.citations import extract_citations
+from padregpt.runs import RunFailedError, RunTimeoutError
+from padregpt.sessions import Session, SessionStore, is_session_id, new_session_id
+from padregpt.thread_pool import get_thread_pool
+from padregpt.transport import openai_async_http_client
+
+logger = logging.getLogger(__name__)
+
+ASSISTANT_ID = os.getenv("ASSISTANT_ID") or os.getenv("OPENAI_ASSISTANT_ID")
+PADRE_API_KEY = os.getenv("PADRE_API_KEY", "").strip()
+PADRE_API_ALLOW_ANONYMOUS = os.getenv("PADRE_API_ALLOW_ANONYMOUS", "").strip().lower() in ("1", "true", "yes")
+# Seconds a shed request is told to wait before retrying
+API_RETRY_AFTER_SECONDS = 30
+# How long a question waits for an earlier one in the same conversation
+API_TURN_WAIT_SECONDS = float(os.getenv("API_TURN_WAIT_SECONDS", "120"))
+# How often a waiting question checks the conversation's lease
+TURN_POLL_SECONDS = 0.25
+
+REQUESTS = metrics.counter(
+    "padregpt_api_requests_total",
+    "API answers, by endpoint and outcome.",
+)
+
+
+class Question(BaseModel):
+    question: str = Field(min_length=1, max_length=8000)
+    conversation_id: Optional[str] = None
+
+
+class _State:
+    backend: Any = None
+    store: Optional[SessionStore] = None
+    admission: Optional[AdmissionController] = None
+    # Queues this worker's turns per conversation before they poll the store's lease
+    locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+state = _State()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if PADRE_BACKEND == "assistants" and not ASSISTANT_ID:
+        raise RuntimeError("Missing OPENAI_ASSISTANT_ID (required for the assistants backend)")
+    if not PADRE_API_KEY and not PADRE_API_ALLOW_ANONYMOUS:
+        raise RuntimeError(
+            "Missing PADRE_API_KEY: anyone reaching the port could spend the OpenAI budget "
+            "(set PADRE_API_ALLOW_ANONYMOUS=1 to run without one)"
+        )
+    api_key = os.getenv("OPENAI_API_KEY")
+    async_client = AsyncOpenAI(api_key=api_key, http_client=openai_async_http_client("openai_api"))
+    thread_pool = None
+    if PADRE_BACKEND == "assistants":
+        thread_pool = get_thread_pool()
+    state.backend = create_backend(ASSISTANT_ID, async_client=async_client, thread_pool=thread_pool)
+    # The chat backend's index loads before the first question, off the event loop
+    await asyncio.to_thread(state.backend.warm)
+    state.store = SessionStore()
+    state.admission = AdmissionController()
+    yield
+    await async_client.close()
+
+
+app = FastAPI(title="PadreGPT API", lifespan=lifespan)
+
+
+def require_api_key(request: Request) -> None:
+    if not PADRE_API_KEY and PADRE_API_ALLOW_ANONYMOUS:
+        return
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(supplied, PADRE_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid or missing API key")
+
+
+async def _load(conversation_id: Optional[str]) -> Session:
+    """A new conversation if `conversation_id` is None, else the stored one (404 if none)."""
+    if conversation_id is None:
+        return await asyncio.to_thread(state.store.load, new_session_id())
+    session = None
+    if is_session_id(conversation_id):
+        session = await asyncio.to_thread(state.store.get, conversation_id)
+    if session is None:  # Never created, or deleted after SESSION_IDLE_SECONDS idle
+        raise HTTPException(status_code=404, detail="Unknown conversation")
+    return session
+
+
+def _lock(conversation_id: str) -> asyncio.Lock:
+    lock = state.locks.get(conversation_id)
+    if lock is None:
+        lock = state.locks[conversation_id] = asyncio.Lock()
+    return lock
+
+
+class ConversationBusy(Exception):
+    """Another question in the conversation is still being answered."""
+
+
+@asynccontextmanager
+async def _turn(conversation_id: str) -> AsyncIterator[Session]:
+    """Hold the conversation for one turn and yield its latest copy.
+
+    A thread can't run twice at once, and the reply must be saved on top of
+    every earlier turn, so the store's lease is held from load to save.
+    """
+    lock = _lock(conversation_id)
+    deadline = time.monotonic() + API_TURN_WAIT_SECONDS
+    try:
+        async with asyncio.timeout(API_TURN_WAIT_SECONDS):
+            await lock.acquire()
+    except TimeoutError:
+        raise ConversationBusy() from None
+    try:
+        owner = secrets.token_hex(8)
+        while not await asyncio.to_thread(state.store.acquire, conversation_id, owner):
+            if time.monotonic() >= deadline:
+                raise ConversationBusy()
+            await asyncio.sleep(TURN_POLL_SECONDS)
+        try:
+            # Another worker may have answered in this conversation meanwhile
+            yield await asyncio.to_thread(state.store.load, conversation_id)
+        finally:
+            await asyncio.to_thread(state.store.release, conversation_id, owner)
+    finally:
+        lock.release()
+
+
+def _answer(session: Session, text: str) -> dict[str, Any]:
+    clean_text, citations = extract_citations(text)
+    return {"conversation_id": session.id, "answer": clean_text, "citations": citations}
+
+
+async def _record(session: Session, question: str, text: str) -> None:
+    session.messages.append("user", question)
+    session.messages.append("assistant", text)
+    await asyncio.to_thread(state.store.save, session)
+
+
+def _error(e: Exception) -> HTTPException:
+    if isinstance(e, ConversationBusy):
+        return HTTPException(status_code=409, detail="Still answering the previous question")
+    if isinstance(e, Overloaded):
+        return HTTPException(
+            status_code=503,
+            detail="Too many questions right now; try again shortly",
+            headers={"Retry-After": str(API_RETRY_AFTER_SECONDS)},
+        )
+    if isinstance(e, RunTimeoutError):
+        return HTTPException(status_code=504, detail="The answer took too long")
+    if isinstance(e, RunFailedError):
+        return HTTPException(status_code=502, detail=f"Assistant run {e.run.status}")
+    logger.exception("Unexpected API error")
+    return HTTPException(status_code=500, detail="Something went wrong")
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+
+@app.get("/healthz")
+async def healthz() -> dict[str, str]:
+    return {"status": "ok", "backend": state.backend.name}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_api_key)])
+async def prometheus_metrics() -> str:
+    return metrics.render()
+
+
+@app.post("/v1/conversations", status_code=201, dependencies=[Depends(require_api_key)])
+async def new_conversation() -> dict[str, str]:
+    session = await _load(None)
+    await asyncio.to_thread(state.store.save, session)
+    return {"conversation_id": session.id}
+
+
+@app.delete("/v1/conversations/{conversation_id}", dependencies=[Depends(require_api_key)])
+async def reset_conversation(conversation_id: str) -> dict[str, str]:
+    session = await _load(conversation_id)
+    try:
+        async with _turn(session.id) as session:
+            await asyncio.to_thread(state.store.reset, session)
+    except ConversationBusy as e:
+        raise _error(e) from e
+    return {"conversation_id": session.id}
+
+
+@app.get("/v1/conversations/{conversation_id}/citations", dependencies=[Depends(require_api_key)])
+async def conversation_citations(conversation_id: str) -> dict[str, Any]:
+    session = await _load(conversation_id)
+    answers = []
+    for index, message in enumerate(session.messages, start=session.messages.paged_out):
+        if message.role == "assistant":
+            _, citations = extract_citations(message.content)
+            answers.append({"message_index": index, "citations": citations})
+    return {"conversation_id": session.id, "answers": answers}
+
+
+@app.post("/v1/ask", dependencies=[Depends(require_api_key)])
+async def ask(body: Question) -> dict[str, Any]:
+    session = await _load(body.conversation_id)
+    try:
+        async with _turn(session.id) as session:
+            async with state.admission.admit():
+                with tracing.span("api.ask", backend=state.backend.name):
+                    reply = await state.backend.aask(session.conversation, body.question)
+            await _record(session, body.question, reply.text)
+    except Exception as e:
+        REQUESTS.inc(endpoint="ask", outcome=type(e).__name__)
+        raise _error(e) from e
+    REQUESTS.inc(endpoint="ask", outcome="ok")
+    return _answer(session, reply.text)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/v1/ask/stream", dependencies=[Depends(require_api_key)])
+async def ask_stream(body: Question) -> StreamingResponse:
+    conversation_id = (await _load(body.conversation_id)).id
+
+    async def events() -> AsyncIterator[str]:
+        parts: list[str] = []
+        try:
+            async with _turn(conversation_id) as session:
+                async with state.admission.admit():
+                    # aclosing: a client that disconnects closes the backend stream
+                    # right away, which cancels its run
+                    with tracing.span("api.stream", backend=state.backend.name):
+                        async with aclosing(state.backend.astream(session.conversation, body.question)) as stream:
+                            async for text in stream:
+                                parts.append(text)
+                                yield _sse("delta", {"text": text})
+                text = "".join(parts)
+                await _record(session, body.question, text)
+        except Exception as e:
+            REQUESTS.inc(endpoint="stream", outcome=type(e).__name__)
+            error = _error(e)
+            yield _sse("error", {"status": error.status_code, "error": error.detail})
+            return
+        REQUESTS.inc(endpoint="stream", outcome="ok")
+        yield _sse("done", _answer(session, text))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.exception_handler(HTTPException)
+async def http_error(request: Request, exc: HTTPException) -> JSONResponse:
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code, headers=exc.headers)
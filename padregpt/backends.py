@@ -0,0 +1,445 @@
+"""
+Answer engines behind both front-ends.
+
+`AssistantsBackend` is the original hosted path (thread + message + run +
+polls + message fetch, 4+ round trips per turn). `ChatBackend` retrieves
+passages locally and makes a single streaming Chat Completions call, with
+the conversation kept in-process. `PADRE_BACKEND` selects one.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Optional
+
+from openai import AsyncOpenAI, OpenAI
+
+from padregpt import metrics, tracing
+from padregpt.assistant_config import ASSISTANT_INSTRUCTIONS, ASSISTANT_MODEL
+from padregpt.compaction import (
+    Compacted,
+    acatch_up,
+    acompact_thread,
+    catch_up,
+    compact_in_background,
+    needs_compaction,
+    record_turn,
+    run_options,
+)
+from padregpt.messages import afetch_run_reply, fetch_run_reply
+from padregpt.retrieval import Passage, Retriever, get_retriever
+from padregpt.runs import (
+    ANSWERED_STATUSES,
+    RUN_TIMEOUT_SECONDS,
+    TERMINAL_STATUSES,
+    RunFailedError,
+    RunTimeoutError,
+    aexecute_run,
+    execute_run,
+)
+from padregpt.singleflight import coalescing
+from padregpt.thread_pool import ThreadPool
+
+logger = logging.getLogger(__name__)
+
+# "assistants" (default) or "chat"
+PADRE_BACKEND = os.getenv("PADRE_BACKEND", "assistants").strip().lower()
+CHAT_MODEL = os.getenv("CHAT_MODEL", ASSISTANT_MODEL)
+# Past messages (user + assistant) replayed to the chat model each turn
+CHAT_HISTORY_MESSAGES = int(os.getenv("CHAT_HISTORY_MESSAGES", "8"))
+
+CHAT_CONTEXT_INSTRUCTIONS = """
+
+## SOURCES FOR THIS ANSWER
+
+You do not have a file_search tool here. Instead, the user's message is
+preceded by numbered excerpts retrieved from your library. Quote from them
+and mark each quote with its excerpt number and source file exactly like
+【3†Source File.pdf】. If the excerpts don't cover the question, say so.
+"""
+
+
+@dataclass
+class Conversation:
+    """Per-user conversation state, whichever backend answers it."""
+
+    thread_id: Optional[str] = None  # Assistants backend
+    history: list[dict[str, str]] = field(default_factory=list)  # Chat backend
+    turns: int = 0  # Questions asked since the conversation started
+    # Shared answers not yet posted to the thread (Assistants backend)
+    unposted: list[dict[str, str]] = field(default_factory=list)
+    compaction: Any = None  # Pending Future/Task resolving to a `Compacted` (or None)
+
+
+@dataclass
+class Reply:
+    text: str
+    usage: Any = None
+    run: Any = None
+
+
+@dataclass
+class _UsageCarrier:
+    """Adapts chat usage to the run-shaped object `record_turn()` expects."""
+
+    usage: Any
+
+
+class AssistantsBackend:
+    """Hosted Assistants API: threads, runs, and file_search."""
+
+    name = "assistants"
+
+    def __init__(
+        self,
+        assistant_id: str,
+        client: Optional[OpenAI] = None,
+        async_client: Optional[AsyncOpenAI] = None,
+        thread_pool: Optional[ThreadPool] = None,
+        attachments: Optional[list[dict[str, Any]]] = None,
+    ) -> None:
+        self.assistant_id = assistant_id
+        self.client = client
+        self.async_client = async_client
+        self.thread_pool = thread_pool or ThreadPool(client or OpenAI())
+        self.attachments = attachments or None
+
+    def warm(self) -> None:
+        """Nothing to load up front (the thread pool fills itself)."""
+
+    @staticmethod
+    def _ready_compaction(conversation: Conversation) -> Optional[Compacted]:
+        """The finished compaction of the conversation's current thread, if any."""
+        pending = conversation.compaction
+        if pending is None or not pending.done():
+            return None
+        conversation.compaction = None
+        try:
+            compacted = pending.result()
+        except Exception as e:
+            logger.warning(f"Compaction failed: {e}")
+            return None
+        if compacted is None or compacted.source_thread_id != conversation.thread_id:
+            return None  # Not worth it, or the conversation was reset meanwhile
+        return compacted
+
+    def _apply_compaction(self, conversation: Conversation) -> None:
+        """Move onto the compacted thread once its summary is ready."""
+        compacted = self._ready_compaction(conversation)
+        if compacted is None:
+            return
+        try:
+            # Turns answered while the summary was being written
+            catch_up(self.client, compacted)
+        except Exception as e:
+            logger.warning(f"Compaction catch-up failed; staying on {compacted.source_thread_id}: {e}")
+            return
+        conversation.thread_id = compacted.thread_id
+
+    async def _aapply_compaction(self, conversation: Conversation) -> None:
+        """Async variant of `_apply_compaction()`."""
+        compacted = self._ready_compaction(conversation)
+        if compacted is None:
+            return
+        try:
+            await acatch_up(self.async_client, compacted)
+        except Exception as e:
+            logger.warning(f"Compaction catch-up failed; staying on {compacted.source_thread_id}: {e}")
+            return
+        conversation.thread_id = compacted.thread_id
+
+    def _finish(self, conversation: Conversation, run: Any, start: float) -> None:
+        conversation.turns += 1
+        record_turn(conversation.turns, time.monotonic() - start, run)
+
+    def adopt(self, conversation: Conversation, prompt: str, reply: Reply) -> None:
+        """Take on a turn answered elsewhere; it reaches the thread with the next question."""
+        conversation.unposted.append({"role": "user", "content": prompt})
+        conversation.unposted.append({"role": "assistant", "content": reply.text})
+        conversation.turns += 1
+
+    @tracing.traced("assistants.ask")
+    def ask(self, conversation: Conversation, prompt: str) -> Reply:
+        start = time.monotonic()
+        self._apply_compaction(conversation)
+        if conversation.thread_id is None:
+            with metrics.stage("thread_acquire"):
+                conversation.thread_id = self.thread_pool.acquire()
+        thread_id = conversation.thread_id
+
+        with metrics.stage("message_create"):
+            for message in conversation.unposted:
+                self.client.beta.threads.messages.create(thread_id=thread_id, **message)
+            conversation.unposted.clear()
+            self.client.beta.threads.messages.create(
+                thread_id=thread_id, role="user", content=prompt, attachments=self.attachments
+            )
+        with tracing.span("assistants.run", thread_id=thread_id) as span:
+            run = execute_run(self.client, thread_id, self.assistant_id, **run_options())
+            span.set_attribute("status", run.status)
+        metrics.record_usage(self.name, run.usage)
+        if tracing.ENABLED:
+            # Run-step spans show file_search vs generation time (off the request path)
+            threading.Thread(
+                target=tracing.trace_run_steps,
+                args=(self.client, thread_id, run, tracing.current_span()),
+                daemon=True,
+            ).start()
+        if run.status not in ANSWERED_STATUSES:
+            raise RunFailedError(run)
+        with metrics.stage("message_fetch"):
+            text = fetch_run_reply(self.client, thread_id, run.id)
+
+        self._finish(conversation, run, start)
+        if needs_compaction(run) and conversation.compaction is None:
+            conversation.compaction = compact_in_background(self.client, thread_id)
+        return Reply(text, run.usage, run)
+
+    async def _apost(self, conversation: Conversation, prompt: str) -> str:
+        """Make sure the conversation has a thread and add the question to it."""
+        await self._aapply_compaction(conversation)
+        if conversation.thread_id is None:
+            with metrics.stage("thread_acquire"):
+                conversation.thread_id = await self.thread_pool.aacquire()
+        thread_id = conversation.thread_id
+
+        with metrics.stage("message_create"):
+            for message in conversation.unposted:
+                await self.async_client.beta.threads.messages.create(thread_id=thread_id, **message)
+            conversation.unposted.clear()
+            await self.async_client.beta.threads.messages.create(
+                thread_id=thread_id, role="user", content=prompt, attachments=self.attachments
+            )
+        return thread_id
+
+    def _aschedule_compaction(self, conversation: Conversation, thread_id: str, run: Any) -> None:
+        if needs_compaction(run) and conversation.compaction is None:
+            conversation.compaction = asyncio.ensure_future(
+                acompact_thread(self.async_client, thread_id)
+            )
+
+    @tracing.traced("assistants.ask")
+    async def aask(self, conversation: Conversation, prompt: str) -> Reply:
+        start = time.monotonic()
+        thread_id = await self._apost(conversation, prompt)
+        with tracing.span("assistants.run", thread_id=thread_id) as span:
+            run = await aexecute_run(self.async_client, thread_id, self.assistant_id, **run_options())
+            span.set_attribute("status", run.status)
+        metrics.record_usage(self.name, run.usage)
+        if tracing.ENABLED:
+            # Run-step spans show file_search vs generation time (off the request path)
+            asyncio.ensure_future(
+                tracing.atrace_run_steps(self.async_client, thread_id, run, tracing.current_span())
+            )
+        if run.status not in ANSWERED_STATUSES:
+            raise RunFailedError(run)
+        with metrics.stage("message_fetch"):
+            text = await afetch_run_reply(self.async_client, thread_id, run.id)
+
+        self._finish(conversation, run, start)
+        self._aschedule_compaction(conversation, thread_id, run)
+        return Reply(text, run.usage, run)
+
+    async def _acancel(self, thread_id: str, run_id: str) -> None:
+        try:
+            await self.async_client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+        except Exception as e:  # Already finished, or the API is unreachable
+            logger.warning(f"Could not cancel run {run_id}: {e}")
+
+    @tracing.traced("assistants.stream")
+    async def astream(self, conversation: Conversation, prompt: str) -> AsyncIterator[str]:
+        """Like `aask`, but yields the answer text as the run generates it."""
+        start = time.monotonic()
+        thread_id = await self._apost(conversation, prompt)
+        deadline = start + RUN_TIMEOUT_SECONDS
+        run_id = run = None
+        with tracing.span("assistants.run", thread_id=thread_id) as span:
+            stream = await self.async_client.beta.threads.runs.create(
+                thread_id=thread_id, assistant_id=self.assistant_id, stream=True, **run_options()
+            )
+            events = stream.__aiter__()
+            try:
+                while True:
+                    # Bounded per wait, so a stream that stalls still hits the deadline
+                    try:
+                        async with asyncio.timeout(max(deadline - time.monotonic(), 0)):
+                            event = await anext(events)
+                    except (StopAsyncIteration, TimeoutError):
+                        break
+                    kind = event.event
+                    if kind == "thread.run.created":
+                        run_id = event.data.id
+                    elif kind == "thread.message.delta":
+                        for part in event.data.delta.content or []:
+                            if part.type == "text" and part.text and part.text.value:
+                                yield part.text.value
+                    elif kind.startswith("thread.run.") and event.data.status in TERMINAL_STATUSES:
+                        run = event.data
+                    elif kind == "thread.run.requires_action":
+                        # No function tools are registered; give up rather than stall
+                        run = event.data
+                        break
+            except BaseException:
+                # The consumer went away (generator closed, task cancelled) or the
+                # stream broke: cancel the run, or the thread refuses every later
+                # message while it is active. In the background, since awaiting
+                # in a cancelled task would be cancelled too.
+                if run_id and run is None:
+                    asyncio.ensure_future(self._acancel(thread_id, run_id))
+                raise
+            if run is None or run.status == "requires_action":
+                if run_id:
+                    await self.async_client.beta.threads.runs.cancel(
+                        thread_id=thread_id, run_id=run_id
+                    )
+                if run is None:
+                    raise RunTimeoutError(f"Run {run_id} did not finish in time")
+            span.set_attribute("status", run.status)
+        if run.status not in ANSWERED_STATUSES:
+            raise RunFailedError(run)
+        metrics.record_usage(self.name, run.usage)
+        self._finish(conversation, run, start)
+        self._aschedule_compaction(conversation, thread_id, run)
+
+
+class ChatBackend:
+    """Local retrieval + one streaming Chat Completions call per turn."""
+
+    name = "chat"
+
+    def __init__(
+        self,
+        client: Optional[OpenAI] = None,
+        async_client: Optional[AsyncOpenAI] = None,
+        retriever: Optional[Retriever] = None,
+        model: str = CHAT_MODEL,
+    ) -> None:
+        self.client = client
+        self.async_client = async_client
+        self._retriever = retriever
+        self.model = model
+
+    @property
+    def retriever(self) -> Retriever:
+        if self._retriever is None:
+            self._retriever = get_retriever()
+        return self._retriever
+
+    def warm(self) -> None:
+        """Load (or build) the retrieval index now rather than on the first question."""
+        self.retriever
+
+    @staticmethod
+    def _context(passages: list[Passage]) -> str:
+        return "\n\n".join(
+            f"[{i}] ({p.source})\n{p.text}" for i, p in enumerate(passages, start=1)
+        )
+
+    # Loading the index and scoring a query are CPU-bound, so the async
+    # paths run `_request` on a worker thread to keep the event loop free
+    def _request(self, conversation: Conversation, prompt: str) -> dict[str, Any]:
+        with metrics.stage("retrieval"):
+            passages = self.retriever.search(prompt)
+        user_content = f"Excerpts:\n\n{self._context(passages)}\n\nQuestion: {prompt}"
+        history = conversation.history[-CHAT_HISTORY_MESSAGES:] if CHAT_HISTORY_MESSAGES else []
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": ASSISTANT_INSTRUCTIONS + CHAT_CONTEXT_INSTRUCTIONS},
+                *history,
+                {"role": "user", "content": user_content},
+            ],
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+
+    def adopt(self, conversation: Conversation, prompt: str, reply: Reply) -> None:
+        """Take on a turn answered elsewhere (no API call needed)."""
+        # Only the bare question is kept; excerpts are re-retrieved per turn
+        conversation.history.append({"role": "user", "content": prompt})
+        conversation.history.append({"role": "assistant", "content": reply.text})
+        del conversation.history[: -max(CHAT_HISTORY_MESSAGES, 2)]
+        conversation.turns += 1
+
+    def _finish(
+        self, conversation: Conversation, prompt: str, text: str, usage: Any, start: float
+    ) -> Reply:
+        self.adopt(conversation, prompt, Reply(text))
+        metrics.record_usage(self.name, usage)
+        record_turn(conversation.turns, time.monotonic() - start, _UsageCarrier(usage))
+        return Reply(text, usage)
+
+    @tracing.traced("chat.ask")
+    def ask(self, conversation: Conversation, prompt: str) -> Reply:
+        start = time.monotonic()
+        parts: list[str] = []
+        usage = None
+        request = self._request(conversation, prompt)
+        with metrics.stage("completion"):
+            for chunk in self.client.chat.completions.create(**request):
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        return self._finish(conversation, prompt, "".join(parts), usage, start)
+
+    @tracing.traced("chat.ask")
+    async def aask(self, conversation: Conversation, prompt: str) -> Reply:
+        start = time.monotonic()
+        parts: list[str] = []
+        usage = None
+        request = await asyncio.to_thread(self._request, conversation, prompt)
+        with metrics.stage("completion"):
+            stream = await self.async_client.chat.completions.create(**request)
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        return self._finish(conversation, prompt, "".join(parts), usage, start)
+
+    @tracing.traced("chat.stream")
+    async def astream(self, conversation: Conversation, prompt: str) -> AsyncIterator[str]:
+        """Yield the answer text as it is generated."""
+        start = time.monotonic()
+        parts: list[str] = []
+        usage = None
+        request = await asyncio.to_thread(self._request, conversation, prompt)
+        with metrics.stage("completion"):
+            stream = await self.async_client.chat.completions.create(**request)
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        self._finish(conversation, prompt, "".join(parts), usage, start)
+
+
+def create_backend(
+    assistant_id: Optional[str] = None,
+    client: Optional[OpenAI] = None,
+    async_client: Optional[AsyncOpenAI] = None,
+    thread_pool: Optional[ThreadPool] = None,
+    attachments: Optional[list[dict[str, Any]]] = None,
+    name: str = PADRE_BACKEND,
+):
+    """Build the backend selected by `PADRE_BACKEND` (or `name`)."""
+    if name == "chat":
+        return coalescing(ChatBackend(client=client, async_client=async_client))
+    if name != "assistants":
+        raise ValueError(f"Unknown PADRE_BACKEND: {name!r} (expected 'assistants' or 'chat')")
+    if not assistant_id:
+        raise ValueError("The assistants backend needs an assistant ID")
+    return coalescing(
+        AssistantsBackend(
+            assistant_id,
+            client=client,
+            async_client=async_client,
+            thread_pool=thread_pool,
+            attachments=attachments,
+        )
+    )
@@ -0,0 +1,370 @@
+"""
+Record and replay HTTP exchanges for offline, repeatable runs.
+
+With `HTTP_CASSETTE=path.jsonl` every client built by `padregpt.transport`
+(OpenAI, Telegram, the upload scripts) goes through a cassette:
+
+    HTTP_CASSETTE_MODE=record   real requests; each exchange is appended to the file
+    HTTP_CASSETTE_MODE=replay   no network; responses come from the file
+
+Each line holds one exchange: the request (method, URL with the bot token
+masked, body hash) and the response (status, headers, body chunks with
+their arrival times). Replay serves exchanges in recorded order per
+request and sleeps for the recorded time to headers and between chunks,
+scaled by `HTTP_CASSETTE_TIME_SCALE` (1 = original timing, 0 = instant),
+so streamed answers and run polling keep their shape for latency
+benchmarks. Authorization headers are never written.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_CASSETTE = os.getenv("HTTP_CASSETTE", "").strip()
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "replay").strip().lower()
+HTTP_CASSETTE_TIME_SCALE = float(os.getenv("HTTP_CASSETTE_TIME_SCALE", "1.0"))
+# Request bodies larger than this are stored by hash only (file uploads)
+CASSETTE_MAX_BODY_CHARS = 64 * 1024
+
+_BOT_TOKEN = re.compile(r"/bot[^/]+/")
+# Response headers that describe the original connection, not the body
+_DROPPED_HEADERS = {"content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+
+
+class CassetteMiss(RuntimeError):
+    """Replay found no recorded exchange left for a request."""
+
+
+def _url(request: httpx.Request) -> str:
+    return _BOT_TOKEN.sub("/bot<token>/", str(request.url))
+
+
+def _target(request: httpx.Request) -> str:
+    # Path and query only, so a cassette replays against any base URL
+    return _BOT_TOKEN.sub("/bot<token>/", request.url.raw_path.decode("ascii"))
+
+
+def _body(request: httpx.Request) -> bytes:
+    try:
+        return request.content
+    except httpx.RequestNotRead:
+        return request.read()
+
+
+def _is_multipart(request: httpx.Request) -> bool:
+    return request.headers.get("content-type", "").startswith("multipart/form-data")
+
+
+def _body_hash(request: httpx.Request) -> str:
+    if _is_multipart(request):
+        # The boundary is random, so uploads match on method and URL alone
+        return "multipart"
+    return hashlib.sha256(_body(request)).hexdigest()
+
+
+def _encode(chunk: bytes) -> dict[str, str]:
+    try:
+        return {"text": chunk.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(chunk).decode("ascii")}
+
+
+def _decode(chunk: dict[str, str]) -> bytes:
+    if "b64" in chunk:
+        return base64.b64decode(chunk["b64"])
+    return chunk["text"].encode("utf-8")
+
+
+class Cassette:
+    """One cassette file, shared by every client in the process."""
+
+    def __init__(self, path: Path, mode: str, time_scale: float = HTTP_CASSETTE_TIME_SCALE) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown HTTP_CASSETTE_MODE: {mode!r} (expected 'record' or 'replay')")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self._lock = threading.Lock()
+        # (method, path, body hash) -> exchanges not yet replayed, in order. The
+        # client name isn't part of the key: which client makes a request (a
+        # pool refill or an inline call) depends on timing
+        self._exchanges: dict[tuple, deque] = defaultdict(deque)
+        if mode == "record":
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("", encoding="utf-8")  # A recording starts a fresh cassette
+        else:
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        exchange = json.loads(line)
+                        self._exchanges[self._key(exchange)].append(exchange)
+            logger.info(f"Replaying {sum(map(len, self._exchanges.values()))} HTTP exchanges from {path}")
+
+    @staticmethod
+    def _key(exchange: dict[str, Any]) -> tuple:
+        request = exchange["request"]
+        return (request["method"], request["target"], request["body_sha256"])
+
+    def record(self, exchange: dict[str, Any]) -> None:
+        line = json.dumps(exchange, ensure_ascii=False) + "\n"
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def next_exchange(self, client: str, request: httpx.Request) -> dict[str, Any]:
+        key = (request.method, _target(request), _body_hash(request))
+        with self._lock:
+            pending = self._exchanges.get(key)
+            if not pending:
+                # The SDKs turn transport errors into retries, so say it here too
+                logger.error(f"Cassette miss: {request.method} {_url(request)} ({client})")
+                raise CassetteMiss(f"No recorded {request.method} {_url(request)} left in {self.path}")
+            exchange = pending.popleft()
+        return exchange
+
+    def delays(self, exchange: dict[str, Any]) -> Iterator[tuple[float, bytes]]:
+        """(seconds to wait, chunk) pairs, after the time to headers."""
+        last = 0.0
+        for chunk in exchange["response"]["chunks"]:
+            yield max(0.0, chunk["at"] - last) * self.time_scale, _decode(chunk)
+            last = chunk["at"]
+
+
+def _exchange(client: str, request: httpx.Request, response: httpx.Response, elapsed: float) -> dict[str, Any]:
+    # Uploads stream from disk; reading them here would hold the whole file
+    body = b"" if _is_multipart(request) else _body(request)
+    text = body.decode("utf-8", errors="replace") if len(body) <= CASSETTE_MAX_BODY_CHARS else None
+    return {
+        "client": client,
+        "request": {
+            "method": request.method,
+            "url": _url(request),
+            "target": _target(request),
+            "body_sha256": _body_hash(request),
+            "body": text,
+        },
+        "response": {
+            "status": response.status_code,
+            "headers": [
+                [k, v] for k, v in response.headers.multi_items() if k.lower() not in _DROPPED_HEADERS
+            ],
+            "elapsed": round(elapsed, 4),
+            "chunks": [],
+        },
+    }
+
+
+def _replayed_response(exchange: dict[str, Any], stream: Any) -> httpx.Response:
+    response = exchange["response"]
+    return httpx.Response(
+        status_code=response["status"],
+        headers=response["headers"],
+        stream=stream,
+        extensions={"http_version": b"HTTP/1.1"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Sync transports
+# ---------------------------------------------------------------------------
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    def __init__(self, stream: Any, cassette: Cassette, exchange: dict[str, Any], start: float) -> None:
+        self._stream = stream
+        self._cassette = cassette
+        self._exchange = exchange
+        self._start = start
+
+    def __iter__(self):
+        chunks = self._exchange["response"]["chunks"]
+        for chunk in self._stream:
+            chunks.append({"at": round(time.perf_counter() - self._start, 4), **_encode(chunk)})
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._cassette.record(self._exchange)
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Sends through `inner` and appends each exchange to the cassette."""
+
+    def __init__(self, inner: httpx.BaseTransport, cassette: Cassette, name: str) -> None:
+        self.inner = inner
+        self.cassette = cassette
+        self.name = name
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # Plain bodies keep the cassette readable
+        request.headers["Accept-Encoding"] = "identity"
+        if not _is_multipart(request):
+            request.read()  # Keep the body for the cassette once it has been sent
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        elapsed = time.perf_counter() - start
+        exchange = _exchange(self.name, request, response, elapsed)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, self.cassette, exchange, start + elapsed),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, cassette: Cassette, exchange: dict[str, Any]) -> None:
+        self._cassette = cassette
+        self._exchange = exchange
+
+    def __iter__(self):
+        for delay, chunk in self._cassette.delays(self._exchange):
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Answers every request from the cassette; never touches the network."""
+
+    def __init__(self, cassette: Cassette, name: str) -> None:
+        self.cassette = cassette
+        self.name = name
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        exchange = self.cassette.next_exchange(self.name, request)
+        time.sleep(exchange["response"]["elapsed"] * self.cassette.time_scale)
+        return _replayed_response(exchange, _ReplayStream(self.cassette, exchange))
+
+
+# ---------------------------------------------------------------------------
+# Async transports
+# ---------------------------------------------------------------------------
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, cassette: Cassette, exchange: dict[str, Any], start: float) -> None:
+        self._stream = stream
+        self._cassette = cassette
+        self._exchange = exchange
+        self._start = start
+
+    async def __aiter__(self):
+        chunks = self._exchange["response"]["chunks"]
+        async for chunk in self._stream:
+            chunks.append({"at": round(time.perf_counter() - self._start, 4), **_encode(chunk)})
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._cassette.record(self._exchange)
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of `RecordingTransport`."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, cassette: Cassette, name: str) -> None:
+        self.inner = inner
+        self.cassette = cassette
+        self.name = name
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.headers["Accept-Encoding"] = "identity"
+        if not isinstance(request.stream, httpx.ByteStream) and not _is_multipart(request):
+            await request.aread()
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        elapsed = time.perf_counter() - start
+        exchange = _exchange(self.name, request, response, elapsed)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncRecordingStream(response.stream, self.cassette, exchange, start + elapsed),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, cassette: Cassette, exchange: dict[str, Any]) -> None:
+        self._cassette = cassette
+        self._exchange = exchange
+
+    async def __aiter__(self):
+        for delay, chunk in self._cassette.delays(self._exchange):
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of `ReplayTransport`."""
+
+    def __init__(self, cassette: Cassette, name: str) -> None:
+        self.cassette = cassette
+        self.name = name
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not isinstance(request.stream, httpx.ByteStream) and not _is_multipart(request):
+            await request.aread()
+        exchange = self.cassette.next_exchange(self.name, request)
+        await asyncio.sleep(exchange["response"]["elapsed"] * self.cassette.time_scale)
+        return _replayed_response(exchange, _AsyncReplayStream(self.cassette, exchange))
+
+
+# ---------------------------------------------------------------------------
+# Wiring
+# ---------------------------------------------------------------------------
+
+_cassettes: dict[Path, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The process-wide cassette from `HTTP_CASSETTE`, or None when it's unset."""
+    if not HTTP_CASSETTE:
+        return None
+    path = Path(HTTP_CASSETTE).expanduser().resolve()
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path, HTTP_CASSETTE_MODE)
+        return _cassettes[path]
+
+
+def wrap(transport: httpx.BaseTransport, name: str) -> httpx.BaseTransport:
+    cassette = get_cassette()
+    if cassette is None:
+        return transport
+    if cassette.mode == "replay":
+        return ReplayTransport(cassette, name)
+    return RecordingTransport(transport, cassette, name)
+
+
+def wrap_async(transport: httpx.AsyncBaseTransport, name: str) -> httpx.AsyncBaseTransport:
+    cassette = get_cassette()
+    if cassette is None:
+        return transport
+    if cassette.mode == "replay":
+        return AsyncReplayTransport(cassette, name)
+    return AsyncRecordingTransport(transport, cassette, name)
@@ -0,0 +1,29 @@
+"""
+Citation markers in assistant answers.
+
+The Assistants API (and the chat backend, which is prompted to match it)
+marks quoted sources as 【4:0†source】.
+"""
+
+import re
+
+# Pattern to match citation markers like 【4:0†source】
+CITATION_PATTERN = re.compile(r'【(\d+):?\d*†([^】]+)】')
+
+
+def extract_citations(text):
+    """
+    Extract citation references from the response and format them.
+    OpenAI Assistants API uses 【number†source】 format for citations.
+    """
+    citations = []
+    for idx, source in CITATION_PATTERN.findall(text):
+        citations.append({
+            'index': idx,
+            'source': source.strip()
+        })
+
+    # Clean the text by removing or simplifying citation markers
+    clean_text = CITATION_PATTERN.sub(lambda m: f' [{m.group(1)}]', text)
+
+    return clean_text, citations
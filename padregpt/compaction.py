@@ -0,0 +1,212 @@
+"""
+Context-window management for long conversations.
+
+Threads otherwise grow until the user resets them, and every turn re-reads
+the whole history. Once a run's prompt exceeds `CONTEXT_TOKEN_BUDGET`, the
+older turns are summarized and the conversation continues on a fresh
+thread seeded with that summary plus the last few messages verbatim.
+Turns keep going to the old thread while the summary is written; when the
+conversation switches over, anything posted after the snapshot is copied
+across first (`catch_up`), so no turn is lost. Alternatively
+`CONTEXT_STRATEGY=truncate` asks the API to only feed the last N messages
+to each run. Both are opt-in; by default threads simply grow.
+"""
+
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from openai import AsyncOpenAI, OpenAI
+
+from padregpt import metrics
+from padregpt.messages import message_text
+
+logger = logging.getLogger(__name__)
+
+# "summarize", "truncate", or "off" (default)
+CONTEXT_STRATEGY = os.getenv("CONTEXT_STRATEGY", "off").strip().lower()
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "24000"))
+CONTEXT_KEEP_MESSAGES = int(os.getenv("CONTEXT_KEEP_MESSAGES", "4"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+
+# How much history is read back when compacting (one page of messages)
+HISTORY_PAGE_LIMIT = 100
+# Keep the summarization prompt itself bounded
+TRANSCRIPT_MAX_CHARS = 60_000
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize this conversation between a user and Padre GPT, a Catholic "
+    "theology assistant. Keep the questions asked, the key teachings given, "
+    "and any sources cited (document names, CCC paragraphs, Scripture "
+    "references) so the conversation can continue without the full history. "
+    "Be concise."
+)
+
+TURN_SECONDS = metrics.histogram(
+    "padregpt_turn_seconds",
+    "End-to-end answer latency per turn, by position in the conversation.",
+)
+TURN_PROMPT_TOKENS = metrics.histogram(
+    "padregpt_turn_prompt_tokens",
+    "Prompt tokens billed per turn, by position in the conversation.",
+    buckets=(1000, 2000, 4000, 8000, 16000, 24000, 32000, 64000, 128000),
+)
+COMPACTIONS = metrics.counter(
+    "padregpt_compactions_total",
+    "Threads compacted into a summary-seeded thread, by result.",
+)
+
+
+@dataclass
+class Compacted:
+    """A summary-seeded thread standing in for `source_thread_id`."""
+
+    thread_id: str
+    source_thread_id: str
+    # Newest message summarized or copied; later ones still need copying
+    last_message_id: str
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="compaction")
+
+
+def _turn_bucket(turn: int) -> str:
+    for upper in (1, 3, 5, 10, 20):
+        if turn <= upper:
+            return f"<={upper}"
+    return ">20"
+
+
+def record_turn(turn: int, seconds: float, run: Any) -> None:
+    """Record latency and prompt-token cost for one turn."""
+    bucket = _turn_bucket(turn)
+    TURN_SECONDS.observe(seconds, turn=bucket)
+    if getattr(run, "usage", None):
+        TURN_PROMPT_TOKENS.observe(run.usage.prompt_tokens, turn=bucket)
+
+
+def run_options() -> dict[str, Any]:
+    """Extra `runs.create` arguments for the configured strategy."""
+    if CONTEXT_STRATEGY == "truncate":
+        return {
+            "truncation_strategy": {
+                "type": "last_messages",
+                "last_messages": CONTEXT_KEEP_MESSAGES,
+            }
+        }
+    return {}
+
+
+def needs_compaction(run: Any) -> bool:
+    """True when the run's prompt outgrew the budget and we summarize."""
+    if CONTEXT_STRATEGY != "summarize" or not getattr(run, "usage", None):
+        return False
+    return run.usage.prompt_tokens > CONTEXT_TOKEN_BUDGET
+
+
+def _split(messages: list[Any]) -> tuple[list[Any], list[Any]]:
+    """Split chronological messages into (older, recent-to-keep)."""
+    keep = max(CONTEXT_KEEP_MESSAGES, 0)
+    if keep == 0:
+        return messages, []
+    return messages[:-keep], messages[-keep:]
+
+
+def _transcript(messages: list[Any]) -> str:
+    lines = [f"{m.role.upper()}: {message_text(m)}" for m in messages]
+    return "\n\n".join(lines)[-TRANSCRIPT_MAX_CHARS:]
+
+
+def _summary_request(older: list[Any]) -> dict[str, Any]:
+    return {
+        "model": SUMMARY_MODEL,
+        "messages": [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": _transcript(older)},
+        ],
+    }
+
+
+def _seed_messages(summary: str, recent: list[Any]) -> list[dict[str, str]]:
+    seed = [{"role": "user", "content": f"Summary of our conversation so far:\n\n{summary}"}]
+    for m in recent:
+        text = message_text(m)
+        if text:
+            seed.append({"role": m.role, "content": text})
+    return seed
+
+
+def compact_thread(client: OpenAI, thread_id: str) -> Optional[Compacted]:
+    """Summarize older turns into a new thread (None if not worth it)."""
+    page = client.beta.threads.messages.list(
+        thread_id=thread_id, order="desc", limit=HISTORY_PAGE_LIMIT
+    )
+    older, recent = _split(list(reversed(page.data)))
+    if not older:
+        return None
+
+    completion = client.chat.completions.create(**_summary_request(older))
+    summary = completion.choices[0].message.content or ""
+    thread = client.beta.threads.create(messages=_seed_messages(summary, recent))
+    COMPACTIONS.inc(result="ok")
+    logger.info(f"Compacted thread {thread_id} into {thread.id}")
+    return Compacted(thread.id, thread_id, page.data[0].id)
+
+
+async def acompact_thread(client: AsyncOpenAI, thread_id: str) -> Optional[Compacted]:
+    """Async variant of `compact_thread()`."""
+    page = await client.beta.threads.messages.list(
+        thread_id=thread_id, order="desc", limit=HISTORY_PAGE_LIMIT
+    )
+    older, recent = _split(list(reversed(page.data)))
+    if not older:
+        return None
+
+    completion = await client.chat.completions.create(**_summary_request(older))
+    summary = completion.choices[0].message.content or ""
+    thread = await client.beta.threads.create(messages=_seed_messages(summary, recent))
+    COMPACTIONS.inc(result="ok")
+    logger.info(f"Compacted thread {thread_id} into {thread.id}")
+    return Compacted(thread.id, thread_id, page.data[0].id)
+
+
+def catch_up(client: OpenAI, compacted: Compacted) -> None:
+    """Copy messages posted to the old thread after the snapshot onto the new one."""
+    later = client.beta.threads.messages.list(
+        thread_id=compacted.source_thread_id, order="asc", after=compacted.last_message_id
+    )
+    for m in later:  # Follows pagination
+        text = message_text(m)
+        if text:
+            client.beta.threads.messages.create(
+                thread_id=compacted.thread_id, role=m.role, content=text
+            )
+
+
+async def acatch_up(client: AsyncOpenAI, compacted: Compacted) -> None:
+    """Async variant of `catch_up()`."""
+    later = client.beta.threads.messages.list(
+        thread_id=compacted.source_thread_id, order="asc", after=compacted.last_message_id
+    )
+    async for m in later:
+        text = message_text(m)
+        if text:
+            await client.beta.threads.messages.create(
+                thread_id=compacted.thread_id, role=m.role, content=text
+            )
+
+
+def _compact_logged(client: OpenAI, thread_id: str) -> Optional[Compacted]:
+    try:
+        return compact_thread(client, thread_id)
+    except Exception as e:
+        COMPACTIONS.inc(result="error")
+        logger.warning(f"Compaction of thread {thread_id} failed: {e}")
+        return None
+
+
+def compact_in_background(client: OpenAI, thread_id: str) -> Future:
+    """Compact off the request path; the future resolves to a `Compacted` or None."""
+    return _executor.submit(_compact_logged, client, thread_id)
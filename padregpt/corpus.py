@@ -0,0 +1,386 @@
+"""
+The library the assistant searches, declared in one manifest.
+
+`corpus.json` lists every source file (path under the corpus directory,
+sha256, size, category, priority, and split policy); the create/add/bundle
+scripts and `scripts/corpus.py sync` all read it. A file whose split policy
+sets `max_mb` is uploaded as parts no larger than that (text at line
+breaks, PDFs by page ranges), which keeps the very large books under the
+upload and indexing limits.
+
+Syncing compares the manifest against what is already uploaded: files are
+identified by content hash (remembered in `state/corpus_sync.json`, or
+matched by name and size the first time), so only new or changed files are
+uploaded. Nothing is removed unless asked: with `prune`, files dropped
+from the manifest are detached from the vector store, and deleted if a
+sync uploaded them.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from openai import OpenAI
+
+from padregpt.assistant_config import CORPUS_DIR, REPO_ROOT
+from padregpt.uploads import upload_file
+from padregpt.vector_store import IndexResult, VectorStoreManager
+
+logger = logging.getLogger(__name__)
+
+CORPUS_MANIFEST = Path(os.getenv("CORPUS_MANIFEST") or REPO_ROOT / "corpus.json")
+CORPUS_PARTS_DIR = REPO_ROOT / "state" / "corpus_parts"
+CORPUS_SYNC_STATE = REPO_ROOT / "state" / "corpus_sync.json"
+CORPUS_HASH_CACHE = REPO_ROOT / "state" / "corpus_hashes.json"
+CORPUS_SUFFIXES = {".pdf", ".txt"}
+DEFAULT_PRIORITY = 2
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class CorpusError(Exception):
+    """The manifest and the files on disk disagree."""
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class HashCache:
+    """sha256 per path, reused while the file's size and mtime are unchanged."""
+
+    def __init__(self, path: Path = CORPUS_HASH_CACHE) -> None:
+        self.path = path
+        self._entries: dict[str, list] = {}
+        if path.exists():
+            self._entries = json.loads(path.read_text(encoding="utf-8"))
+        self._dirty = False
+
+    def digest(self, file: Path) -> str:
+        stat = file.stat()
+        key = str(file.resolve())
+        cached = self._entries.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = sha256_file(file)
+        self._entries[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._dirty = True
+        return digest
+
+    def save(self) -> None:
+        if self._dirty:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._entries), encoding="utf-8")
+            self._dirty = False
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class CorpusFile:
+    path: str  # Relative to the manifest root
+    category: str = "Uncategorized"
+    priority: int = DEFAULT_PRIORITY  # 1 uploads first
+    sha256: Optional[str] = None  # Pinned by `corpus.py scan`
+    size: Optional[int] = None
+    split_max_mb: Optional[float] = None  # Upload in parts no larger than this
+    note: str = ""
+
+    @classmethod
+    def from_json(cls, row: dict[str, Any]) -> "CorpusFile":
+        split = row.get("split") or {}
+        return cls(
+            path=row["path"],
+            category=row.get("category", "Uncategorized"),
+            priority=row.get("priority", DEFAULT_PRIORITY),
+            sha256=row.get("sha256"),
+            size=row.get("size"),
+            split_max_mb=split.get("max_mb"),
+            note=row.get("note", ""),
+        )
+
+    def to_json(self) -> dict[str, Any]:
+        row: dict[str, Any] = {
+            "path": self.path,
+            "category": self.category,
+            "priority": self.priority,
+            "sha256": self.sha256,
+            "size": self.size,
+            "split": {"max_mb": self.split_max_mb} if self.split_max_mb else None,
+        }
+        if self.note:
+            row["note"] = self.note
+        return row
+
+
+@dataclass
+class Manifest:
+    path: Path
+    root: Path
+    files: list[CorpusFile] = field(default_factory=list)
+    root_setting: Optional[str] = None  # As written in the file (None = CORPUS_DIR)
+
+    def save(self) -> None:
+        state: dict[str, Any] = {"files": [f.to_json() for f in self.files]}
+        if self.root_setting:
+            state = {"root": self.root_setting, **state}
+        self.path.write_text(json.dumps(state, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    def by_priority(self) -> list[CorpusFile]:
+        return sorted(self.files, key=lambda f: (f.priority, f.size or 0))
+
+
+def load_manifest(path: Path = CORPUS_MANIFEST) -> Manifest:
+    """Read a manifest; `root` is relative to the manifest and defaults to CORPUS_DIR."""
+    state = json.loads(path.read_text(encoding="utf-8"))
+    root_setting = state.get("root")
+    root = (path.parent / root_setting).resolve() if root_setting else CORPUS_DIR
+    return Manifest(path, root, [CorpusFile.from_json(row) for row in state["files"]], root_setting)
+
+
+def scan(manifest: Manifest) -> tuple[list[CorpusFile], list[CorpusFile], list[Path]]:
+    """Pin current hashes and sizes; returns (changed, missing, unlisted files on disk)."""
+    hashes = HashCache()
+    changed, missing = [], []
+    for entry in manifest.files:
+        path = manifest.root / entry.path
+        if not path.is_file():
+            missing.append(entry)
+            continue
+        digest = hashes.digest(path)
+        if (digest, path.stat().st_size) != (entry.sha256, entry.size):
+            entry.sha256, entry.size = digest, path.stat().st_size
+            changed.append(entry)
+    hashes.save()
+    listed = {entry.path for entry in manifest.files}
+    unlisted = sorted(
+        p for p in manifest.root.rglob("*")
+        if p.is_file() and p.suffix.lower() in CORPUS_SUFFIXES
+        and p.relative_to(manifest.root).as_posix() not in listed
+    )
+    return changed, missing, unlisted
+
+
+# ---------------------------------------------------------------------------
+# Upload units (whole files or parts)
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Unit:
+    """One file as uploaded: a whole source file or one part of a split one."""
+
+    name: str  # Upload filename (what citations show)
+    path: Path  # File on disk to upload
+    sha256: str
+    size: int
+    source: CorpusFile
+
+
+def _split_text(path: Path, max_bytes: int, out_dir: Path) -> list[Path]:
+    parts: list[Path] = []
+    out = None
+    written = 0
+    with path.open("rb") as f:
+        for line in f:
+            if out is None or (written and written + len(line) > max_bytes):
+                if out:
+                    out.close()
+                parts.append(out_dir / f"{len(parts) + 1:04d}{path.suffix}")
+                out = parts[-1].open("wb")
+                written = 0
+            out.write(line)
+            written += len(line)
+    if out:
+        out.close()
+    return parts
+
+
+def _split_pdf(path: Path, max_bytes: int, out_dir: Path) -> list[Path]:
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError as e:
+        raise CorpusError(f"Splitting {path.name} needs pypdf (pip install pypdf)") from e
+    reader = PdfReader(path)
+    pages = len(reader.pages)
+    count = max(1, math.ceil(path.stat().st_size / max_bytes))
+    per_part = math.ceil(pages / count)
+    parts = []
+    for start in range(0, pages, per_part):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + per_part]:
+            writer.add_page(page)
+        parts.append(out_dir / f"{len(parts) + 1:04d}.pdf")
+        with parts[-1].open("wb") as f:
+            writer.write(f)
+    return parts
+
+
+def _parts(entry: CorpusFile, path: Path, digest: str) -> list[Path]:
+    """Split `path` per its policy, reusing parts already cut from the same content."""
+    out_dir = CORPUS_PARTS_DIR / f"{digest[:16]}-{entry.split_max_mb:g}mb"
+    done = out_dir / "parts.json"
+    if done.exists():
+        return [out_dir / name for name in json.loads(done.read_text(encoding="utf-8"))]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    max_bytes = int(entry.split_max_mb * 1024 * 1024)
+    if path.suffix.lower() == ".pdf":
+        parts = _split_pdf(path, max_bytes, out_dir)
+    else:
+        parts = _split_text(path, max_bytes, out_dir)
+    done.write_text(json.dumps([p.name for p in parts]), encoding="utf-8")
+    return parts
+
+
+def units(manifest: Manifest) -> list[Unit]:
+    """Every file to upload, in priority order.
+
+    A listed file that is missing is an error rather than a skip: a sync
+    would otherwise read its absence as "no longer wanted".
+    """
+    hashes = HashCache()
+    result = []
+    mismatched = []
+    missing = []
+    for entry in manifest.by_priority():
+        path = manifest.root / entry.path
+        if not path.is_file():
+            missing.append(entry.path)
+            continue
+        digest = hashes.digest(path)
+        if entry.sha256 and digest != entry.sha256:
+            mismatched.append(entry.path)
+            continue
+        size = path.stat().st_size
+        if not entry.split_max_mb or size <= entry.split_max_mb * 1024 * 1024:
+            result.append(Unit(Path(entry.path).name, path, digest, size, entry))
+            continue
+        parts = _parts(entry, path, digest)
+        stem, suffix = Path(entry.path).stem, Path(entry.path).suffix
+        for i, part in enumerate(parts, start=1):
+            name = f"{stem} (part {i} of {len(parts)}){suffix}"
+            result.append(Unit(name, part, hashes.digest(part), part.stat().st_size, entry))
+    hashes.save()
+    if missing:
+        raise CorpusError(f"Not found under {manifest.root}: " + ", ".join(missing))
+    if mismatched:
+        raise CorpusError(
+            "Changed since the manifest was pinned (run `corpus.py scan` to accept): "
+            + ", ".join(mismatched)
+        )
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Sync against the uploaded files and vector store
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class SyncPlan:
+    upload: list[Unit] = field(default_factory=list)
+    attach: list[str] = field(default_factory=list)  # Uploaded, not yet in the store
+    detach: list[str] = field(default_factory=list)  # In the store, no longer wanted (prune only)
+    delete: list[str] = field(default_factory=list)  # Uploaded by a sync, no longer wanted (prune only)
+    extra: list[str] = field(default_factory=list)  # In the store, not in the manifest, kept
+    unchanged: int = 0
+    uploaded: dict[str, Unit] = field(default_factory=dict)  # file ID -> unit, filled by apply
+
+    @property
+    def empty(self) -> bool:
+        return not (self.upload or self.attach or self.detach or self.delete)
+
+
+def load_sync_state(path: Path = CORPUS_SYNC_STATE) -> dict[str, Any]:
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {"vector_store_id": None, "files": {}}
+
+
+def save_sync_state(state: dict[str, Any], path: Path = CORPUS_SYNC_STATE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def plan_sync(
+    client: OpenAI, vector_store_id: str, wanted: list[Unit], state: dict[str, Any], prune: bool = False
+) -> SyncPlan:
+    """What it takes to make the vector store hold `wanted`.
+
+    Without `prune` nothing is removed: files in the store that the manifest
+    doesn't list are reported in `extra`. With it they are detached, and the
+    ones a sync uploaded itself are deleted; adopted files (uploaded some
+    other way and matched by name and size) are never deleted.
+    """
+    remote = {f.id: f for f in client.files.list(purpose="assistants")}
+    in_store = {f.id for f in client.beta.vector_stores.files.list(vector_store_id)}
+    known: dict[str, dict[str, Any]] = state["files"]  # sha256 -> {"file_id", "name", "size"}
+    for digest in [d for d, rec in known.items() if rec["file_id"] not in remote]:
+        del known[digest]  # Deleted outside of a sync
+    # First sync against an existing library: adopt same-name, same-size uploads
+    by_name_size = {(f.filename, f.bytes): f.id for f in remote.values()}
+    adopted = {rec["file_id"] for rec in known.values() if rec.get("adopted")}
+
+    plan = SyncPlan()
+    wanted_ids = set()
+    for unit in wanted:
+        record = known.get(unit.sha256)
+        file_id = record["file_id"] if record else by_name_size.get((unit.name, unit.size))
+        if file_id is None:
+            plan.upload.append(unit)
+            continue
+        if not record or record.get("adopted"):
+            adopted.add(file_id)
+        known[unit.sha256] = {"file_id": file_id, "name": unit.name, "size": unit.size}
+        if file_id in adopted:
+            known[unit.sha256]["adopted"] = True
+        wanted_ids.add(file_id)
+        if file_id in in_store:
+            plan.unchanged += 1
+        else:
+            plan.attach.append(file_id)
+    unwanted = sorted(in_store - wanted_ids)
+    if not prune:
+        plan.extra = unwanted
+        return plan
+    plan.detach = unwanted
+    ours = {rec["file_id"] for rec in known.values()} - adopted
+    plan.delete = sorted((ours - wanted_ids) & set(remote))
+    return plan
+
+
+def apply_sync(
+    client: OpenAI, vector_store_id: str, plan: SyncPlan, state: dict[str, Any]
+) -> list[IndexResult]:
+    """Upload, attach, detach and delete per `plan`, recording uploads in `state`.
+
+    Returns how long each attached file took to index.
+    """
+    known: dict[str, dict[str, Any]] = state["files"]
+    state["vector_store_id"] = vector_store_id
+    for unit in plan.upload:
+        file_id = upload_file(client, unit.path, unit.name)
+        logger.info(f"Uploaded {unit.name} ({unit.size / (1024 * 1024):.1f}MB) as {file_id}")
+        known[unit.sha256] = {"file_id": file_id, "name": unit.name, "size": unit.size}
+        plan.uploaded[file_id] = unit
+        save_sync_state(state)  # An interrupted sync doesn't upload these again
+    manager = VectorStoreManager(client, vector_store_id)
+    indexed = manager.attach([*plan.attach, *plan.uploaded])
+    manager.detach(plan.detach)
+    for file_id in plan.delete:
+        client.files.delete(file_id)
+    deleted = set(plan.delete)
+    state["files"] = {d: rec for d, rec in known.items() if rec["file_id"] not in deleted}
+    save_sync_state(state)
+    return indexed
@@ -0,0 +1,214 @@
+"""
+Scoring answers against a gold set of expected references.
+
+A gold question lists the Catechism paragraphs and Scripture verses a good
+answer should cite ("CCC 1374", "John 6:51-58", "2 Machabees 12:46") and,
+optionally, library files it should draw on. References are read from the
+answer text in the forms the assistant instructions ask for, ranges are
+expanded, and an expected reference counts as recalled when the answer
+cites any part of it.
+"""
+
+import json
+import re
+import statistics
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from padregpt.citations import extract_citations
+
+# Longest range expanded into individual paragraphs/verses
+MAX_RANGE = 60
+
+# Canonical book name -> other spellings (Douay-Rheims names included)
+BOOKS = {
+    "Genesis": ["Gen", "Gn"],
+    "Exodus": ["Exod", "Ex"],
+    "Leviticus": ["Lev", "Lv"],
+    "Numbers": ["Num", "Nm"],
+    "Deuteronomy": ["Deut", "Dt"],
+    "Joshua": ["Josh", "Josue"],
+    "Judges": ["Judg", "Jgs"],
+    "Ruth": ["Ru"],
+    "Ezra": ["Ezr", "1 Esdras"],
+    "Nehemiah": ["Neh", "Nehemias", "2 Esdras"],
+    "Tobit": ["Tob", "Tobias"],
+    "Judith": ["Jdt"],
+    "Esther": ["Esth", "Est"],
+    "Job": ["Jb"],
+    "Psalms": ["Psalm", "Ps", "Pss"],
+    "Proverbs": ["Prov", "Prv"],
+    "Ecclesiastes": ["Eccl", "Qoheleth"],
+    "Song of Songs": ["Song", "Canticle of Canticles", "Canticles", "Cant"],
+    "Wisdom": ["Wis"],
+    "Sirach": ["Sir", "Ecclesiasticus", "Ecclus"],
+    "Isaiah": ["Isa", "Is", "Isaias"],
+    "Jeremiah": ["Jer", "Jeremias"],
+    "Lamentations": ["Lam"],
+    "Baruch": ["Bar"],
+    "Ezekiel": ["Ezek", "Ez", "Ezechiel"],
+    "Daniel": ["Dan", "Dn"],
+    "Hosea": ["Hos", "Osee"],
+    "Joel": ["Jl"],
+    "Amos": ["Am"],
+    "Obadiah": ["Obad", "Ob", "Abdias", "Abd"],
+    "Jonah": ["Jon", "Jonas"],
+    "Micah": ["Mic", "Micheas"],
+    "Nahum": ["Nah", "Na"],
+    "Habakkuk": ["Hab", "Hb", "Habacuc"],
+    "Zephaniah": ["Zeph", "Zep", "Sophonias", "Soph"],
+    "Haggai": ["Hag", "Hg", "Aggeus", "Agg"],
+    "Zechariah": ["Zech", "Zec", "Zacharias", "Zach"],
+    "Malachi": ["Mal", "Malachias"],
+    "Matthew": ["Matt", "Mt"],
+    "Mark": ["Mk"],
+    "Luke": ["Lk"],
+    "John": ["Jn"],
+    "Acts": ["Acts of the Apostles"],
+    "Romans": ["Rom"],
+    "Galatians": ["Gal"],
+    "Ephesians": ["Eph"],
+    "Philippians": ["Phil"],
+    "Colossians": ["Col"],
+    "Titus": ["Ti"],
+    "Philemon": ["Phlm"],
+    "Hebrews": ["Heb"],
+    "James": ["Jas"],
+    "Jude": ["Jud"],
+    "Revelation": ["Rev", "Apocalypse", "Apoc"],
+    # Numbered books: the number is matched separately
+    "Kings": ["Kgs"],
+    "Samuel": ["Sam", "Sm"],
+    "Chronicles": ["Chron", "Chr", "Paralipomenon", "Par"],
+    "Maccabees": ["Macc", "Mc", "Machabees", "Mach"],
+    "Corinthians": ["Cor"],
+    "Thessalonians": ["Thess", "Thes"],
+    "Timothy": ["Tim", "Tm"],
+    "Peter": ["Pet", "Pt"],
+}
+_ALIASES = [alias for name, aliases in BOOKS.items() for alias in [name, *aliases]]
+_BOOK_NAMES = {alias.lower(): name for name, aliases in BOOKS.items() for alias in [name, *aliases]}
+
+
+def _alias_pattern(alias: str) -> str:
+    # Two-letter abbreviations must be capitalized as written, so "I am 5:30"
+    # or "the ratio is 3:2" isn't read as Amos or Isaiah
+    return re.escape(alias) if len(alias) > 2 else f"(?-i:{re.escape(alias)})"
+
+
+# Longest first so "Song of Songs" wins over "Song"
+_BOOK_ALTERNATION = "|".join(_alias_pattern(a) for a in sorted(_ALIASES, key=len, reverse=True))
+
+SCRIPTURE_PATTERN = re.compile(
+    # A Roman-numeral book number is upper case and set off by a space ("II Kings")
+    rf"\b(?:([1-4])\s*|(?-i:(I{{1,3}}|IV))\s+)?({_BOOK_ALTERNATION})\.?\s+(\d{{1,3}})\s*:\s*(\d{{1,3}})"
+    r"(?:\s*[-–]\s*(\d{1,3})\b(?!\s*:))?",
+    re.IGNORECASE,
+)
+CCC_PATTERN = re.compile(
+    r"\b(?:CCC|Catechism(?: of the Catholic Church)?)[,\s]*(?:§+|¶|paragraphs?|paras?\.?|nos?\.)?\s*"
+    # A continuation can't be the number of a book ("CCC 1374, 1 Cor 11:27")
+    r"(\d{1,4}(?:\s*(?:[-–,]|and)\s*\d{1,4}(?!\s*[A-Za-z]+\.?\s+\d{1,3}\s*:))*)",
+    re.IGNORECASE,
+)
+_ROMAN = {"I": "1", "II": "2", "III": "3", "IV": "4"}
+
+
+def _span(start: int, end: Optional[int]) -> range:
+    if end is None or end < start or end - start > MAX_RANGE:
+        return range(start, start + 1)
+    return range(start, end + 1)
+
+
+def _ccc_numbers(group: str) -> Iterable[int]:
+    for part in re.split(r"\s*(?:,|and)\s*", group):
+        bounds = re.split(r"\s*[-–]\s*", part)
+        start = int(bounds[0])
+        yield from _span(start, int(bounds[1]) if len(bounds) > 1 else None)
+
+
+def references(text: str) -> set[str]:
+    """Every CCC paragraph and Scripture verse cited in `text`, one string each."""
+    found = set()
+    for match in CCC_PATTERN.finditer(text):
+        found.update(f"CCC {n}" for n in _ccc_numbers(match.group(1)))
+    for number, roman, book, chapter, verse, end in SCRIPTURE_PATTERN.findall(text):
+        name = _BOOK_NAMES[book.lower()]
+        if number or roman:
+            name = f"{number or _ROMAN[roman]} {name}"
+        found.update(f"{name} {int(chapter)}:{v}" for v in _span(int(verse), int(end) if end else None))
+    return found
+
+
+# ---------------------------------------------------------------------------
+# Gold set and scoring
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class GoldQuestion:
+    id: str
+    question: str
+    references: list[str]  # As written in the gold file, e.g. "John 6:51-58"
+    sources: list[str] = field(default_factory=list)  # Library file names (substring match)
+
+
+def load_gold(path: Path) -> list[GoldQuestion]:
+    gold = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                gold.append(
+                    GoldQuestion(row["id"], row["question"], row.get("references", []), row.get("sources", []))
+                )
+    return gold
+
+
+def score(gold: GoldQuestion, answer: str) -> dict[str, Any]:
+    """Recall of `gold`'s references and sources in one raw answer (citation markers included)."""
+    cited = references(answer)
+    hits = [ref for ref in gold.references if references(ref) & cited]
+    _, citations = extract_citations(answer)
+    cited_files = {c["source"].lower() for c in citations}
+    source_hits = [s for s in gold.sources if any(s.lower() in f for f in cited_files)]
+    return {
+        "reference_recall": len(hits) / len(gold.references) if gold.references else None,
+        "source_recall": len(source_hits) / len(gold.sources) if gold.sources else None,
+        "missed": [ref for ref in gold.references if ref not in hits]
+        + [s for s in gold.sources if s not in source_hits],
+    }
+
+
+def _tokens(usage: Optional[dict[str, Any]], key: str) -> Optional[int]:
+    return (usage or {}).get(key)
+
+
+def _mean(values: list[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return statistics.mean(values) if values else None
+
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
+    """Aggregate scored answers (one configuration) into the numbers we track."""
+    answered = [r for r in records if "error" not in r]
+    seconds = [r["seconds"] for r in answered]
+    return {
+        "questions": len(records),
+        "errors": len(records) - len(answered),
+        "reference_recall": _mean([r["reference_recall"] for r in answered]),
+        "source_recall": _mean([r["source_recall"] for r in answered]),
+        "p50_seconds": _percentile(seconds, 0.5),
+        "p95_seconds": _percentile(seconds, 0.95),
+        "prompt_tokens": _mean([_tokens(r.get("usage"), "prompt_tokens") for r in answered]),
+        "completion_tokens": _mean([_tokens(r.get("usage"), "completion_tokens") for r in answered]),
+        "total_tokens": _mean([_tokens(r.get("usage"), "total_tokens") for r in answered]),
+    }
@@ -0,0 +1,74 @@
+"""
+Answers for when the backend can't take another question.
+
+First choice is a recent answer to the same (normalized) opening
+question; otherwise the most relevant library passages from the local
+retrieval index, quoted with their sources. Neither costs an API call.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from padregpt import metrics
+from padregpt.retrieval import cached_retriever
+from padregpt.singleflight import normalize
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_CACHE_SIZE = int(os.getenv("FALLBACK_CACHE_SIZE", "256"))
+FALLBACK_PASSAGES = 3
+FALLBACK_PASSAGE_CHARS = 600
+
+FALLBACKS = metrics.counter(
+    "padregpt_fallback_answers_total",
+    "Questions answered without the backend, by source (cache, retrieval, none).",
+)
+
+_answers: "OrderedDict[str, str]" = OrderedDict()
+
+
+def remember(prompt: str, answer: str) -> None:
+    """Keep a first-turn answer for reuse while the backend is saturated."""
+    key = normalize(prompt)
+    _answers[key] = answer
+    _answers.move_to_end(key)
+    while len(_answers) > FALLBACK_CACHE_SIZE:
+        _answers.popitem(last=False)
+
+
+def _passages_answer(prompt: str) -> Optional[str]:
+    # Only use an index that's already built; building one takes minutes
+    retriever = cached_retriever()
+    if retriever is None:
+        return None
+    passages = retriever.search(prompt, k=FALLBACK_PASSAGES)
+    if not passages:
+        return None
+    quotes = []
+    for p in passages:
+        text = " ".join(p.text.split())
+        if len(text) > FALLBACK_PASSAGE_CHARS:
+            text = text[:FALLBACK_PASSAGE_CHARS].rsplit(" ", 1)[0] + "…"
+        quotes.append(f"> {text}\n\n— _{p.source}_")
+    return (
+        "I'm answering a lot of questions right now, so here are the most relevant "
+        "passages from the library instead:\n\n" + "\n\n".join(quotes)
+    )
+
+
+async def answer(prompt: str) -> Optional[str]:
+    """A cached or retrieval-only answer, or None if there is neither."""
+    cached = _answers.get(normalize(prompt))
+    if cached:
+        FALLBACKS.inc(source="cache")
+        return cached
+    try:
+        text = await asyncio.to_thread(_passages_answer, prompt)
+    except Exception as e:
+        logger.warning(f"Retrieval fallback failed: {e}")
+        text = None
+    FALLBACKS.inc(source="retrieval" if text else "none")
+    return text
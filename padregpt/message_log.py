@@ -0,0 +1,96 @@
+"""
+Compact storage for the messages shown in a web chat.
+
+Long answers with citations add up across thousands of idle sessions, so
+each message is a slotted record holding UTF-8 bytes, zlib-compressed once
+it is no longer among the most recent few. Only the last
+`MESSAGE_HISTORY_WINDOW` messages stay in the log; older ones are handed
+to the session store as pages and read back only when the user asks to
+see them.
+"""
+
+import os
+import zlib
+from typing import Iterator
+
+MESSAGE_HISTORY_WINDOW = int(os.getenv("MESSAGE_HISTORY_WINDOW", "40"))
+# Most recent messages kept uncompressed (they are re-rendered every rerun)
+MESSAGE_HOT_MESSAGES = int(os.getenv("MESSAGE_HOT_MESSAGES", "6"))
+# Compressing short messages costs more than it saves
+MESSAGE_COMPRESS_MIN_BYTES = 512
+
+
+class Message:
+    """One chat message; `content` is decoded on access."""
+
+    __slots__ = ("role", "_data", "_compressed")
+
+    def __init__(self, role: str, content: str) -> None:
+        self.role = role
+        self._data = content.encode("utf-8")
+        self._compressed = False
+
+    @property
+    def content(self) -> str:
+        data = zlib.decompress(self._data) if self._compressed else self._data
+        return data.decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data)
+
+    def compress(self) -> None:
+        if self._compressed or len(self._data) < MESSAGE_COMPRESS_MIN_BYTES:
+            return
+        packed = zlib.compress(self._data, 6)
+        if len(packed) < len(self._data):
+            self._data = packed
+            self._compressed = True
+
+    def to_json(self) -> list[str]:
+        return [self.role, self.content]
+
+
+class MessageLog:
+    """The visible tail of a conversation, plus a count of paged-out messages."""
+
+    __slots__ = ("_messages", "paged_out", "pending_pages", "window")
+
+    def __init__(self, window: int = MESSAGE_HISTORY_WINDOW) -> None:
+        self._messages: list[Message] = []
+        self.paged_out = 0  # Messages moved to the store, oldest first
+        self.pending_pages: list[Message] = []  # Paged out but not yet written
+        self.window = window
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(m.nbytes for m in self._messages) + sum(m.nbytes for m in self.pending_pages)
+
+    def append(self, role: str, content: str) -> None:
+        self._messages.append(Message(role, content))
+        if len(self._messages) > MESSAGE_HOT_MESSAGES:
+            self._messages[-MESSAGE_HOT_MESSAGES - 1].compress()
+        overflow = len(self._messages) - self.window
+        if self.window and overflow > 0:
+            self.pending_pages.extend(self._messages[:overflow])
+            del self._messages[:overflow]
+            self.paged_out += overflow
+
+    def to_json(self) -> dict:
+        return {"messages": [m.to_json() for m in self._messages], "paged_out": self.paged_out}
+
+    @classmethod
+    def from_json(cls, state: dict) -> "MessageLog":
+        log = cls()
+        for role, content in state["messages"]:
+            log._messages.append(Message(role, content))
+        for message in log._messages[:-MESSAGE_HOT_MESSAGES or None]:
+            message.compress()
+        log.paged_out = state.get("paged_out", 0)
+        return log
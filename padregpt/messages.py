@@ -0,0 +1,45 @@
+"""
+Fetching a run's reply without paging through the whole thread.
+
+`messages.list` is filtered by `run_id`, so the cost per turn stays
+constant no matter how long the conversation gets.
+"""
+
+from openai import AsyncOpenAI, OpenAI
+
+# A file_search run normally writes one message; this bounds the odd extra
+RUN_MESSAGE_LIMIT = 10
+
+
+def message_text(message) -> str:
+    """Join every text block of a message (not just the first)."""
+    return "\n".join(
+        block.text.value for block in message.content if block.type == "text"
+    )
+
+
+def _join_reply(messages) -> str:
+    parts = [message_text(m) for m in messages if m.role == "assistant"]
+    return "\n\n".join(p for p in parts if p)
+
+
+def fetch_run_reply(client: OpenAI, thread_id: str, run_id: str) -> str:
+    """Return the assistant text produced by one run."""
+    messages = client.beta.threads.messages.list(
+        thread_id=thread_id,
+        run_id=run_id,
+        order="asc",
+        limit=RUN_MESSAGE_LIMIT,
+    )
+    return _join_reply(messages.data)
+
+
+async def afetch_run_reply(client: AsyncOpenAI, thread_id: str, run_id: str) -> str:
+    """Async variant of `fetch_run_reply()`."""
+    messages = await client.beta.threads.messages.list(
+        thread_id=thread_id,
+        run_id=run_id,
+        order="asc",
+        limit=RUN_MESSAGE_LIMIT,
+    )
+    return _join_reply(messages.data)
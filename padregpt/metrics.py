@@ -0,0 +1,268 @@
+"""
+Minimal in-process metrics (counters, gauges, histograms).
+
+Deliberately dependency-free and cheap on the hot path: every update is a
+dict lookup plus a few arithmetic operations under one lock. Values are
+served in the Prometheus text format from a local `/metrics` endpoint
+started with `start_http_server()`.
+"""
+
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from padregpt import tracing
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        super().__init__(name, help_text)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with running sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._values: dict[LabelKey, list[float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[idx] += 1
+            row[-1] += value
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            row = self._values.get(_label_key(labels))
+            return int(sum(row[:-1])) if row else 0
+
+    def samples(self) -> dict[LabelKey, list[float]]:
+        with self._lock:
+            return {k: list(v) for k, v in self._values.items()}
+
+
+class Registry:
+    """Get-or-create store so modules can declare metrics at import time."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, help_text: str, **kwargs: object) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get(Counter, name, help_text)  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get(Gauge, name, help_text)  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help_text: str, buckets: Optional[tuple[float, ...]] = None
+    ) -> Histogram:
+        kwargs = {"buckets": buckets} if buckets else {}
+        return self._get(Histogram, name, help_text, **kwargs)  # type: ignore[return-value]
+
+    def collect(self) -> list[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# ---------------------------------------------------------------------------
+# Shared pipeline metrics
+# ---------------------------------------------------------------------------
+
+STAGE_SECONDS = histogram(
+    "padregpt_stage_seconds",
+    "Latency of each answer pipeline stage (thread_acquire, message_create, "
+    "message_fetch, retrieval, completion, telegram_send, ...).",
+)
+TOKENS = counter(
+    "padregpt_tokens_total",
+    "Tokens billed, by backend and kind (prompt or completion).",
+)
+RATE_LIMITED = counter(
+    "padregpt_rate_limited_total",
+    "Requests rejected by our own per-user rate limit, by front-end.",
+)
+
+
+class stage:
+    """Context manager timing one pipeline stage into `STAGE_SECONDS` (and a trace span)."""
+
+    __slots__ = ("name", "start", "_span")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "stage":
+        self._span = tracing.span(self.name)
+        self._span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.name)
+        self._span.__exit__(*exc)
+
+
+def record_usage(backend: str, usage: object) -> None:
+    """Count prompt/completion tokens from a run or completion `usage` object."""
+    if usage is None:
+        return
+    TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, backend=backend, kind="prompt")
+    TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, backend=backend, kind="completion")
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+
+def _format_labels(key: LabelKey, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(registry: Registry = REGISTRY) -> str:
+    """Serialize every metric in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in registry.collect():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            for key, row in sorted(metric.samples().items()):
+                cumulative = 0.0
+                for upper, count in zip(metric.buckets + (math.inf,), row[:-1]):
+                    cumulative += count
+                    le = ("le", _format_value(upper))
+                    lines.append(f"{metric.name}_bucket{_format_labels(key, le)} {_format_value(cumulative)}")
+                lines.append(f"{metric.name}_sum{_format_labels(key)} {_format_value(row[-1])}")
+                lines.append(f"{metric.name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        else:
+            for key, value in sorted(metric.samples().items()):
+                lines.append(f"{metric.name}{_format_labels(key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format: str, *args: object) -> None:  # quiet
+        pass
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serve `/metrics` on a daemon thread; returns None if disabled or the port is taken."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started on {addr}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics on http://{addr}:{port}/metrics")
+    return server
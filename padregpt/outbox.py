@@ -0,0 +1,174 @@
+"""
+Outbound Telegram delivery queue.
+
+Answers cost an OpenAI run to generate, so a send that Telegram refuses
+must not lose them. Every outgoing message goes through an `Outbox`:
+each chat gets its own FIFO (so multi-part answers stay in order) drained
+by one task that paces sends to Telegram's per-chat limit, while a shared
+pacer keeps the bot under the global limit. Flood-wait errors are retried
+after the `retry_after` Telegram asks for. Network errors are retried with
+capped exponential backoff only when the request never left (no
+connection, or none free in the pool); after a read timeout or a dropped
+connection Telegram may already have posted the message, and sending it
+again would show it twice, so those fail like permanent errors (bot
+blocked, bad request).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import httpx
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from padregpt import metrics
+
+logger = logging.getLogger(__name__)
+
+# Telegram: about one message per second per chat, 30 per second overall
+OUTBOX_CHAT_INTERVAL = float(os.getenv("OUTBOX_CHAT_INTERVAL", "1.0"))
+OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "30"))
+OUTBOX_BACKOFF_INITIAL = 0.5
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "30"))
+
+QUEUE_DEPTH = metrics.gauge(
+    "padregpt_outbox_queued",
+    "Telegram messages waiting to be sent.",
+)
+QUEUE_SECONDS = metrics.histogram(
+    "padregpt_outbox_queue_seconds",
+    "Time from enqueue until a message was delivered, including retries.",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+RETRIES = metrics.counter(
+    "padregpt_outbox_retries_total",
+    "Telegram send attempts retried, by reason.",
+)
+FAILED = metrics.counter(
+    "padregpt_outbox_failed_total",
+    "Telegram messages given up on after a permanent error, by reason.",
+)
+
+Send = Callable[[], Awaitable[Any]]
+
+# Transport errors raised before any of the request was sent
+_UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _unsent(error: NetworkError) -> bool:
+    """True if the request never reached Telegram, so resending can't duplicate it."""
+    return isinstance(error.__cause__, _UNSENT_ERRORS)
+
+
+@dataclass
+class _Item:
+    send: Send
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class _Pacer:
+    """Spaces acquisitions at least `interval` seconds apart (FIFO)."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def settle(self) -> None:
+        """Sleep until the next slot is free, without reserving it."""
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def defer(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+class Outbox:
+    """Per-chat ordered, globally paced, retrying message sender."""
+
+    def __init__(
+        self,
+        chat_interval: float = OUTBOX_CHAT_INTERVAL,
+        global_rate: float = OUTBOX_GLOBAL_RATE,
+    ) -> None:
+        self.chat_interval = chat_interval
+        self._global = _Pacer(1.0 / global_rate if global_rate > 0 else 0.0)
+        self._queues: dict[int, deque[_Item]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+
+    def submit(self, chat_id: int, send: Send) -> asyncio.Future:
+        """Queue `send` behind the chat's earlier messages; the future gets its result."""
+        item = _Item(send, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(chat_id, deque()).append(item)
+        QUEUE_DEPTH.inc()
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._drain(chat_id))
+        return item.future
+
+    async def send(self, chat_id: int, send: Send) -> Any:
+        return await self.submit(chat_id, send)
+
+    async def close(self) -> None:
+        """Wait for everything queued so far to be delivered (or fail)."""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    async def _drain(self, chat_id: int) -> None:
+        queue = self._queues[chat_id]
+        pacer = _Pacer(self.chat_interval)
+        try:
+            while queue:
+                item = queue[0]
+                try:
+                    result = await self._deliver(item, pacer)
+                except Exception as e:
+                    FAILED.inc(reason=type(e).__name__)
+                    logger.error(f"Dropping message to chat {chat_id}: {e}")
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                else:
+                    QUEUE_SECONDS.observe(time.monotonic() - item.enqueued)
+                    if not item.future.done():
+                        item.future.set_result(result)
+                queue.popleft()
+                QUEUE_DEPTH.dec()
+                if not queue:
+                    # Linger out the interval so a message queued just after is still paced
+                    await pacer.settle()
+        finally:
+            del self._workers[chat_id]
+            if not queue:
+                del self._queues[chat_id]
+
+    async def _deliver(self, item: _Item, pacer: _Pacer) -> Any:
+        backoff = OUTBOX_BACKOFF_INITIAL
+        while True:
+            await pacer.wait()
+            await self._global.wait()
+            try:
+                return await item.send()
+            except RetryAfter as e:
+                RETRIES.inc(reason="retry_after")
+                logger.warning(f"Telegram flood control; retrying in {e.retry_after}s")
+                pacer.defer(float(e.retry_after))
+            except (BadRequest, Forbidden):
+                raise
+            except NetworkError as e:
+                if not _unsent(e):
+                    raise
+                RETRIES.inc(reason=type(e.__cause__).__name__)
+                logger.warning(f"Telegram send failed ({e}); retrying in {backoff:.1f}s")
+                pacer.defer(backoff)
+                backoff = min(backoff * 2, OUTBOX_BACKOFF_MAX)
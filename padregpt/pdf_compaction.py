@@ -0,0 +1,156 @@
+"""
+Shrink PDFs before they are uploaded.
+
+Many of the channel PDFs are scans saved at print resolution with
+uncompressed cross-reference tables, XMP metadata and page thumbnails.
+None of that helps file search, which only reads the text, but all of it
+is uploaded and processed. `compact_pdf` rewrites a PDF with:
+
+- images above `PDF_COMPACT_MAX_DPI` (measured against the page they sit
+  on) downsampled and re-encoded as JPEG at `PDF_COMPACT_JPEG_QUALITY`;
+  bilevel, masked and unusual-colorspace images are left alone
+- document info, XMP metadata, page thumbnails and unused resources removed
+- streams recompressed and objects packed into object streams
+
+The result replaces the original only when it is smaller, so compaction
+never makes a file worse. `compact_all` runs one process per core, since
+the work is CPU-bound. Needs pikepdf and Pillow (both optional, see
+requirements-compact.txt).
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from padregpt.corpus import CorpusError
+
+PDF_COMPACT_MAX_DPI = float(os.getenv("PDF_COMPACT_MAX_DPI", "150"))
+PDF_COMPACT_JPEG_QUALITY = int(os.getenv("PDF_COMPACT_JPEG_QUALITY", "75"))
+PDF_COMPACT_WORKERS = int(os.getenv("PDF_COMPACT_WORKERS") or 0) or os.cpu_count() or 1
+
+# Smaller images aren't worth re-encoding
+MIN_IMAGE_PIXELS = 64 * 64
+
+
+@dataclass
+class CompactResult:
+    path: Path
+    before: int
+    after: int
+    images: int = 0  # Images downsampled
+    error: Optional[str] = None
+
+    @property
+    def saved(self) -> int:
+        return self.before - self.after
+
+
+def _require() -> tuple[Any, Any]:
+    try:
+        import pikepdf
+        from PIL import Image
+    except ImportError as e:
+        raise CorpusError(
+            "PDF compaction needs pikepdf and Pillow (pip install -r requirements-compact.txt)"
+        ) from e
+    return pikepdf, Image
+
+
+def _downsample(
+    pikepdf: Any, Image: Any, image: Any, page_width_pt: float, max_dpi: float, quality: int
+) -> bool:
+    """Re-encode one image XObject in place if it exceeds `max_dpi`; True if it did."""
+    if image.get("/ImageMask") or "/Mask" in image or "/Decode" in image:
+        return False
+    if image.get("/BitsPerComponent", 8) != 8:
+        return False
+    width, height = int(image.Width), int(image.Height)
+    if width * height < MIN_IMAGE_PIXELS or page_width_pt <= 0:
+        return False
+    # An image spanning at most the page width can't be shown at less than this
+    dpi = width / (page_width_pt / 72)
+    if dpi <= max_dpi:
+        return False
+    try:
+        pil = pikepdf.PdfImage(image).as_pil_image()
+    except (NotImplementedError, pikepdf.PdfError, ValueError, OSError):
+        return False  # A filter or colorspace Pillow can't decode
+    if pil.mode not in ("L", "RGB"):
+        return False
+    scale = max_dpi / dpi
+    pil = pil.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    buffer = io.BytesIO()
+    pil.save(buffer, format="JPEG", quality=quality, optimize=True)
+    data = buffer.getvalue()
+    if len(data) >= len(image.read_raw_bytes()):
+        return False
+    image.write(data, filter=pikepdf.Name.DCTDecode)
+    image.Width, image.Height = pil.width, pil.height
+    image.ColorSpace = pikepdf.Name.DeviceGray if pil.mode == "L" else pikepdf.Name.DeviceRGB
+    image.BitsPerComponent = 8
+    if "/DecodeParms" in image:
+        del image.DecodeParms
+    return True
+
+
+def compact_pdf(
+    path: Path, max_dpi: float = PDF_COMPACT_MAX_DPI, quality: int = PDF_COMPACT_JPEG_QUALITY
+) -> CompactResult:
+    """Compact `path` in place, keeping the original if the rewrite isn't smaller."""
+    path = Path(path)
+    before = path.stat().st_size
+    try:
+        pikepdf, Image = _require()
+        tmp = path.with_name(path.name + ".compact")
+        images = 0
+        with pikepdf.open(path) as pdf:
+            seen: set[tuple[int, int]] = set()
+            for page in pdf.pages:
+                page_width = float(page.mediabox[2]) - float(page.mediabox[0])
+                # Includes images drawn through form XObjects; shared ones are visited once
+                for image in page.get_images().values():
+                    if image.objgen in seen:
+                        continue
+                    seen.add(image.objgen)
+                    images += _downsample(pikepdf, Image, image, page_width, max_dpi, quality)
+                if "/Thumb" in page.obj:
+                    del page.obj.Thumb
+                if "/PieceInfo" in page.obj:
+                    del page.obj.PieceInfo
+            if "/Metadata" in pdf.Root:
+                del pdf.Root.Metadata
+            if "/Info" in pdf.trailer:
+                del pdf.trailer.Info
+            pdf.remove_unreferenced_resources()
+            pdf.save(
+                tmp,
+                compress_streams=True,
+                recompress_flate=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            )
+        after = tmp.stat().st_size
+        if after < before:
+            tmp.replace(path)
+        else:
+            tmp.unlink()
+            after = before
+        return CompactResult(path, before, after, images)
+    except Exception as e:  # One bad PDF shouldn't stop the batch; it is uploaded as is
+        path.with_name(path.name + ".compact").unlink(missing_ok=True)
+        return CompactResult(path, before, before, error=f"{type(e).__name__}: {e}")
+
+
+def compact_all(
+    paths: Iterable[Path],
+    workers: int = PDF_COMPACT_WORKERS,
+    max_dpi: float = PDF_COMPACT_MAX_DPI,
+    quality: int = PDF_COMPACT_JPEG_QUALITY,
+) -> Iterable[CompactResult]:
+    """Compact `paths` in parallel, yielding results in the order given."""
+    paths = list(paths)
+    _require()  # Fail once up front rather than once per file
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths) or 1)) as pool:
+        yield from pool.map(compact_pdf, paths, [max_dpi] * len(paths), [quality] * len(paths))
@@ -0,0 +1,235 @@
+"""
+Local BM25 retrieval over the downloaded corpus.
+
+Used by the chat-completions backend instead of the hosted file_search
+tool: passages are found in-process, so answering costs a single API call.
+The index is built once from `CORPUS_DIR` and cached to disk; it is rebuilt
+whenever a corpus file is added, removed, or modified.
+"""
+
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from padregpt import metrics
+from padregpt.assistant_config import CORPUS_DIR, REPO_ROOT
+
+try:  # Optional: PDFs are skipped (plain-text sources still indexed) without it
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - depends on environment
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = Path(os.getenv("RETRIEVAL_INDEX_PATH") or REPO_ROOT / "state" / "retrieval_index.pkl")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+CHUNK_CHARS = 1500
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+INDEX_CACHE = metrics.counter(
+    "padregpt_retrieval_index_cache_total",
+    "Retrieval index loads, by result (hit = reused from disk, miss = rebuilt).",
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its "
+    "of on or our she that the their them they this to was we were what when "
+    "which who will with you your".split()
+)
+
+
+@dataclass(frozen=True)
+class Passage:
+    source: str
+    text: str
+    score: float = 0.0
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _read_text(path: Path) -> str:
+    if path.suffix.lower() == ".txt":
+        return path.read_text(encoding="utf-8", errors="ignore")
+    if path.suffix.lower() == ".pdf" and PdfReader is not None:
+        try:
+            reader = PdfReader(str(path))
+            return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+        except Exception as e:
+            logger.warning(f"Could not read {path.name}: {e}")
+    return ""
+
+
+def _chunks(text: str) -> Iterator[str]:
+    """Group paragraphs into ~CHUNK_CHARS passages (hard-splitting huge ones)."""
+    buf: list[str] = []
+    size = 0
+    for para in re.split(r"\n\s*\n", text):
+        para = " ".join(para.split())
+        if not para:
+            continue
+        while len(para) > CHUNK_CHARS:
+            yield para[:CHUNK_CHARS]
+            para = para[CHUNK_CHARS:]
+        if size + len(para) > CHUNK_CHARS and buf:
+            yield "\n\n".join(buf)
+            buf, size = [], 0
+        buf.append(para)
+        size += len(para) + 2
+    if buf:
+        yield "\n\n".join(buf)
+
+
+def _corpus_files(corpus_dir: Path) -> list[Path]:
+    suffixes = {".txt", ".pdf"} if PdfReader is not None else {".txt"}
+    return sorted(p for p in corpus_dir.rglob("*") if p.is_file() and p.suffix.lower() in suffixes)
+
+
+def _signature(files: list[Path]) -> tuple:
+    return tuple((p.name, p.stat().st_size, p.stat().st_mtime_ns) for p in files)
+
+
+class Retriever:
+    """In-memory inverted index with BM25 scoring."""
+
+    def __init__(
+        self,
+        sources: list[str],
+        chunk_sources: list[int],
+        chunks: list[str],
+        postings: dict[str, list[tuple[int, int]]],
+        lengths: list[int],
+        signature: tuple = (),
+    ) -> None:
+        self.sources = sources
+        self.chunk_sources = chunk_sources
+        self.chunks = chunks
+        self.postings = postings
+        self.lengths = lengths
+        self.signature = signature
+        self.avg_len = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, corpus_dir: Path = CORPUS_DIR) -> "Retriever":
+        files = _corpus_files(corpus_dir)
+        sources: list[str] = []
+        chunk_sources: list[int] = []
+        chunks: list[str] = []
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths: list[int] = []
+
+        for path in files:
+            source_idx = len(sources)
+            sources.append(path.name)
+            for chunk in _chunks(_read_text(path)):
+                doc_id = len(chunks)
+                terms = Counter(tokenize(chunk))
+                for term, tf in terms.items():
+                    postings.setdefault(term, []).append((doc_id, tf))
+                chunks.append(chunk)
+                chunk_sources.append(source_idx)
+                lengths.append(sum(terms.values()))
+
+        logger.info(f"Indexed {len(chunks)} passages from {len(files)} files")
+        return cls(sources, chunk_sources, chunks, postings, lengths, _signature(files))
+
+    @classmethod
+    def load(
+        cls, corpus_dir: Path = CORPUS_DIR, index_path: Path = INDEX_PATH
+    ) -> Optional["Retriever"]:
+        """The on-disk index, if it is still current for the corpus (never builds)."""
+        if not index_path.exists():
+            return None
+        signature = _signature(_corpus_files(corpus_dir)) if corpus_dir.exists() else ()
+        try:
+            with index_path.open("rb") as f:
+                cached = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable retrieval index: {e}")
+            return None
+        if cached.signature != signature:
+            return None
+        INDEX_CACHE.inc(result="hit")
+        return cached
+
+    @classmethod
+    def load_or_build(
+        cls, corpus_dir: Path = CORPUS_DIR, index_path: Path = INDEX_PATH
+    ) -> "Retriever":
+        """Reuse the on-disk index if the corpus hasn't changed since it was built."""
+        cached = cls.load(corpus_dir, index_path)
+        if cached is not None:
+            return cached
+
+        INDEX_CACHE.inc(result="miss")
+        retriever = cls.build(corpus_dir) if corpus_dir.exists() else cls([], [], [], {}, [])
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        with index_path.open("wb") as f:
+            pickle.dump(retriever, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return retriever
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> list[Passage]:
+        n_docs = len(self.chunks)
+        if not n_docs:
+            return []
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            df = len(docs)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in docs:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / self.avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            Passage(self.sources[self.chunk_sources[doc_id]], self.chunks[doc_id], score)
+            for doc_id, score in best
+        ]
+
+
+_retriever: Optional[Retriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever() -> Retriever:
+    """Process-wide retriever, loaded (or built) on first use."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = Retriever.load_or_build()
+        return _retriever
+
+
+def cached_retriever() -> Optional[Retriever]:
+    """The process-wide retriever if it can be had without building an index.
+
+    Returns None while another thread is building one, or when the on-disk
+    index is missing or out of date.
+    """
+    global _retriever
+    if _retriever is not None:
+        return _retriever
+    if not _retriever_lock.acquire(blocking=False):
+        return None  # Being loaded or built right now
+    try:
+        if _retriever is None:
+            _retriever = Retriever.load()
+        return _retriever
+    finally:
+        _retriever_lock.release()
@@ -0,0 +1,157 @@
+"""
+Run executor with adaptive polling and a hard deadline.
+
+Replaces `runs.create_and_poll`, which polls at a fixed interval and never
+gives up. Here polling starts fast (most answers finish in a few seconds)
+and backs off geometrically, the run is cancelled once the deadline
+passes, and `requires_action` / `incomplete` are handled instead of
+spinning forever.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any
+
+from openai import AsyncOpenAI, OpenAI
+
+from padregpt import metrics
+
+logger = logging.getLogger(__name__)
+
+RUN_TIMEOUT_SECONDS = float(os.getenv("RUN_TIMEOUT_SECONDS", "90"))
+POLL_INITIAL_SECONDS = float(os.getenv("RUN_POLL_INITIAL_SECONDS", "0.25"))
+POLL_MAX_SECONDS = float(os.getenv("RUN_POLL_MAX_SECONDS", "2.0"))
+POLL_BACKOFF = 1.5
+
+# `incomplete` is terminal but still carries a (truncated) answer
+TERMINAL_STATUSES = {"completed", "incomplete", "failed", "cancelled", "expired"}
+ANSWERED_STATUSES = {"completed", "incomplete"}
+
+# We register no function tools, so any tool call gets this stub output
+UNSUPPORTED_TOOL_OUTPUT = "This tool is not available. Answer from your files instead."
+
+RUN_SECONDS = metrics.histogram(
+    "padregpt_run_seconds",
+    "Wall time from run creation to a terminal status, by final status.",
+)
+RUN_POLLS = metrics.histogram(
+    "padregpt_run_polls",
+    "Number of runs.retrieve() polls per run, by final status.",
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+
+
+class RunTimeoutError(RuntimeError):
+    """The run did not finish before the deadline and was cancelled."""
+
+
+class RunFailedError(RuntimeError):
+    """The run ended without an answer (failed, cancelled, or expired)."""
+
+    def __init__(self, run: Any) -> None:
+        super().__init__(f"Assistant run failed: {run.status}")
+        self.run = run
+
+
+def _next_delay(delay: float) -> float:
+    return min(delay * POLL_BACKOFF, POLL_MAX_SECONDS)
+
+
+def _tool_outputs(run: Any) -> list[dict[str, str]]:
+    calls = run.required_action.submit_tool_outputs.tool_calls
+    return [{"tool_call_id": call.id, "output": UNSUPPORTED_TOOL_OUTPUT} for call in calls]
+
+
+def _record(run: Any, polls: int, start: float) -> None:
+    RUN_SECONDS.observe(time.monotonic() - start, status=run.status)
+    RUN_POLLS.observe(polls, status=run.status)
+    if run.status == "incomplete" and run.incomplete_details:
+        logger.warning(f"Run {run.id} incomplete: {run.incomplete_details.reason}")
+
+
+def execute_run(
+    client: OpenAI,
+    thread_id: str,
+    assistant_id: str,
+    timeout: float = RUN_TIMEOUT_SECONDS,
+    **run_kwargs: Any,
+) -> Any:
+    """Create a run and poll it to a terminal status, cancelling on timeout."""
+    start = time.monotonic()
+    deadline = start + timeout
+    run = client.beta.threads.runs.create(
+        thread_id=thread_id, assistant_id=assistant_id, **run_kwargs
+    )
+    delay = POLL_INITIAL_SECONDS
+    polls = 0
+
+    while run.status not in TERMINAL_STATUSES:
+        if run.status == "requires_action":
+            run = client.beta.threads.runs.submit_tool_outputs(
+                thread_id=thread_id, run_id=run.id, tool_outputs=_tool_outputs(run)
+            )
+            delay = POLL_INITIAL_SECONDS
+            continue
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            try:
+                client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            except Exception as e:
+                logger.warning(f"Failed to cancel run {run.id}: {e}")
+            RUN_SECONDS.observe(time.monotonic() - start, status="timeout")
+            RUN_POLLS.observe(polls, status="timeout")
+            raise RunTimeoutError(f"Run {run.id} exceeded {timeout:.0f}s")
+
+        time.sleep(min(delay, remaining))
+        delay = _next_delay(delay)
+        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+        polls += 1
+
+    _record(run, polls, start)
+    return run
+
+
+async def aexecute_run(
+    client: AsyncOpenAI,
+    thread_id: str,
+    assistant_id: str,
+    timeout: float = RUN_TIMEOUT_SECONDS,
+    **run_kwargs: Any,
+) -> Any:
+    """Async variant of `execute_run()`."""
+    start = time.monotonic()
+    deadline = start + timeout
+    run = await client.beta.threads.runs.create(
+        thread_id=thread_id, assistant_id=assistant_id, **run_kwargs
+    )
+    delay = POLL_INITIAL_SECONDS
+    polls = 0
+
+    while run.status not in TERMINAL_STATUSES:
+        if run.status == "requires_action":
+            run = await client.beta.threads.runs.submit_tool_outputs(
+                thread_id=thread_id, run_id=run.id, tool_outputs=_tool_outputs(run)
+            )
+            delay = POLL_INITIAL_SECONDS
+            continue
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            try:
+                await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            except Exception as e:
+                logger.warning(f"Failed to cancel run {run.id}: {e}")
+            RUN_SECONDS.observe(time.monotonic() - start, status="timeout")
+            RUN_POLLS.observe(polls, status="timeout")
+            raise RunTimeoutError(f"Run {run.id} exceeded {timeout:.0f}s")
+
+        await asyncio.sleep(min(delay, remaining))
+        delay = _next_delay(delay)
+        run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+        polls += 1
+
+    _record(run, polls, start)
+    return run
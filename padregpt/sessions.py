@@ -0,0 +1,332 @@
+"""
+Web chat sessions kept outside the Streamlit process.
+
+`st.session_state` lives in one server process for as long as the tab is
+open, which pins each user to a replica and grows memory with every idle
+tab. Sessions are instead stored in SQLite (shared by every web worker
+that can see `SESSION_DB_PATH`) as zlib-compressed JSON, keyed by the
+browser's session cookie. A small in-memory LRU sits in front and is
+revalidated against the store on every load. Messages that scroll out of
+the `MessageLog` window are written as pages and only read back on
+request. Sessions idle past `SESSION_IDLE_SECONDS` are deleted.
+
+Whoever answers in a session holds its lease (`acquire`/`release`) from
+loading it to saving the reply, so two workers can't run the same
+conversation at once or overwrite each other's turns. A lease expires
+after `SESSION_LEASE_SECONDS` in case its holder dies.
+"""
+
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from padregpt import metrics
+from padregpt.assistant_config import REPO_ROOT
+from padregpt.backends import Conversation
+from padregpt.compaction import Compacted
+from padregpt.message_log import Message, MessageLog
+
+logger = logging.getLogger(__name__)
+
+SESSION_DB_PATH = Path(os.getenv("SESSION_DB_PATH") or REPO_ROOT / "state" / "sessions.sqlite3")
+SESSION_COOKIE = "padregpt_session"
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "500"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", str(7 * 24 * 3600)))
+# How often a worker sweeps the store for idle sessions
+SESSION_SWEEP_SECONDS = 600
+# Longer than any one turn (RUN_TIMEOUT_SECONDS plus saving)
+SESSION_LEASE_SECONDS = float(os.getenv("SESSION_LEASE_SECONDS", "300"))
+
+SESSION_LOADS = metrics.counter(
+    "padregpt_session_loads_total",
+    "Web sessions looked up, by result (cached, stored, new).",
+)
+SESSIONS_CACHED = metrics.gauge(
+    "padregpt_sessions_cached",
+    "Web sessions held in this process's in-memory cache.",
+)
+SESSIONS_EVICTED = metrics.counter(
+    "padregpt_sessions_evicted_total",
+    "Web sessions deleted from the store after going idle.",
+)
+SESSION_MESSAGE_BYTES = metrics.gauge(
+    "padregpt_session_message_bytes",
+    "Bytes of message text held by this process's cached sessions (after compression).",
+)
+PROCESS_RSS_BYTES = metrics.gauge(
+    "padregpt_process_resident_bytes",
+    "Resident set size of this process.",
+)
+
+
+@dataclass
+class Session:
+    """Everything one browser's chat needs between reruns."""
+
+    id: str
+    conversation: Conversation = field(default_factory=Conversation)
+    messages: MessageLog = field(default_factory=MessageLog)
+    updated: float = 0.0  # When this copy was last saved (store clock)
+
+    def reset(self) -> None:
+        self.conversation = Conversation()
+        self.messages = MessageLog()
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def is_session_id(value: Optional[str]) -> bool:
+    return bool(value) and len(value) <= 64 and value.replace("-", "").replace("_", "").isalnum()
+
+
+def _finished_compaction(pending: Any) -> Optional[Compacted]:
+    if pending is None or not pending.done() or pending.cancelled() or pending.exception():
+        return None
+    return pending.result()
+
+
+def _dump(session: Session) -> bytes:
+    conversation = session.conversation
+    # A finished compaction is kept so whichever worker answers next switches
+    # threads; one still running is dropped (the next long turn starts another)
+    compacted = _finished_compaction(conversation.compaction)
+    state = {
+        "conversation": {
+            "thread_id": conversation.thread_id,
+            "history": conversation.history,
+            "turns": conversation.turns,
+            "unposted": conversation.unposted,
+            "compacted": asdict(compacted) if compacted else None,
+        },
+        "messages": session.messages.to_json(),
+    }
+    return zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+
+
+def _load(session_id: str, data: bytes) -> Session:
+    state: dict[str, Any] = json.loads(zlib.decompress(data))
+    compacted = state["conversation"].pop("compacted", None)
+    conversation = Conversation(**state["conversation"])
+    if compacted:
+        conversation.compaction = Future()
+        conversation.compaction.set_result(Compacted(**compacted))
+    messages = state["messages"]
+    if isinstance(messages, list):  # Stored before messages were paged
+        messages = {"messages": [[m["role"], m["content"]] for m in messages]}
+    return Session(session_id, conversation, MessageLog.from_json(messages))
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource  # Peak, not current, RSS (KiB on Linux, bytes on macOS)
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SessionStore:
+    """SQLite-backed sessions with an in-memory LRU of live objects."""
+
+    def __init__(
+        self,
+        path: Path = SESSION_DB_PATH,
+        cache_size: int = SESSION_CACHE_SIZE,
+        idle_seconds: float = SESSION_IDLE_SECONDS,
+    ) -> None:
+        self.path = path
+        self.cache_size = cache_size
+        self.idle_seconds = idle_seconds
+        self._cache: OrderedDict[str, Session] = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(id TEXT PRIMARY KEY, data BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_pages "
+            "(id TEXT NOT NULL, seq INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (id, seq))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_leases "
+            "(id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """The stored session for `session_id`; None if it was never saved or has expired."""
+        self._maybe_sweep()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            session = self._cache.get(session_id)
+            # Another worker may have saved a newer copy since we cached ours
+            if session is not None and row[0] <= session.updated:
+                self._cache.move_to_end(session_id)
+                SESSION_LOADS.inc(result="cached")
+                return session
+            updated, data = self._db.execute(
+                "SELECT updated, data FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        session = _load(session_id, data)
+        session.updated = updated
+        SESSION_LOADS.inc(result="stored")
+        self._remember(session)
+        return session
+
+    def load(self, session_id: str) -> Session:
+        """The stored session for `session_id`, or a new empty one."""
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._cache.get(session_id)  # Started here but not saved yet
+        if session is not None:
+            SESSION_LOADS.inc(result="cached")
+        else:
+            session = Session(session_id)
+            SESSION_LOADS.inc(result="new")
+        self._remember(session)
+        return session
+
+    def save(self, session: Session) -> None:
+        """Write the session (and any newly paged-out messages) through to the store."""
+        data = _dump(session)
+        pages = session.messages.pending_pages
+        session.updated = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._write(session, data, pages)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        pages.clear()
+        self._remember(session)
+
+    def _write(self, session: Session, data: bytes, pages: list[Message]) -> None:
+        if pages:
+            page = [m.to_json() for m in pages]
+            self._db.execute(
+                "INSERT OR REPLACE INTO session_pages (id, seq, data) VALUES (?, ?, ?)",
+                (
+                    session.id,
+                    session.messages.paged_out - len(pages),
+                    zlib.compress(json.dumps(page, separators=(",", ":")).encode("utf-8")),
+                ),
+            )
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (id, data, updated) VALUES (?, ?, ?)",
+            (session.id, data, session.updated),
+        )
+
+    def acquire(self, session_id: str, owner: str, seconds: float = SESSION_LEASE_SECONDS) -> bool:
+        """Take (or renew) the session's lease for `owner`; False if someone else holds it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO session_leases (id, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE session_leases.owner = excluded.owner OR session_leases.expires < ?",
+                (session_id, owner, now + seconds, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, session_id: str, owner: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM session_leases WHERE id = ? AND owner = ?", (session_id, owner)
+            )
+
+    def older_messages(self, session: Session) -> list[Message]:
+        """Messages paged out of the session's log, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM session_pages WHERE id = ? ORDER BY seq", (session.id,)
+            ).fetchall()
+        return [
+            Message(role, content)
+            for (data,) in rows
+            for role, content in json.loads(zlib.decompress(data))
+        ]
+
+    def reset(self, session: Session) -> None:
+        """Start the session over, dropping its paged-out messages."""
+        with self._lock:
+            self._db.execute("DELETE FROM session_pages WHERE id = ?", (session.id,))
+        session.reset()
+        self.save(session)
+
+    def memory_report(self) -> dict[str, int]:
+        """What this process holds for web sessions; also exported as metrics."""
+        with self._lock:
+            logs = [s.messages for s in self._cache.values()]
+        report = {
+            "sessions": len(logs),
+            "messages": sum(len(log) for log in logs),
+            "message_bytes": sum(log.nbytes for log in logs),
+            "rss_bytes": _rss_bytes(),
+        }
+        SESSION_MESSAGE_BYTES.set(report["message_bytes"])
+        PROCESS_RSS_BYTES.set(report["rss_bytes"])
+        return report
+
+    def _remember(self, session: Session) -> None:
+        with self._lock:
+            self._cache[session.id] = session
+            self._cache.move_to_end(session.id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            SESSIONS_CACHED.set(len(self._cache))
+
+    def evict_idle(self) -> int:
+        """Delete sessions idle for longer than `idle_seconds`."""
+        cutoff = time.time() - self.idle_seconds
+        with self._lock:
+            stale = [
+                row[0]
+                for row in self._db.execute("SELECT id FROM sessions WHERE updated < ?", (cutoff,))
+            ]
+            self._db.execute("DELETE FROM sessions WHERE updated < ?", (cutoff,))
+            self._db.executemany(
+                "DELETE FROM session_pages WHERE id = ?", [(i,) for i in stale]
+            )
+            self._db.execute("DELETE FROM session_leases WHERE expires < ?", (time.time(),))
+            for session_id in stale:
+                self._cache.pop(session_id, None)
+            SESSIONS_CACHED.set(len(self._cache))
+        if stale:
+            SESSIONS_EVICTED.inc(len(stale))
+        return len(stale)
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep >= SESSION_SWEEP_SECONDS:
+            self._last_sweep = now
+            evicted = self.evict_idle()
+            # The memory gauges are refreshed once per sweep, not on every save
+            report = self.memory_report()
+            if evicted:
+                logger.info(f"Evicted {evicted} idle session(s); {report}")
@@ -0,0 +1,124 @@
+"""
+Single-flight coalescing of identical first-turn questions.
+
+When a topic circulates (a feast day, a news story), many users open with
+the same question within seconds. `CoalescingBackend` wraps a backend so
+that while one first-turn answer for a normalized prompt is in flight,
+identical first-turn prompts wait for it instead of starting their own
+run. Each waiter's conversation then adopts the shared turn, so follow-up
+questions still have it as context.
+
+Only questions that start a conversation are shared: later turns depend
+on each user's own history.
+"""
+
+import asyncio
+import os
+import re
+import threading
+from typing import Any, Optional
+
+from padregpt import metrics, tracing
+
+COALESCE_FIRST_TURN = os.getenv("COALESCE_FIRST_TURN", "true").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+COALESCED = metrics.counter(
+    "padregpt_coalesced_total",
+    "First-turn questions answered by joining an identical in-flight request, by backend.",
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(prompt: str) -> str:
+    """Case, punctuation and spacing don't change the question."""
+    return " ".join(_WORD.findall(prompt.casefold()))
+
+
+def _is_first_turn(conversation: Any) -> bool:
+    return (
+        conversation.turns == 0
+        and conversation.thread_id is None
+        and not conversation.history
+        and not conversation.unposted
+    )
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.reply: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class CoalescingBackend:
+    """Shares in-flight first-turn answers between identical prompts."""
+
+    def __init__(self, backend: Any) -> None:
+        self.backend = backend
+        self.name = backend.name
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._tasks: dict[str, asyncio.Future] = {}
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.backend, attr)
+
+    def ask(self, conversation: Any, prompt: str) -> Any:
+        if not _is_first_turn(conversation):
+            return self.backend.ask(conversation, prompt)
+
+        key = normalize(prompt)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED.inc(backend=self.name)
+            with tracing.span("coalesced.wait", backend=self.name):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            self.backend.adopt(conversation, prompt, call.reply)
+            return call.reply
+
+        try:
+            call.reply = self.backend.ask(conversation, prompt)
+            return call.reply
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def aask(self, conversation: Any, prompt: str) -> Any:
+        if not _is_first_turn(conversation):
+            return await self.backend.aask(conversation, prompt)
+
+        key = normalize(prompt)
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.backend.aask(conversation, prompt))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            # Shielded: the leader giving up must not cancel the run for everyone else
+            return await asyncio.shield(task)
+
+        COALESCED.inc(backend=self.name)
+        with tracing.span("coalesced.wait", backend=self.name):
+            reply = await asyncio.shield(task)
+        self.backend.adopt(conversation, prompt, reply)
+        return reply
+
+
+def coalescing(backend: Any) -> Any:
+    """Wrap `backend` unless COALESCE_FIRST_TURN is off."""
+    return CoalescingBackend(backend) if COALESCE_FIRST_TURN else backend
@@ -0,0 +1,266 @@
+"""
+Markdown answers -> Telegram HTML messages.
+
+Answers are written in ordinary Markdown (bold, italics, links, lists,
+quotes, fenced code), which Telegram's legacy "Markdown" parse mode only
+partly understands; a stray `*` or `_` makes it reject the whole message.
+Here the answer is converted to Telegram's HTML parse mode, where only
+`<`, `>` and `&` need escaping, and split into messages at block
+boundaries (paragraph > line > word) so no entity spans two messages.
+
+The source is read once, line by line; each block is rendered and packed
+into the current message as soon as it is complete. Lengths are counted
+in UTF-16 code units, as Telegram counts them. A tag too long to reopen
+in every piece of a split (a link with a huge URL) is dropped, and a
+link's URL follows its text instead.
+"""
+
+import html
+import re
+from typing import Iterator, Optional
+
+# Telegram rejects messages longer than 4096 characters (UTF-16 code units)
+MESSAGE_LIMIT = 4096
+# Share of a message one tag (opening plus closing) may take before it is dropped
+MAX_TAG_SHARE = 8
+
+_FENCE = re.compile(r"^\s*(```|~~~)\s*([\w+-]*)\s*$")
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$")
+_QUOTE = re.compile(r"^\s{0,3}>\s?(.*)$")
+_BULLET = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+_RULE = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+
+# Inline spans, tried left to right; the first alternative that matches wins
+_INLINE = re.compile(
+    r"`(?P<code>[^`\n]+)`"
+    r"|\[(?P<label>[^\]\n]+)\]\((?P<url>https?://(?:[^()\s]|\([^()\s]*\))+)\)"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|__(?P<bold2>.+?)__"
+    r"|~~(?P<strike>.+?)~~"
+    r"|(?<![\w*])\*(?=\S)(?P<em>.+?)(?<=\S)\*(?![\w*])"
+    r"|(?<![\w_])_(?=\S)(?P<em2>.+?)(?<=\S)_(?![\w_])"
+)
+
+# Tags, entities and runs of text/whitespace in rendered HTML (for splitting)
+_HTML_TOKEN = re.compile(r"<[^>]+>|&[#\w]+;|\s+|[^<&\s]+")
+_TAG_NAME = re.compile(r"</?(\w+)")
+_HREF = re.compile(r'href="([^"]*)"')
+
+
+def _escape(text: str) -> str:
+    return html.escape(text, quote=False)
+
+
+def render_inline(text: str) -> str:
+    """Convert one line of inline Markdown to escaped Telegram HTML."""
+    out = []
+    pos = 0
+    for m in _INLINE.finditer(text):
+        out.append(_escape(text[pos : m.start()]))
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "code":
+            out.append(f"<code>{_escape(m['code'])}</code>")
+        elif kind in ("label", "url"):
+            out.append(f'<a href="{html.escape(m["url"])}">{render_inline(m["label"])}</a>')
+        elif kind in ("bold", "bold2"):
+            out.append(f"<b>{render_inline(m[kind])}</b>")
+        elif kind == "strike":
+            out.append(f"<s>{render_inline(m['strike'])}</s>")
+        else:
+            out.append(f"<i>{render_inline(m[kind])}</i>")
+    out.append(_escape(text[pos:]))
+    return "".join(out)
+
+
+def _render_line(line: str) -> str:
+    heading = _HEADING.match(line)
+    if heading:
+        return f"<b>{render_inline(heading.group(1))}</b>"
+    bullet = _BULLET.match(line)
+    if bullet:
+        return f"{bullet.group(1)}• {render_inline(bullet.group(2))}"
+    return render_inline(line)
+
+
+def iter_blocks(text: str) -> Iterator[str]:
+    """Yield rendered HTML blocks: paragraphs, quotes and code blocks."""
+    lines: list[str] = []
+    kind = None  # "para" | "quote" | "code"
+    fence = ""
+    language = ""
+
+    def flush() -> Iterator[str]:
+        if kind == "code":
+            attr = f' class="language-{language}"' if language else ""
+            yield f"<pre><code{attr}>{_escape(chr(10).join(lines))}</code></pre>"
+        elif kind == "quote":
+            yield "<blockquote>" + "\n".join(render_inline(l) for l in lines) + "</blockquote>"
+        elif lines:
+            yield "\n".join(_render_line(l) for l in lines)
+
+    for line in text.splitlines():
+        if kind == "code":
+            m = _FENCE.match(line)
+            if m and m.group(1) == fence and not m.group(2):
+                yield from flush()
+                lines, kind = [], None
+            else:
+                lines.append(line)
+            continue
+
+        m = _FENCE.match(line)
+        quote = _QUOTE.match(line)
+        if m:
+            yield from flush()
+            lines, kind, fence, language = [], "code", m.group(1), m.group(2)
+        elif not line.strip() or _RULE.match(line):
+            yield from flush()
+            lines, kind = [], None
+        elif quote:
+            if kind != "quote":
+                yield from flush()
+                lines, kind = [], "quote"
+            lines.append(quote.group(1))
+        else:
+            if kind != "para":
+                yield from flush()
+                lines, kind = [], "para"
+            lines.append(line)
+
+    # An unterminated fence still renders as code
+    yield from flush()
+
+
+def _units(text: str) -> int:
+    """Length as Telegram counts it (characters outside the BMP count twice)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _cut(text: str, room: int) -> int:
+    """Index of the longest prefix of `text` at most `room` UTF-16 units long."""
+    used = 0
+    for i, ch in enumerate(text):
+        used += 2 if ord(ch) > 0xFFFF else 1
+        if used > room:
+            return i
+    return len(text)
+
+
+def _tokens(block: str, limit: int) -> list[str]:
+    """Tokenize `block`, dropping tags too long to repeat in each split piece."""
+    tokens: list[str] = []
+    stack: list[Optional[str]] = []  # Per open tag: None if kept, else text to emit on close
+    for m in _HTML_TOKEN.finditer(block):
+        token = m.group()
+        if token.startswith("</"):
+            dropped = stack.pop()
+            if dropped is None:
+                tokens.append(token)
+            elif dropped:
+                tokens.extend(_HTML_TOKEN.findall(dropped))
+        elif token.startswith("<"):
+            name = _TAG_NAME.match(token).group(1)
+            if _units(token) + len(name) + 3 <= limit // MAX_TAG_SHARE:
+                stack.append(None)
+                tokens.append(token)
+            else:
+                href = _HREF.search(token)
+                stack.append(f" ({href.group(1)})" if href else "")
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def _split_block(block: str, limit: int) -> Iterator[str]:
+    """Cut an oversized block at a line break (else a space), closing and reopening open tags."""
+    stack: list[tuple[str, str]] = []  # (name, opening tag)
+    parts: list[str] = []
+    size = 0
+    line_break = None  # (index into parts, open tags there) of the last newline
+
+    def closing(tags) -> str:
+        return "".join(f"</{name}>" for name, _ in reversed(tags))
+
+    def reopening(tags) -> str:
+        return "".join(tag for _, tag in tags)
+
+    for token in _tokens(block, limit):
+        length = _units(token)
+        if token.startswith("</"):
+            stack.pop()
+            parts.append(token)
+            size += length
+            continue
+
+        tag = (_TAG_NAME.match(token).group(1), token) if token.startswith("<") else None
+        # An opening tag must fit along with its own closing tag
+        after = stack + [tag] if tag else stack
+        flushed = False
+        # Cutting at the last line break can still leave too much; then cut here too
+        while size + length + _units(closing(after)) > limit and size > _units(reopening(stack)):
+            if line_break:
+                index, tags = line_break
+                yield "".join(parts[:index]).rstrip() + closing(tags)
+                parts = [reopening(tags)] + parts[index + 1 :]
+            else:
+                yield "".join(parts).rstrip() + closing(stack)
+                parts = [reopening(stack)]
+            size = sum(map(_units, parts))
+            line_break = None
+            flushed = True
+        if flushed and token.isspace() and len(parts) == 1:
+            continue
+
+        if tag:
+            stack.append(tag)
+            parts.append(token)
+            size += length
+            continue
+
+        # A single word longer than a whole message: hard cut
+        while size + length + _units(closing(stack)) > limit:
+            room = limit - size - _units(closing(stack))
+            cut = _cut(token, room)
+            if cut == 0 or token.startswith("&"):
+                break
+            yield "".join(parts) + token[:cut] + closing(stack)
+            token = token[cut:]
+            length = _units(token)
+            parts = [reopening(stack)]
+            size = _units(parts[0])
+
+        if "\n" in token:
+            line_break = (len(parts), list(stack))
+        parts.append(token)
+        size += length
+
+    text = "".join(parts).rstrip()
+    if text and text != reopening(stack):
+        yield text
+
+
+def iter_messages(text: str, limit: int = MESSAGE_LIMIT) -> Iterator[str]:
+    """Yield Telegram HTML messages of at most `limit` characters."""
+    current = ""
+    for block in iter_blocks(text):
+        pieces = [block] if _units(block) <= limit else _split_block(block, limit)
+        for piece in pieces:
+            if current and _units(current) + 2 + _units(piece) <= limit:
+                current += "\n\n" + piece
+                continue
+            if current:
+                yield current
+            current = piece
+    if current:
+        yield current
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> list[str]:
+    """All messages for an answer; at least one, even for empty text."""
+    return list(iter_messages(text, limit)) or [_escape(text) or "…"]
+
+
+def to_plain(message: str) -> str:
+    """Strip tags from a rendered message, for resending without parse mode."""
+    return html.unescape(re.sub(r"<[^>]+>", "", message))
@@ -0,0 +1,145 @@
+"""
+Pre-warmed pool of empty Assistants threads.
+
+Creating a thread is a full API round trip that otherwise lands on a
+user's first message. The pool keeps a few unused threads ready, refills
+them on a background thread, and discards any that sat unused past their
+TTL. Both front-ends go through `acquire()` / `aacquire()`.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from openai import OpenAI
+
+from padregpt import metrics
+from padregpt.transport import openai_http_client
+
+logger = logging.getLogger(__name__)
+
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "2"))
+THREAD_POOL_TTL_SECONDS = float(os.getenv("THREAD_POOL_TTL_SECONDS", "3600"))
+
+POOL_ACQUIRES = metrics.counter(
+    "padregpt_thread_pool_acquires_total",
+    "Threads handed out, by result (hit = pre-warmed, cold = created inline).",
+)
+POOL_EXPIRED = metrics.counter(
+    "padregpt_thread_pool_expired_total",
+    "Pre-warmed threads discarded because they outlived the pool TTL.",
+)
+POOL_READY = metrics.gauge(
+    "padregpt_thread_pool_ready",
+    "Pre-warmed threads currently waiting in the pool.",
+)
+THREAD_CREATE_SECONDS = metrics.histogram(
+    "padregpt_thread_create_seconds",
+    "Latency of threads.create() calls, by origin (refill or cold).",
+)
+
+
+class ThreadPool:
+    """Keeps up to `size` pre-created, unused thread IDs ready."""
+
+    def __init__(
+        self,
+        client: OpenAI,
+        size: int = THREAD_POOL_SIZE,
+        ttl: float = THREAD_POOL_TTL_SECONDS,
+    ) -> None:
+        self._client = client
+        self._size = size
+        self._ttl = ttl
+        self._ready: deque[tuple[float, str]] = deque()  # (created_at, thread_id)
+        self._lock = threading.Lock()
+        self._filling = False
+
+    def _create(self, origin: str) -> str:
+        start = time.perf_counter()
+        thread = self._client.beta.threads.create()
+        THREAD_CREATE_SECONDS.observe(time.perf_counter() - start, origin=origin)
+        return thread.id
+
+    def _take_ready(self) -> Optional[str]:
+        """Pop the oldest non-expired thread, dropping stale ones."""
+        cutoff = time.monotonic() - self._ttl
+        with self._lock:
+            while self._ready:
+                created_at, thread_id = self._ready.popleft()
+                if created_at >= cutoff:
+                    POOL_READY.set(len(self._ready))
+                    return thread_id
+                POOL_EXPIRED.inc()
+            POOL_READY.set(0)
+        return None
+
+    def acquire(self) -> str:
+        """Return an unused thread ID, creating one inline only on a pool miss."""
+        thread_id = self._take_ready()
+        if thread_id is None:
+            POOL_ACQUIRES.inc(result="cold")
+            thread_id = self._create("cold")
+        else:
+            POOL_ACQUIRES.inc(result="hit")
+        self.refill()
+        return thread_id
+
+    async def aacquire(self) -> str:
+        """Async variant of `acquire()` that never blocks the event loop."""
+        thread_id = self._take_ready()
+        if thread_id is None:
+            POOL_ACQUIRES.inc(result="cold")
+            thread_id = await asyncio.to_thread(self._create, "cold")
+        else:
+            POOL_ACQUIRES.inc(result="hit")
+        self.refill()
+        return thread_id
+
+    def refill(self) -> None:
+        """Top the pool back up on a background thread (no-op if already filling)."""
+        with self._lock:
+            if self._filling or len(self._ready) >= self._size:
+                return
+            self._filling = True
+        threading.Thread(target=self._fill, name="thread-pool-refill", daemon=True).start()
+
+    def _fill(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if len(self._ready) >= self._size:
+                        return
+                thread_id = self._create("refill")
+                with self._lock:
+                    self._ready.append((time.monotonic(), thread_id))
+                    POOL_READY.set(len(self._ready))
+        except Exception as e:
+            # Best-effort: acquire() falls back to creating inline
+            logger.warning(f"Thread pool refill failed: {e}")
+        finally:
+            with self._lock:
+                self._filling = False
+
+
+_default_pool: Optional[ThreadPool] = None
+_default_lock = threading.Lock()
+
+
+def get_thread_pool(client: Optional[OpenAI] = None) -> ThreadPool:
+    """Return the process-wide pool, creating and warming it on first use."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            if client is None:
+                client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    http_client=openai_http_client("openai_pool"),
+                )
+            _default_pool = ThreadPool(client)
+            _default_pool.refill()
+        return _default_pool
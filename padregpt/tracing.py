@@ -0,0 +1,280 @@
+"""
+Structured tracing for the answer pipeline.
+
+Spans follow the OpenTelemetry model (trace/span/parent IDs, start/end in
+nanoseconds, attributes, status). `TRACING` selects the exporter:
+
+    off      no spans at all; `span()` returns a shared no-op (default)
+    console  one JSON line per finished span on stderr
+    file     JSON lines appended to TRACE_FILE
+    otel     hand spans to the OpenTelemetry API (configure its SDK/exporter
+             the usual way, e.g. via `opentelemetry-instrument`)
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACING = os.getenv("TRACING", "off").strip().lower()
+TRACE_FILE = Path(os.getenv("TRACE_FILE") or Path(__file__).resolve().parent.parent / "state" / "traces.jsonl")
+
+ENABLED = TRACING in ("console", "file", "otel")
+
+_current: ContextVar[Optional["Span"]] = ContextVar("padregpt_span", default=None)
+_write_lock = threading.Lock()
+_tracer: Any = None
+
+
+class Span:
+    """A finished-or-running unit of work (OTel-compatible fields)."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "OK"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def _export(span: Span) -> None:
+    line = json.dumps(span.to_dict(), default=str)
+    with _write_lock:
+        if TRACING == "console":
+            print(line, file=sys.stderr, flush=True)
+        else:
+            TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with TRACE_FILE.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class _NoopSpan:
+    """Returned when tracing is off: every operation is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, name: str, attributes: dict[str, Any]) -> None:
+        self._span = Span(name, _current.get(), attributes)
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc is not None:
+            self._span.record_exception(exc)
+        self._span.end_ns = time.time_ns()
+        _current.reset(self._token)
+        _export(self._span)
+
+
+def _otel_tracer() -> Any:
+    global _tracer
+    if _tracer is None:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer("padregpt")
+    return _tracer
+
+
+def configure(mode: str, path: Optional[Path] = None) -> None:
+    """Switch tracing at runtime (e.g. from a benchmark or the load tester)."""
+    global TRACING, ENABLED, TRACE_FILE
+    TRACING = mode.strip().lower()
+    ENABLED = TRACING in ("console", "file", "otel")
+    if path is not None:
+        TRACE_FILE = path
+    if TRACING == "otel":
+        try:
+            _otel_tracer()
+        except ImportError:
+            logger.warning("TRACING=otel but opentelemetry-api is not installed; tracing off")
+            TRACING, ENABLED = "off", False
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """Context manager for a child of the current span (no-op when tracing is off)."""
+    if not ENABLED:
+        return _NOOP
+    if TRACING == "otel":
+        return _otel_tracer().start_as_current_span(name, attributes=attributes)
+    return _SpanContext(name, attributes)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, parent: Any = None, **attributes: Any) -> None:
+    """Emit a span for work timed elsewhere (e.g. run steps reported by the API)."""
+    if not ENABLED:
+        return
+    if TRACING == "otel":
+        from opentelemetry import trace
+
+        context = trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = _otel_tracer().start_span(name, context=context, start_time=start_ns, attributes=attributes)
+        otel_span.end(end_time=end_ns)
+        return
+    s = Span(name, parent if parent is not None else _current.get(), attributes)
+    s.start_ns, s.end_ns = start_ns, end_ns
+    _export(s)
+
+
+def current_span() -> Any:
+    """The active span, to pass as `parent` to work finished on another thread/task."""
+    if not ENABLED:
+        return None
+    if TRACING == "otel":
+        from opentelemetry import trace
+
+        return trace.get_current_span()
+    return _current.get()
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator wrapping a sync or async function (or async generator) in a span."""
+
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            async def agen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not ENABLED:
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                    return
+                with span(span_name):
+                    async for item in fn(*args, **kwargs):
+                        yield item
+
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not ENABLED:
+                    return await fn(*args, **kwargs)
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+if TRACING == "otel":
+    configure("otel")
+
+
+# ---------------------------------------------------------------------------
+# Run steps (where file_search vs generation time goes)
+# ---------------------------------------------------------------------------
+
+
+def _seconds_ns(ts: Optional[int]) -> Optional[int]:
+    return ts * 1_000_000_000 if ts else None
+
+
+def _record_run(run: Any, steps: list[Any], parent: Any) -> None:
+    """Spans for queueing, each run step, and its tool calls (API timestamps are whole seconds)."""
+    created, started = _seconds_ns(run.created_at), _seconds_ns(run.started_at)
+    if created and started:
+        record_span("run.queued", created, started, parent, run_id=run.id)
+    for step in steps:
+        start = _seconds_ns(step.created_at)
+        end = _seconds_ns(step.completed_at or step.failed_at or step.cancelled_at)
+        if not (start and end):
+            continue
+        attrs = {"run_id": run.id, "step_id": step.id, "status": step.status}
+        if step.type == "tool_calls":
+            tools = [call.type for call in step.step_details.tool_calls]
+            record_span("run_step.tool_calls", start, end, parent, tools=",".join(tools), **attrs)
+        else:
+            record_span(f"run_step.{step.type}", start, end, parent, **attrs)
+
+
+def trace_run_steps(client: Any, thread_id: str, run: Any, parent: Any = None) -> None:
+    """List a finished run's steps and emit their spans (one extra API call)."""
+    if not ENABLED:
+        return
+    try:
+        steps = client.beta.threads.runs.steps.list(thread_id=thread_id, run_id=run.id, order="asc")
+        _record_run(run, steps.data, parent)
+    except Exception as e:
+        logger.warning(f"Could not trace run steps for {run.id}: {e}")
+
+
+async def atrace_run_steps(client: Any, thread_id: str, run: Any, parent: Any = None) -> None:
+    """Async variant of `trace_run_steps()`."""
+    if not ENABLED:
+        return
+    try:
+        steps = await client.beta.threads.runs.steps.list(thread_id=thread_id, run_id=run.id, order="asc")
+        _record_run(run, steps.data, parent)
+    except Exception as e:
+        logger.warning(f"Could not trace run steps for {run.id}: {e}")
@@ -0,0 +1,222 @@
+"""
+HTTP transport settings for the OpenAI and Telegram clients.
+
+Both SDKs default to conservative connection pools (Telegram's is a single
+connection for `getUpdates` and short keep-alive). Here pool size,
+keep-alive, timeouts, and HTTP/2 come from the environment, and every
+transport is instrumented so we can see when requests queue waiting for a
+free connection. With `HTTP_CASSETTE` set, traffic is recorded to or
+replayed from a cassette (see `padregpt.cassette`).
+"""
+
+import importlib.util
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+import httpx
+
+from padregpt import cassette, metrics
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+HTTP2 = os.getenv("HTTP2", "false").strip().lower() in ("1", "true", "yes")
+
+TELEGRAM_CONNECTION_POOL_SIZE = int(os.getenv("TELEGRAM_CONNECTION_POOL_SIZE", "64"))
+
+IN_FLIGHT = metrics.gauge(
+    "padregpt_http_in_flight",
+    "Requests holding (or waiting for) a pooled connection, by client.",
+)
+POOL_WAIT_SECONDS = metrics.histogram(
+    "padregpt_http_pool_wait_seconds",
+    "Time from request start until it had a connection to send on, by client.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+UPSTREAM_RATE_LIMITED = metrics.counter(
+    "padregpt_upstream_rate_limited_total",
+    "HTTP 429 responses received from the upstream API, by client.",
+)
+POOL_SATURATED = metrics.counter(
+    "padregpt_http_pool_saturated_total",
+    "Requests that started while every pooled connection was busy, by client.",
+)
+
+# First httpcore trace event that means the request has its connection
+_SENDING_EVENTS = (
+    "connection.connect_tcp.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+
+def _http2_enabled() -> bool:
+    if HTTP2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2=true but the 'h2' package is missing; using HTTP/1.1")
+        return False
+    return HTTP2
+
+
+def limits(max_connections: int = HTTP_MAX_CONNECTIONS) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(HTTP_MAX_KEEPALIVE, max_connections),
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT
+    )
+
+
+class _PoolProbe:
+    """Per-request bookkeeping: in-flight gauge plus time spent waiting for the pool."""
+
+    def __init__(self, name: str, max_connections: int) -> None:
+        self.name = name
+        self.start = time.perf_counter()
+        self.waited = False
+        if IN_FLIGHT.value(client=name) >= max_connections:
+            POOL_SATURATED.inc(client=name)
+        IN_FLIGHT.inc(client=name)
+
+    def on_event(self, event: str) -> None:
+        if not self.waited and event.startswith(_SENDING_EVENTS):
+            self.waited = True
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - self.start, client=self.name)
+
+    def done(self) -> None:
+        IN_FLIGHT.dec(client=self.name)
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    def __init__(self, stream: Any, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close()
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """`httpx.HTTPTransport` that reports pool usage for `name`."""
+
+    def __init__(self, name: str, max_connections: int = HTTP_MAX_CONNECTIONS, **kwargs: Any) -> None:
+        kwargs.setdefault("limits", limits(max_connections))
+        kwargs.setdefault("http2", _http2_enabled())
+        super().__init__(**kwargs)
+        self.name = name
+        self.max_connections = max_connections
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        probe = _PoolProbe(self.name, self.max_connections)
+        request.extensions = {**request.extensions, "trace": lambda event, info: probe.on_event(event)}
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            probe.done()
+            raise
+        if response.status_code == 429:
+            UPSTREAM_RATE_LIMITED.inc(client=self.name)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, probe.done),
+            extensions=response.extensions,
+        )
+
+
+class AsyncInstrumentedTransport(httpx.AsyncHTTPTransport):
+    """Async counterpart of `InstrumentedTransport`."""
+
+    def __init__(self, name: str, max_connections: int = HTTP_MAX_CONNECTIONS, **kwargs: Any) -> None:
+        kwargs.setdefault("limits", limits(max_connections))
+        kwargs.setdefault("http2", _http2_enabled())
+        super().__init__(**kwargs)
+        self.name = name
+        self.max_connections = max_connections
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        probe = _PoolProbe(self.name, self.max_connections)
+
+        async def trace(event: str, info: dict) -> None:
+            probe.on_event(event)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            probe.done()
+            raise
+        if response.status_code == 429:
+            UPSTREAM_RATE_LIMITED.inc(client=self.name)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncTrackedStream(response.stream, probe.done),
+            extensions=response.extensions,
+        )
+
+
+def openai_http_client(name: str = "openai") -> httpx.Client:
+    """Tuned `http_client` for `OpenAI(...)`."""
+    from openai import DefaultHttpxClient
+
+    transport = cassette.wrap(InstrumentedTransport(name), name)
+    return DefaultHttpxClient(transport=transport, timeout=timeout())
+
+
+def openai_async_http_client(name: str = "openai") -> httpx.AsyncClient:
+    """Tuned `http_client` for `AsyncOpenAI(...)`."""
+    from openai import DefaultAsyncHttpxClient
+
+    transport = cassette.wrap_async(AsyncInstrumentedTransport(name), name)
+    return DefaultAsyncHttpxClient(transport=transport, timeout=timeout())
+
+
+def telegram_request(name: str = "telegram", pool_size: Optional[int] = None):
+    """Tuned `HTTPXRequest` for `Application.builder().request(...)`."""
+    from telegram.request import HTTPXRequest
+
+    size = pool_size or TELEGRAM_CONNECTION_POOL_SIZE
+    http2 = _http2_enabled()
+    return HTTPXRequest(
+        connection_pool_size=size,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        http_version="2" if http2 else "1.1",
+        httpx_kwargs={
+            "transport": cassette.wrap_async(AsyncInstrumentedTransport(name, size, http2=http2), name)
+        },
+    )
@@ -0,0 +1,178 @@
+"""
+Memory-bounded file uploads.
+
+Every upload streams from disk: httpx reads the open file 64KB at a time
+while the request is sent, so nothing holds a whole book in memory. Files
+larger than `UPLOAD_MULTIPART_MB` go through the multipart Uploads API
+instead of one `files.create` request: the file is sent as
+`UPLOAD_PART_MB` parts, `UPLOAD_PART_CONCURRENCY` at a time, each part a
+window onto the file rather than a copy of it. Peak memory per upload is
+therefore a few chunk buffers whatever the file size.
+
+Parts that made it are remembered in `state/uploads.json` (keyed by path,
+size and mtime), so an upload that fails half way resumes with the missing
+parts on the next run instead of starting over, as long as the upload
+hasn't expired (the API keeps one for an hour).
+"""
+
+import io
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+from openai import OpenAI
+
+from padregpt import metrics
+from padregpt.assistant_config import REPO_ROOT
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_MULTIPART_MB = float(os.getenv("UPLOAD_MULTIPART_MB", "20"))
+# The API caps a part at 64MB; smaller parts resume with less to resend
+UPLOAD_PART_MB = float(os.getenv("UPLOAD_PART_MB", "8"))
+UPLOAD_PART_CONCURRENCY = int(os.getenv("UPLOAD_PART_CONCURRENCY", "4"))
+UPLOAD_STATE = REPO_ROOT / "state" / "uploads.json"
+# Leave margin before the API's one-hour expiry when deciding to resume
+UPLOAD_RESUME_MARGIN_SECONDS = 300
+
+UPLOAD_SECONDS = metrics.histogram(
+    "padregpt_upload_seconds",
+    "Time to upload one file, by method (single or multipart).",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+_state_lock = threading.Lock()
+
+
+class _FileWindow(io.RawIOBase):
+    """Read-only view of `length` bytes of a file starting at `offset`."""
+
+    def __init__(self, path: Path, offset: int, length: int) -> None:
+        self._f = path.open("rb")
+        self._offset = offset
+        self._length = length
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._length}[whence]
+        self._pos = min(max(base + pos, 0), self._length)
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self._length - self._pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        self._f.seek(self._offset + self._pos)
+        data = self._f.read(size)
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        self._f.close()
+        super().close()
+
+
+def _load_state(path: Path) -> dict[str, Any]:
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {}
+
+
+def _save_state(state: dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def _mime_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "text/plain"
+
+
+def upload_file(
+    client: OpenAI,
+    path: Path,
+    name: Optional[str] = None,
+    purpose: str = "assistants",
+    state_path: Path = UPLOAD_STATE,
+) -> str:
+    """Upload `path` (as `name`) and return the new file's ID."""
+    path = Path(path)
+    name = name or path.name
+    size = path.stat().st_size
+    start = time.perf_counter()
+    if size <= UPLOAD_MULTIPART_MB * 1024 * 1024:
+        with path.open("rb") as f:
+            file_id = client.files.create(file=(name, f), purpose=purpose).id
+        UPLOAD_SECONDS.observe(time.perf_counter() - start, method="single")
+        return file_id
+    file_id = _upload_multipart(client, path, name, size, purpose, state_path)
+    UPLOAD_SECONDS.observe(time.perf_counter() - start, method="multipart")
+    return file_id
+
+
+def _upload_multipart(
+    client: OpenAI, path: Path, name: str, size: int, purpose: str, state_path: Path
+) -> str:
+    key = f"{path.resolve()}:{size}:{path.stat().st_mtime_ns}"
+    with _state_lock:
+        state = _load_state(state_path)
+        entry = state.get(key)
+        if entry and entry["expires_at"] - UPLOAD_RESUME_MARGIN_SECONDS < time.time():
+            entry = None  # Expired (or about to); its parts are gone
+        if entry is None:
+            upload = client.uploads.create(
+                bytes=size, filename=name, mime_type=_mime_type(name), purpose=purpose
+            )
+            part_size = int(UPLOAD_PART_MB * 1024 * 1024)
+            entry = {"upload_id": upload.id, "expires_at": upload.expires_at, "part_size": part_size, "parts": {}}
+            state[key] = entry
+            _save_state(state, state_path)
+        else:
+            logger.info(f"Resuming upload of {name}: {len(entry['parts'])} part(s) already sent")
+
+    upload_id, part_size = entry["upload_id"], entry["part_size"]
+    count = -(-size // part_size)
+    missing = [i for i in range(count) if str(i) not in entry["parts"]]
+
+    def send(index: int) -> None:
+        offset = index * part_size
+        with _FileWindow(path, offset, min(part_size, size - offset)) as window:
+            part = client.uploads.parts.create(upload_id, data=(f"{name}.part{index}", window))
+        with _state_lock:
+            entry["parts"][str(index)] = part.id
+            state = _load_state(state_path)
+            state[key] = entry
+            _save_state(state, state_path)
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_PART_CONCURRENCY) as pool:
+        # The first failure is raised once the parts in flight have been sent,
+        # so a rerun has as little as possible left to resend
+        list(pool.map(send, missing))
+
+    part_ids = [entry["parts"][str(i)] for i in range(count)]
+    upload = client.uploads.complete(upload_id, part_ids=part_ids)
+    with _state_lock:
+        state = _load_state(state_path)
+        state.pop(key, None)
+        _save_state(state, state_path)
+    logger.debug(f"Uploaded {name} in {count} part(s) as {upload.file.id}")
+    return upload.file.id
@@ -0,0 +1,143 @@
+"""
+Incremental vector store updates with indexing status.
+
+Files are attached through the file-batch API (one request per
+`VECTOR_STORE_BATCH_SIZE` files instead of one per file), and each batch is
+polled with geometric backoff until every file has finished indexing or the
+deadline passes. The time each file took to index is recorded at the poll
+where it was first seen finished, so the report is accurate to within one
+poll interval. Detaching touches only the files named; nothing else in the
+store is re-indexed.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from openai import OpenAI
+
+from padregpt import metrics
+
+logger = logging.getLogger(__name__)
+
+# The API accepts up to 500 file IDs per batch
+VECTOR_STORE_BATCH_SIZE = int(os.getenv("VECTOR_STORE_BATCH_SIZE", "100"))
+VECTOR_STORE_POLL_INITIAL_SECONDS = float(os.getenv("VECTOR_STORE_POLL_INITIAL_SECONDS", "1.0"))
+VECTOR_STORE_POLL_MAX_SECONDS = float(os.getenv("VECTOR_STORE_POLL_MAX_SECONDS", "30"))
+VECTOR_STORE_INDEX_TIMEOUT_SECONDS = float(os.getenv("VECTOR_STORE_INDEX_TIMEOUT_SECONDS", "1800"))
+POLL_BACKOFF = 1.5
+
+# Per-file statuses that won't change any more
+FILE_DONE_STATUSES = {"completed", "failed", "cancelled"}
+
+INDEX_SECONDS = metrics.histogram(
+    "padregpt_vector_store_index_seconds",
+    "Time from attaching a file to it finishing indexing, by final status.",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+
+
+class IndexTimeoutError(RuntimeError):
+    """Files were still indexing when the deadline passed."""
+
+    def __init__(self, pending: list[str]) -> None:
+        super().__init__(f"{len(pending)} file(s) still indexing: {', '.join(pending)}")
+        self.pending = pending
+
+
+@dataclass
+class IndexResult:
+    file_id: str
+    status: str
+    seconds: float
+    error: Optional[str] = None
+
+
+class VectorStoreManager:
+    """Adds and removes files in one vector store without touching the rest."""
+
+    def __init__(
+        self,
+        client: OpenAI,
+        vector_store_id: str,
+        batch_size: int = VECTOR_STORE_BATCH_SIZE,
+        timeout: float = VECTOR_STORE_INDEX_TIMEOUT_SECONDS,
+    ) -> None:
+        self.client = client
+        self.vector_store_id = vector_store_id
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    def attach(self, file_ids: list[str]) -> list[IndexResult]:
+        """Attach `file_ids` in batches and wait until each has been indexed."""
+        results = []
+        for i in range(0, len(file_ids), self.batch_size):
+            chunk = file_ids[i:i + self.batch_size]
+            batch = self.client.beta.vector_stores.file_batches.create(
+                self.vector_store_id, file_ids=chunk
+            )
+            logger.info(f"Indexing {len(chunk)} file(s) in batch {batch.id}")
+            results.extend(self._wait(batch.id, chunk))
+        return results
+
+    def detach(self, file_ids: list[str]) -> None:
+        for file_id in file_ids:
+            self.client.beta.vector_stores.files.delete(file_id, vector_store_id=self.vector_store_id)
+
+    def _batch_files(self, batch_id: str) -> list[Any]:
+        return list(
+            self.client.beta.vector_stores.file_batches.list_files(
+                batch_id, vector_store_id=self.vector_store_id, limit=100
+            )
+        )
+
+    def _wait(self, batch_id: str, file_ids: list[str]) -> list[IndexResult]:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        delay = VECTOR_STORE_POLL_INITIAL_SECONDS
+        done: dict[str, IndexResult] = {}
+        finished = 0
+        while True:
+            batch = self.client.beta.vector_stores.file_batches.retrieve(
+                batch_id, vector_store_id=self.vector_store_id
+            )
+            counts = batch.file_counts
+            # Only list the batch's files when something finished since the last look
+            if counts.completed + counts.failed + counts.cancelled > finished:
+                finished = counts.completed + counts.failed + counts.cancelled
+                elapsed = time.monotonic() - start
+                for f in self._batch_files(batch_id):
+                    if f.id not in done and f.status in FILE_DONE_STATUSES:
+                        error = f.last_error.message if f.last_error else None
+                        done[f.id] = IndexResult(f.id, f.status, elapsed, error)
+                        INDEX_SECONDS.observe(elapsed, status=f.status)
+            if batch.status != "in_progress" or len(done) >= len(file_ids):
+                break
+            if time.monotonic() + delay > deadline:
+                pending = [file_id for file_id in file_ids if file_id not in done]
+                raise IndexTimeoutError(pending)
+            time.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, VECTOR_STORE_POLL_MAX_SECONDS)
+        elapsed = time.monotonic() - start
+        # A batch can end (e.g. cancelled) with files we never saw finish
+        return [done.get(f, IndexResult(f, batch.status, elapsed)) for f in file_ids]
+
+
+def point_assistant(client: OpenAI, assistant_id: str, vector_store_id: str) -> None:
+    """Make `assistant_id` search `vector_store_id` (no files are re-indexed)."""
+    client.beta.assistants.update(
+        assistant_id,
+        tools=[{"type": "file_search"}],
+        tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
+    )
+
+
+def assistant_vector_store(client: OpenAI, assistant_id: str) -> Optional[str]:
+    """The vector store `assistant_id` already searches, if any."""
+    assistant = client.beta.assistants.retrieve(assistant_id)
+    file_search = assistant.tool_resources and assistant.tool_resources.file_search
+    if file_search and file_search.vector_store_ids:
+        return file_search.vector_store_ids[0]
+    return None
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Answer a file of questions in bulk (FAQ pages, study guides, handouts).
+
+Reads JSONL with one question per line ({"id": ..., "question": ...}; the
+id defaults to the line number) and appends one JSON answer per line to
+the output file, with citations resolved to library file IDs. Answers are
+written as they finish, so an interrupted run resumes where it stopped;
+failures go to <output>.errors.jsonl and are retried on the next run.
+
+    python scripts/batch_answer.py questions.jsonl answers.jsonl --concurrency 8
+    python scripts/batch_answer.py questions.jsonl answers.jsonl --backend chat --mode batch
+
+--mode live (default) answers through the configured backend with bounded
+concurrency. --mode batch (chat backend only) submits one OpenAI Batch API
+job at half the price, checkpointing the batch ID so a rerun picks the job
+back up instead of submitting it again.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from openai import AsyncOpenAI, OpenAI
+
+# Make the shared `padregpt` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from padregpt.backends import PADRE_BACKEND, ChatBackend, Conversation, create_backend  # noqa: E402
+from padregpt.citations import extract_citations  # noqa: E402
+from padregpt.thread_pool import ThreadPool  # noqa: E402
+from padregpt.transport import openai_async_http_client, openai_http_client  # noqa: E402
+
+# Batch API job states that won't change any more
+BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+BATCH_POLL_MAX_SECONDS = 300
+
+
+# ---------------------------------------------------------------------------
+# Input / output
+# ---------------------------------------------------------------------------
+
+
+def read_questions(path: Path, id_field: str, question_field: str) -> list[dict[str, str]]:
+    questions = []
+    with path.open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            question = (row.get(question_field) or "").strip()
+            if not question:
+                print(f"Skipping line {lineno}: no {question_field!r}", file=sys.stderr)
+                continue
+            questions.append({"id": str(row.get(id_field) or f"line-{lineno}"), "question": question})
+    return questions
+
+
+def answered_ids(path: Path) -> set[str]:
+    if not path.exists():
+        return set()
+    with path.open(encoding="utf-8") as f:
+        return {json.loads(line)["id"] for line in f if line.strip()}
+
+
+def append_jsonl(path: Path, record: dict[str, Any]) -> None:
+    # One write + flush per record: a crash loses at most the answer in flight
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+
+
+def file_ids_by_name(client: OpenAI) -> dict[str, str]:
+    """Uploaded library files, so citation markers can name a file ID."""
+    try:
+        return {f.filename: f.id for f in client.files.list(purpose="assistants")}
+    except Exception as e:
+        print(f"Couldn't list uploaded files ({e}); citations won't have file IDs", file=sys.stderr)
+        return {}
+
+
+def answer_record(
+    item: dict[str, str], text: str, usage: Any, seconds: float, files: dict[str, str]
+) -> dict[str, Any]:
+    clean_text, citations = extract_citations(text)
+    for citation in citations:
+        citation["file_id"] = files.get(citation["source"])
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "answer": clean_text,
+        "raw_answer": text,
+        "citations": citations,
+        "usage": usage.model_dump() if hasattr(usage, "model_dump") else usage,
+        "seconds": round(seconds, 3),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Live mode: the configured backend, bounded concurrency
+# ---------------------------------------------------------------------------
+
+
+async def run_live(args: argparse.Namespace, pending: list[dict[str, str]], files: dict[str, str]) -> int:
+    async_client = AsyncOpenAI(http_client=openai_async_http_client("openai_batch"))
+    thread_pool = None
+    if args.backend == "assistants":
+        # Pre-warm as many threads as run at once
+        thread_pool = ThreadPool(OpenAI(http_client=openai_http_client("openai_pool")), size=args.concurrency)
+        thread_pool.refill()
+    backend = create_backend(
+        args.assistant_id, async_client=async_client, thread_pool=thread_pool, name=args.backend
+    )
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failures = 0
+    done = 0
+
+    async def answer(item: dict[str, str]) -> None:
+        nonlocal failures, done
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                # Every question is a fresh conversation
+                reply = await backend.aask(Conversation(), item["question"])
+            except Exception as e:
+                failures += 1
+                append_jsonl(args.errors, {**item, "error": f"{type(e).__name__}: {e}"})
+                return
+            append_jsonl(
+                args.output,
+                answer_record(item, reply.text, reply.usage, time.monotonic() - start, files),
+            )
+            done += 1
+            if done % 10 == 0:
+                print(f"  {done}/{len(pending)} answered", file=sys.stderr)
+
+    await asyncio.gather(*(answer(item) for item in pending))
+    await async_client.close()
+    return failures
+
+
+# ---------------------------------------------------------------------------
+# Batch mode: one Batch API job of chat completions
+# ---------------------------------------------------------------------------
+
+
+def _batch_requests(pending: list[dict[str, str]]) -> list[dict[str, Any]]:
+    backend = ChatBackend()
+    requests = []
+    for item in pending:
+        body = backend._request(Conversation(), item["question"])
+        body.pop("stream", None)
+        body.pop("stream_options", None)
+        requests.append(
+            {"custom_id": item["id"], "method": "POST", "url": "/v1/chat/completions", "body": body}
+        )
+    return requests
+
+
+def run_batch(args: argparse.Namespace, pending: list[dict[str, str]], files: dict[str, str]) -> int:
+    client = OpenAI(http_client=openai_http_client("openai_batch"))
+    checkpoint = args.output.with_name(args.output.name + ".batch.json")
+    if checkpoint.exists():
+        batch_id = json.loads(checkpoint.read_text(encoding="utf-8"))["batch_id"]
+        print(f"Resuming batch {batch_id}", file=sys.stderr)
+    else:
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+            for request in _batch_requests(pending):
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        with open(f.name, "rb") as upload:
+            input_file = client.files.create(file=upload, purpose="batch")
+        Path(f.name).unlink()
+        batch = client.batches.create(
+            input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+        )
+        batch_id = batch.id
+        checkpoint.write_text(json.dumps({"batch_id": batch_id}), encoding="utf-8")
+        print(f"Submitted batch {batch_id} ({len(pending)} questions)", file=sys.stderr)
+
+    delay = 10.0
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts:
+            print(f"  {batch.status}: {counts.completed}/{counts.total} done", file=sys.stderr)
+        if batch.status in BATCH_DONE:
+            break
+        time.sleep(delay)
+        delay = min(delay * 1.5, BATCH_POLL_MAX_SECONDS)
+
+    by_id = {item["id"]: item for item in pending}
+    failures = 0
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            result = json.loads(line)
+            item = by_id.get(result["custom_id"])
+            if item is None:  # Answered by an earlier run
+                continue
+            response = result.get("response") or {}
+            if response.get("status_code") != 200:
+                failures += 1
+                append_jsonl(args.errors, {**item, "error": result.get("error") or response})
+                continue
+            body = response["body"]
+            text = body["choices"][0]["message"]["content"] or ""
+            append_jsonl(args.output, answer_record(item, text, body.get("usage"), 0.0, files))
+    if batch.error_file_id:
+        for line in client.files.content(batch.error_file_id).text.splitlines():
+            result = json.loads(line)
+            if result["custom_id"] in by_id:
+                failures += 1
+                append_jsonl(args.errors, {**by_id[result["custom_id"]], "error": result.get("error")})
+    if batch.status != "completed":
+        print(f"Batch ended {batch.status}", file=sys.stderr)
+    # The job is finished either way; the next run submits whatever is left
+    checkpoint.unlink()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", type=Path, help="JSONL of questions.")
+    parser.add_argument("output", type=Path, help="JSONL of answers (appended; resumable).")
+    parser.add_argument("--backend", choices=["assistants", "chat"], default=PADRE_BACKEND)
+    parser.add_argument("--mode", choices=["live", "batch"], default="live")
+    parser.add_argument("--concurrency", type=int, default=8, help="Questions answered at once (live).")
+    parser.add_argument("--assistant-id", default=None, help="Defaults to OPENAI_ASSISTANT_ID.")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--question-field", default="question")
+    args = parser.parse_args()
+
+    args.assistant_id = args.assistant_id or os.getenv("OPENAI_ASSISTANT_ID", "").strip() or None
+    args.errors = args.output.with_name(args.output.stem + ".errors.jsonl")
+    if args.mode == "batch" and args.backend != "chat":
+        raise SystemExit("--mode batch needs --backend chat (the Batch API has no Assistants runs)")
+    if args.backend == "assistants" and not args.assistant_id:
+        raise SystemExit("Missing OPENAI_ASSISTANT_ID (or pass --assistant-id)")
+
+    questions = read_questions(args.input, args.id_field, args.question_field)
+    done = answered_ids(args.output)
+    pending = [q for q in questions if q["id"] not in done]
+    print(f"{len(questions)} questions, {len(done)} already answered, {len(pending)} to go", file=sys.stderr)
+    if not pending:
+        return
+    # Errors from earlier runs are retried, so start that file over
+    args.errors.unlink(missing_ok=True)
+
+    files = file_ids_by_name(OpenAI(http_client=openai_http_client("openai_batch")))
+    if args.mode == "batch":
+        failures = run_batch(args, pending, files)
+    else:
+        failures = asyncio.run(run_live(args, pending, files))
+    if failures:
+        raise SystemExit(f"{failures} question(s) failed; see {args.errors} (rerun to retry)")
+
+
+if __name__ == "__main__":
+    main()
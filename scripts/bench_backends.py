@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the answer backends against a local fake OpenAI server.
+
+Counts API round trips and wall time per turn for the Assistants backend
+(thread + message + run + polls + fetch) versus the chat backend (local
+retrieval + one streaming completion). No network access or API key needed.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from openai import OpenAI
+
+# Make the shared `padregpt` package and sibling scripts importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_openai import FakeOpenAI  # noqa: E402
+from padregpt.backends import AssistantsBackend, ChatBackend, Conversation  # noqa: E402
+from padregpt.retrieval import Retriever  # noqa: E402
+from padregpt.thread_pool import ThreadPool  # noqa: E402
+
+QUESTIONS = [
+    "What are the seven sacraments?",
+    "Explain the Holy Trinity",
+    "What is the Real Presence?",
+    "How do I pray the Rosary?",
+]
+
+SAMPLE_CORPUS = """The seven sacraments are Baptism, Confirmation, the Eucharist,
+Penance, Anointing of the Sick, Holy Orders, and Matrimony.
+
+The Holy Trinity is one God in three Persons: Father, Son, and Holy Spirit.
+
+In the Eucharist the body and blood of Christ are truly, really, and
+substantially contained under the appearances of bread and wine.
+
+The Rosary is prayed by meditating on the mysteries while praying decades
+of Hail Marys, each begun with the Our Father and closed with the Glory Be.
+"""
+
+
+def _bench(backend, fake: FakeOpenAI, turns: int) -> tuple[list[int], list[float]]:
+    conversation = Conversation()
+    trips: list[int] = []
+    seconds: list[float] = []
+    for i in range(turns):
+        before = fake.total_requests()
+        start = time.perf_counter()
+        backend.ask(conversation, QUESTIONS[i % len(QUESTIONS)])
+        seconds.append(time.perf_counter() - start)
+        trips.append(fake.total_requests() - before)
+    return trips, seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=5, help="Turns per conversation.")
+    parser.add_argument("--run-latency", type=float, default=1.0, help="Fake run duration (s).")
+    parser.add_argument("--chat-latency", type=float, default=0.3, help="Fake completion latency (s).")
+    args = parser.parse_args()
+
+    with FakeOpenAI(run_latency=args.run_latency, chat_latency=args.chat_latency) as fake, \
+            tempfile.TemporaryDirectory() as corpus_dir:
+        (Path(corpus_dir) / "sample.txt").write_text(SAMPLE_CORPUS, encoding="utf-8")
+        client = OpenAI(base_url=fake.base_url, api_key="fake")
+
+        backends = [
+            # Pool size 0 so thread creation is counted on the request path
+            AssistantsBackend("asst_fake", client=client, thread_pool=ThreadPool(client, size=0)),
+            ChatBackend(client=client, retriever=Retriever.build(Path(corpus_dir))),
+        ]
+
+        print(f"{'backend':<12} {'trips/turn':>10} {'first turn':>10} {'p50 s':>8} {'max s':>8}")
+        for backend in backends:
+            trips, seconds = _bench(backend, fake, args.turns)
+            print(
+                f"{backend.name:<12} {statistics.mean(trips):>10.1f} {trips[0]:>10d} "
+                f"{statistics.median(seconds):>8.3f} {max(seconds):>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
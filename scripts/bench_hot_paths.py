@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the local hot paths, tracked across commits.
+
+Times citation extraction, rate-limit pruning, Telegram reply rendering,
+file-name sanitising and bundle hashing on realistic fixtures. Each run is
+appended to a history file tagged with the current git commit; with
+--baseline the run is compared against the committed baseline
+(eval/bench_baseline.json) and the script exits non-zero when any
+benchmark regresses past --threshold. Timings depend on the machine, so
+re-save the baseline on the machine that runs the check.
+
+    python scripts/bench_hot_paths.py --save-baseline   # on main
+    python scripts/bench_hot_paths.py --baseline        # on a branch
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+
+# Make the shared `padregpt` package and sibling scripts importable
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from padregpt.citations import extract_citations  # noqa: E402
+from padregpt.telegram_format import split_message  # noqa: E402
+
+RESULTS_DIR = REPO_ROOT / "state" / "bench"
+HISTORY_FILE = RESULTS_DIR / "history.jsonl"
+BASELINE_FILE = REPO_ROOT / "eval" / "bench_baseline.json"
+
+SOURCES = [
+    "Catechism of the Catholic Church.pdf",
+    "Summa Theologica - Prima Pars.pdf",
+    "Lumen Gentium.pdf",
+    "Baltimore Catechism No. 3.pdf",
+    "Introduction to the Devout Life.pdf",
+]
+
+SENTENCE = (
+    "The Church teaches that grace is a participation in the life of God, "
+    "freely given so that we may respond to His call to become His children. "
+)
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+
+def long_cited_answer(rng: random.Random, paragraphs: int = 24) -> str:
+    """A long Markdown answer with a citation marker after most sentences."""
+    parts = []
+    for p in range(paragraphs):
+        sentences = []
+        for s in range(6):
+            marker = f"【{p}:{s}†{rng.choice(SOURCES)}】" if rng.random() < 0.7 else ""
+            sentences.append(SENTENCE.strip() + marker)
+        parts.append(f"**{p + 1}.** " + " ".join(sentences))
+    return "\n\n".join(parts)
+
+
+def near_limit_times(limit: int) -> list[datetime]:
+    """A user one request short of the hourly limit, plus a day of stale history."""
+    now = datetime.now()
+    stale = [now - timedelta(hours=2, minutes=i) for i in range(limit * 4)]
+    recent = [now - timedelta(minutes=59 * i / limit) for i in range(limit - 1)]
+    return stale + recent
+
+
+def dirty_names(rng: random.Random, count: int = 2000) -> list[str]:
+    """Telegram document names as they arrive: long, padded, full of separators."""
+    junk = '/\\:*?"<>|\n '
+    names = []
+    for _ in range(count):
+        base = rng.choice(SOURCES).replace(".pdf", "")
+        noise = "".join(rng.choice(junk) for _ in range(8))
+        names.append(f"  {base}{noise}{base * rng.randint(1, 6)}.pdf\n")
+    return names
+
+
+def pdf_tree(root: Path, rng: random.Random, files: int, size: int) -> list[Path]:
+    """A nested corpus of incompressible files about the size of real PDFs."""
+    paths = []
+    for i in range(files):
+        folder = root / f"2025-{i % 12 + 1:02d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"doc_{i:04d}.pdf"
+        path.write_bytes(rng.randbytes(size))
+        paths.append(path)
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def build_benchmarks(workdir: Path, files: int, file_size: int) -> dict[str, Callable[[], object]]:
+    """Name -> zero-argument callable. Fixtures are built once, up front."""
+    rng = random.Random(1234)
+    benchmarks: dict[str, Callable[[], object]] = {}
+
+    answer = long_cited_answer(rng)
+    benchmarks["extract_citations"] = lambda: extract_citations(answer)
+
+    try:
+        import telegram_chatgpt_bot as bot
+    except ImportError as e:
+        print(f"skipping bot benchmarks: {e}", file=sys.stderr)
+    else:
+        state = bot.UserState()
+        times = near_limit_times(bot.RATE_LIMIT_PER_HOUR)
+
+        def prune() -> None:
+            # Pruning replaces the list, so every call starts from the full history
+            state.request_times = list(times)
+            bot._prune_old_requests(state)
+
+        benchmarks["prune_old_requests"] = prune
+
+    reply = "\n\n".join([answer] * 3)
+    benchmarks["split_message"] = lambda: split_message(reply)
+
+    try:
+        from telegram_pdf_downloader import _safe_name
+    except ImportError as e:
+        print(f"skipping _safe_name: {e}", file=sys.stderr)
+    else:
+        names = dirty_names(rng)
+        benchmarks["safe_name"] = lambda: [_safe_name(n) for n in names]
+
+    from padregpt.corpus import sha256_file
+
+    paths = pdf_tree(workdir, rng, files, file_size)
+    benchmarks["sha256_tree"] = lambda: [sha256_file(p) for p in paths]
+
+    return benchmarks
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> float:
+    """Best-of-`repeat` seconds per call, with loops sized to run at least `min_time`."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    """Names of benchmarks slower than `threshold` times their baseline."""
+    regressions = []
+    print(f"\n{'benchmark':<20} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:<20} {'-':>12} {_fmt(seconds):>12} {'new':>7}")
+            continue
+        ratio = seconds / before
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:<20} {_fmt(before):>12} {_fmt(seconds):>12} {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="*", help="Run only these benchmarks.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats (best is kept).")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per repeat.")
+    parser.add_argument("--files", type=int, default=40, help="Files in the hashing fixture.")
+    parser.add_argument("--file-size", type=int, default=2 * 1024 * 1024, help="Bytes per fixture file.")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE_FILE, type=Path,
+                        help="Compare against a saved baseline (default: eval/bench_baseline.json).")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "1.25")),
+                        help="Allowed slowdown ratio before a benchmark counts as regressed.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline.")
+    parser.add_argument("--no-history", action="store_true", help="Don't append to the history file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        benchmarks = build_benchmarks(Path(workdir), args.files, args.file_size)
+        if args.only:
+            benchmarks = {k: v for k, v in benchmarks.items() if k in args.only}
+
+        results: dict[str, float] = {}
+        for name, fn in benchmarks.items():
+            results[name] = measure(fn, args.repeat, args.min_time)
+            print(f"{name:<20} {_fmt(results[name]):>12}")
+
+    record = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    if not args.no_history:
+        with HISTORY_FILE.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    if args.save_baseline:
+        BASELINE_FILE.write_text(json.dumps(record, indent=2) + "\n", encoding="utf-8")
+        print(f"\nSaved baseline for {record['commit']} to {BASELINE_FILE}")
+
+    if args.baseline:
+        if not args.baseline.exists():
+            raise SystemExit(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(f"Baseline: {baseline['commit']} ({baseline['timestamp']})")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            raise SystemExit(f"\n{len(regressions)} benchmark(s) regressed past {args.threshold}x: "
+                             + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,49 @@
 import argparse
 import csv
-import hashlib
-import json
+import shutil
+import sys
 from pathlib import Path
 
-
-def _sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+# Make the shared `padregpt` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from padregpt.corpus import (  # noqa: E402
+    CORPUS_MANIFEST,
+    CorpusError,
+    CorpusFile,
+    Manifest,
+    load_manifest,
+    sha256_file,
+)
+from padregpt.pdf_compaction import (  # noqa: E402
+    PDF_COMPACT_JPEG_QUALITY,
+    PDF_COMPACT_MAX_DPI,
+    PDF_COMPACT_WORKERS,
+    compact_all,
+)
+
+
+def compact_bundle(bundle: Manifest, args: argparse.Namespace) -> None:
+    """Compact the bundled PDFs in place and re-pin the ones that shrank."""
+    entries = {bundle.root / f.path: f for f in bundle.files}
+    total_before = total_after = 0
+    for result in compact_all(entries, args.workers, args.max_dpi, args.jpeg_quality):
+        total_before += result.before
+        total_after += result.after
+        name = result.path.name
+        if result.error:
+            print(f"  ⚠️  {name}: kept as is ({result.error})")
+            continue
+        print(
+            f"  {name}: {result.before / 1e6:.1f}MB -> {result.after / 1e6:.1f}MB "
+            f"({result.saved / max(result.before, 1):.0%} saved, {result.images} image(s) downsampled)"
+        )
+        if result.saved:
+            entry = entries[result.path]
+            entry.sha256 = sha256_file(result.path)
+            entry.size = result.after
+    saved = total_before - total_after
+    print(f"Compacted: {total_before / 1e6:.1f}MB -> {total_after / 1e6:.1f}MB ({saved / 1e6:.1f}MB saved)")
 
 
 def main() -> None:
@@ -27,6 +60,15 @@ def main() -> None:
         default="upload_bundle",
         help="Output directory for upload bundle.",
     )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Shrink the bundled PDFs (downsample images, strip metadata); "
+        "needs requirements-compact.txt.",
+    )
+    parser.add_argument("--max-dpi", type=float, default=PDF_COMPACT_MAX_DPI, help="Downsample images above this.")
+    parser.add_argument("--jpeg-quality", type=int, default=PDF_COMPACT_JPEG_QUALITY)
+    parser.add_argument("--workers", type=int, default=PDF_COMPACT_WORKERS, help="Compaction processes.")
     args = parser.parse_args()
 
     in_dir = Path(args.in_dir).expanduser().resolve()
@@ -37,31 +79,63 @@ def main() -> None:
     pdfs = sorted([p for p in in_dir.rglob("*.pdf") if p.is_file()])
     seen_hashes: dict[str, Path] = {}
     manifest = []
+    # Category, priority and split policy carry over from the main corpus manifest
+    declared = {}
+    if CORPUS_MANIFEST.exists():
+        declared = {Path(f.path).name: f for f in load_manifest().files}
+    bundle = Manifest(out_dir / "corpus.json", out_pdfs, root_setting="pdfs")
 
     for src in pdfs:
-        digest = _sha256(src)
+        digest = sha256_file(src)
         if digest in seen_hashes:
             continue
 
         # Keep stable, hash-prefixed filenames to avoid collisions
         safe_name = src.name.replace("/", "_").replace("\\", "_")
         dst = out_pdfs / f"{digest[:12]}__{safe_name}"
-        dst.write_bytes(src.read_bytes())
+        shutil.copyfile(src, dst)  # Streams (or uses sendfile); never the whole file in memory
 
         seen_hashes[digest] = src
+        source = declared.get(src.name, CorpusFile(src.name))
+        bundle.files.append(
+            CorpusFile(
+                path=dst.name,
+                category=source.category,
+                priority=source.priority,
+                sha256=digest,
+                size=dst.stat().st_size,
+                split_max_mb=source.split_max_mb,
+                note=source.note,
+            )
+        )
         manifest.append(
             {
                 "sha256": digest,
+                "original_sha256": digest,
                 "original_path": str(src),
                 "bundle_path": str(dst),
                 "filename": src.name,
             }
         )
 
-    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    if args.compact:
+        try:
+            compact_bundle(bundle, args)
+        except CorpusError as e:
+            raise SystemExit(str(e))
+
+    # A corpus manifest of its own, so `corpus.py --manifest upload_bundle/corpus.json sync` works
+    bundle.save()
+
+    # sha256 is the bundled file's (it differs from the original once compacted)
+    pinned = {f.path: f.sha256 for f in bundle.files}
+    for row in manifest:
+        row["sha256"] = pinned[Path(row["bundle_path"]).name]
 
     with (out_dir / "manifest.csv").open("w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["sha256", "filename", "original_path", "bundle_path"])
+        w = csv.DictWriter(
+            f, fieldnames=["sha256", "original_sha256", "filename", "original_path", "bundle_path"]
+        )
         w.writeheader()
         for row in manifest:
             w.writerow(row)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Keep the assistant's library in step with corpus.json.
+
+    python scripts/corpus.py scan            # pin hashes/sizes, list unlisted files
+    python scripts/corpus.py plan            # what a sync would change
+    python scripts/corpus.py sync            # upload/attach what is missing
+    python scripts/corpus.py sync --prune    # ...and remove what the manifest dropped
+
+Files are compared by content hash with what is already uploaded, so adding
+one book uploads one file. Removal only happens with --prune: files no
+longer listed are detached, and deleted if a sync uploaded them (files it
+merely adopted by name and size are never deleted). The vector store is
+--vector-store, VECTOR_STORE_ID, the one the last sync used, or the
+assistant's own; with none of those a new store is created and attached to
+the assistant.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+# Make the shared `padregpt` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from padregpt.corpus import (  # noqa: E402
+    CORPUS_MANIFEST,
+    CorpusError,
+    SyncPlan,
+    apply_sync,
+    load_manifest,
+    load_sync_state,
+    plan_sync,
+    scan,
+    units,
+)
+from padregpt.transport import openai_http_client  # noqa: E402
+from padregpt.vector_store import (  # noqa: E402
+    IndexResult,
+    IndexTimeoutError,
+    assistant_vector_store,
+    point_assistant,
+)
+
+VECTOR_STORE_NAME = "Padre GPT library"
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f}MB"
+
+
+def cmd_scan(args: argparse.Namespace) -> None:
+    manifest = load_manifest(args.manifest)
+    changed, missing, unlisted = scan(manifest)
+    print(f"📁 {manifest.root}")
+    for entry in changed:
+        print(f"✏️  {entry.path} ({_mb(entry.size)}) {entry.sha256[:12]}")
+    for entry in missing:
+        print(f"⚠️  Not found: {entry.path}")
+    for path in unlisted:
+        print(f"➕ Not in manifest: {path.relative_to(manifest.root).as_posix()}")
+    if changed and args.write:
+        manifest.save()
+        print(f"\n💾 Pinned {len(changed)} file(s) in {manifest.path}")
+    elif changed:
+        print(f"\n{len(changed)} file(s) differ from the manifest; rerun with --write to pin them")
+
+
+def _vector_store_id(client: OpenAI, args: argparse.Namespace, state: dict) -> Optional[str]:
+    if args.vector_store or state.get("vector_store_id"):
+        return args.vector_store or state["vector_store_id"]
+    if args.assistant_id:
+        return assistant_vector_store(client, args.assistant_id)
+    return None
+
+
+def _print_plan(plan: SyncPlan) -> None:
+    for unit in plan.upload:
+        print(f"📤 upload  {unit.name} ({_mb(unit.size)}, {unit.source.category})")
+    for file_id in plan.attach:
+        print(f"📎 attach  {file_id}")
+    for file_id in plan.detach:
+        print(f"✂️  detach  {file_id}")
+    for file_id in plan.delete:
+        print(f"🗑️  delete  {file_id}")
+    if plan.extra:
+        print(f"ℹ️  {len(plan.extra)} file(s) in the store aren't in the manifest; --prune removes them")
+    print(
+        f"\n{len(plan.upload)} to upload, {len(plan.attach)} to attach, {len(plan.detach)} to detach, "
+        f"{len(plan.delete)} to delete, {plan.unchanged} unchanged"
+    )
+
+
+def _print_indexed(indexed: list[IndexResult], names: dict[str, str]) -> None:
+    print()
+    for result in sorted(indexed, key=lambda r: r.seconds):
+        mark = "✅" if result.status == "completed" else "❌"
+        name = names.get(result.file_id, result.file_id)
+        detail = f" ({result.error})" if result.error else ""
+        print(f"{mark} indexed {name} in {result.seconds:.1f}s [{result.status}]{detail}")
+
+
+def cmd_sync(args: argparse.Namespace) -> None:
+    client = OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"), http_client=openai_http_client("openai_upload"), timeout=600
+    )
+    manifest = load_manifest(args.manifest)
+    try:
+        wanted = units(manifest)
+    except CorpusError as e:
+        raise SystemExit(f"❌ {e}")
+    print(f"📚 {len(wanted)} file(s) in {manifest.path.name} ({_mb(sum(u.size for u in wanted))})")
+
+    state = load_sync_state()
+    vector_store_id = _vector_store_id(client, args, state)
+    if vector_store_id is None:
+        if args.dry_run:
+            print("No vector store yet; a sync would create one and upload everything")
+            return
+        vector_store_id = client.beta.vector_stores.create(name=VECTOR_STORE_NAME).id
+        print(f"🆕 Created vector store {vector_store_id}")
+    print(f"🗂️  Vector store: {vector_store_id}\n")
+
+    plan = plan_sync(client, vector_store_id, wanted, state, prune=args.prune)
+    _print_plan(plan)
+    if args.dry_run or plan.empty:
+        return
+    try:
+        indexed = apply_sync(client, vector_store_id, plan, state)
+    except IndexTimeoutError as e:
+        raise SystemExit(f"❌ {e}; rerun sync later to pick them up")
+    names = {rec["file_id"]: rec["name"] for rec in state["files"].values()}
+    _print_indexed(indexed, names)
+
+    if args.assistant_id:
+        point_assistant(client, args.assistant_id, vector_store_id)
+        print(f"\n🤖 Assistant {args.assistant_id} searches {vector_store_id}")
+    failed = [r for r in indexed if r.status != "completed"]
+    if failed:
+        raise SystemExit(f"\n❌ {len(failed)} file(s) failed to index")
+    print("\n✅ Library in sync")
+
+
+def main() -> None:
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--manifest", type=Path, default=CORPUS_MANIFEST, help="Corpus manifest (JSON).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help="Hash the files on disk against the manifest.")
+    scan_parser.add_argument("--write", action="store_true", help="Pin new hashes and sizes.")
+    scan_parser.set_defaults(func=cmd_scan)
+
+    for name, dry_run in (("plan", True), ("sync", False)):
+        sub = commands.add_parser(name, help="Show the difference." if dry_run else "Apply the difference.")
+        sub.add_argument("--vector-store", default=os.getenv("VECTOR_STORE_ID") or None)
+        sub.add_argument(
+            "--prune",
+            action="store_true",
+            help="Detach files the manifest no longer lists, and delete the ones a sync uploaded.",
+        )
+        sub.add_argument(
+            "--assistant-id",
+            default=os.getenv("ASSISTANT_ID") or os.getenv("OPENAI_ASSISTANT_ID") or None,
+            help="Assistant to point at the vector store (default: from .env).",
+        )
+        sub.set_defaults(func=cmd_sync, dry_run=dry_run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,217 +6,58 @@ Uploads PDFs and creates an assistant with file search capability.
 
 import os
 import sys
-import time
 from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
+# Make the shared `padregpt` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from padregpt.assistant_config import (  # noqa: E402
+    ASSISTANT_INSTRUCTIONS,
+    ASSISTANT_MODEL,
+    ASSISTANT_NAME,
+)
+from padregpt.corpus import (  # noqa: E402
+    CORPUS_MANIFEST,
+    CorpusError,
+    CorpusFile,
+    Manifest,
+    load_manifest,
+    units,
+)
+from padregpt.transport import openai_http_client  # noqa: E402
+from padregpt.uploads import upload_file  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 
 # Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Configuration
-PDF_DIR = Path(__file__).parent.parent / "downloads" / "telegram_pdfs" / "2025-12"
-ASSISTANT_NAME = "Padre GPT"
-ASSISTANT_INSTRUCTIONS = """You are Padre GPT, a faithful Catholic theologian and teacher. Your mission is to help people understand the Catholic faith by drawing from the authentic sources of Catholic teaching.
-
-## CRITICAL: SOURCE PRIORITY (Always follow this order)
-
-When answering questions, you MUST search your uploaded documents and cite sources in this priority:
-
-### 1. 📖 HOLY SCRIPTURE (Highest Authority)
-- Always start with relevant Scripture passages from the Douay-Rheims Bible
-- Quote the exact text with book, chapter, and verse
-- Example: "As Our Lord teaches: 'I am the way, and the truth, and the life. No man cometh to the Father, but by me.' (John 14:6)"
-
-### 2. 📜 THE CATECHISM (Official Church Teaching)
-- Quote from the Catechism of the Catholic Church with paragraph numbers
-- Example: "The Catechism teaches: '...' (CCC 1234)"
-
-### 3. ⛪ CHURCH FATHERS & DOCTORS (Authoritative Witnesses)
-- Quote St. Thomas Aquinas, St. Augustine, St. Justin Martyr, etc.
-- Include the work name and relevant section
-- Example: "St. Thomas Aquinas explains in the Summa Theologica (I, Q.2, A.3): '...'"
-
-### 4. 📚 PAPAL DOCUMENTS & COUNCILS (Magisterial Teaching)
-- Quote encyclicals, council documents, papal writings
-- Include document name and section if possible
-
-## RESPONSE FORMAT
-
-For every theological question:
-
-1. **Search your documents first** - Always use file_search to find relevant passages
-2. **Begin with Scripture** if applicable
-3. **Quote directly** - Use exact quotes with citations, not paraphrases
-4. **Provide full references** - Include document name, section/paragraph, and link when available
-5. **Explain clearly** - After quoting, explain what the source teaches
-6. **Connect sources** - Show how Scripture, Catechism, and Fathers agree
-
-## CITATION FORMAT (REQUIRED)
-
-When quoting sources, ALWAYS include:
-1. **The exact quote** in quotation marks or block quote
-2. **The source document name** (e.g., "Catechism of the Catholic Church", "Summa Theologica")
-3. **The specific reference** (paragraph number, question/article, chapter/verse)
-4. **A link to the source** when available online
-
-### Standard Links to Include:
-
-| Source | Link Format |
-|--------|-------------|
-| Catechism (CCC) | https://www.vatican.va/archive/ENG0015/__P[XX].HTM (where XX is section) |
-| Scripture | https://www.drbo.org/chapter/[book]/[chapter].htm |
-| Papal Encyclicals | https://www.vatican.va/content/[pope]/en/encyclicals.html |
-| Summa Theologica | https://www.newadvent.org/summa/[part][question].htm |
-| Church Fathers | https://www.newadvent.org/fathers/ |
-| Denzinger | Reference by Denzinger number (e.g., "Dz. 1501") |
-
-## EXAMPLE RESPONSE FORMAT
-
-**Question**: "What does the Church teach about the Real Presence?"
-
-**Good Response**:
-
-The Church's teaching on the Real Presence is firmly grounded in Scripture and Tradition.
-
-📖 **Sacred Scripture** teaches us through Our Lord's own words:
-
-> "This is my body, which is given for you." 
-> — *Luke 22:19* ([Douay-Rheims](https://www.drbo.org/chapter/49022.htm))
-
-> "Except you eat the flesh of the Son of man, and drink his blood, you shall not have life in you."
-> — *John 6:54* ([Douay-Rheims](https://www.drbo.org/chapter/50006.htm))
-
-📜 **The Catechism of the Catholic Church** affirms:
-
-> "In the most blessed sacrament of the Eucharist 'the body and blood, together with the soul and divinity, of our Lord Jesus Christ and, therefore, the whole Christ is truly, really, and substantially contained.'"
-> — *CCC §1374* ([Vatican](https://www.vatican.va/archive/ENG0015/__P43.HTM))
-
-⛪ **St. Thomas Aquinas** explains the mode of this presence:
-
-> "The whole substance of the bread is converted into the whole substance of Christ's body..."
-> — *Summa Theologica*, III, Q.75, A.2 ([New Advent](https://www.newadvent.org/summa/4075.htm))
-
-📚 **The Council of Trent** dogmatically defined:
-
-> "If anyone denies that in the sacrament of the most Holy Eucharist there are truly, really, and substantially contained the body and blood... let him be anathema."
-> — *Denzinger 1651* (Council of Trent, Session XIII, Canon 1)
-
-## CONDUCT GUIDELINES
-
-**You should:**
-- Be charitable, patient, and encouraging
-- Distinguish between dogma (must believe), doctrine (Church teaching), and theological opinion
-- Encourage deeper study and prayer
-- Recommend the user speak with a priest for pastoral guidance when appropriate
-- Use traditional Catholic terminology (e.g., "Holy Mass" not just "Mass")
-
-**You must NOT:**
-- Give personal opinions that contradict Church teaching
-- Present theological speculation as defined doctrine
-- Be dismissive of sincere questions, even difficult ones
-- Recommend sources outside your uploaded documents without noting they're external
-
-## WHEN YOU DON'T KNOW
-
-If a question is outside your uploaded sources:
-- Say "I don't find specific teaching on this in my sources"
-- Suggest the user consult a priest or the Vatican website
-- Never invent citations or make up quotes
-
-Remember: You represent authentic Catholic teaching. Every answer should help the faithful grow closer to Christ through His Church.
-"""
-
-# Priority files - Essential Catholic texts
-PRIORITY_FILES = [
-    # Core Theology
-    "Theology for Beginners - Frank Sheed.pdf",
-    "A Catechism of Christian Doctrine - Ireland 1951.pdf",
-    "Catechism_of_the_Catholic_Church.pdf",  # Modern CCC
-    "Reason_Informed_by_Faith_Foundations_of_Catholic_Morality_Richard.pdf",  # Moral theology
-    "Denzinger_Sources_of_Catholic_Dogma.pdf",  # THE definitive collection of Church teachings
-    "Mere_Christianity_CS_Lewis.pdf",  # C.S. Lewis apologetics classic
-    
-    # Thomas Aquinas & Summa
-    "Thomas Aquinas_ Contra Errores Graecorum_ English.pdf",
-    "How_to_Study_being_The_Letter_of_St_Thomas_Aquinas_to_Brother_John.pdf",
-    "Saint Thomas and the Greeks - Anton Charles Pegis.pdf",  # Thomistic philosophy
-    "Summa_Theologica_Part1_Prima_Pars.txt",
-    "Summa_Theologica_Part1-2_Prima_Secundae.txt",
-    "Summa_Theologica_Part2-2_Secunda_Secundae_Vol1.txt",
-    "Summa_Theologica_Part3_Tertia_Pars.txt",
-    
-    # Sacred Scripture
-    "Douay_Rheims_Bible_Complete.txt",
-    
-    # Church Fathers & Early Church
-    "St. Justin Martyr-The First Apology of Justin.pdf",
-    "St. Justin Martyr-2nd Apology.pdf",
-    "The_First_Seven_Ecumenical_Councils_325_787_Their_History_and_Theology.pdf",
-    
-    # St. Augustine
-    "City_of_God_Volume_I_Augustine.txt",
-    "City_of_God_Volume_II_Augustine.txt",
-    "Confessions_Augustine.txt",
-    
-    # Mystical & Spiritual Classics
-    "Imitation_of_Christ_Thomas_a_Kempis.txt",
-    "The_little_garden_of_roses_and_valley_of_lilies_Thomas_a_Kempis.pdf",  # More Kempis
-    "The_Mystical_Doctrine_of_St_John_of_the_Cross_R_H_J_Steuart;_John.pdf",  # Doctor of the Church
-    "The way of interior peace - Edouard de Lehen.pdf",  # Spiritual classic
-    "Edith-Stein - Selected-Writings.pdf",  # St. Teresa Benedicta of the Cross
-    
-    # Liturgy & Sacraments
-    "Pastoral-Liturgy - Josef-a-Jungmann.pdf",  # Foremost liturgy scholar
-    "Sin_and_Confession_on_the_Eve_of_the_Reformation_Thomas_N_Tentler.pdf",  # Confession
-    "Saint-LEONARD-of-Puerto-Mauricio-Method-to-Hear-Mass.pdf",  # The Holy Mass
-    "Directory_on_popular_piety_and_liturgy_principles_and_guidelines.pdf",  # Vatican document
-    
-    # Ecclesiology & Apologetics
-    "The_primacy_of_the_apostolic_see,_vindicated_Kenrick,_Francis_Patrick.pdf",  # Papal primacy
-    "Enchiridion_of_Commonplaces,_against_Luther_and_Enemies_of_the_Church.pdf",  # Apologetics
-    
-    # Marian Devotion
-    "Maximilian-Kolbe-s-Consecration-to-Mary.pdf",  # St. Maximilian Kolbe
-    
-    # Papal & Spiritual
-    "The Practice Of Humility - Pope Leo XIII.pdf",
-    "Uniformity with God's Will - St. Alphonsus de Ligouri.pdf",
-    "The papal encyclicals  1958-1981.pdf",
-]
-
+# Uploads keep the SDK's long default timeout; HTTP_READ_TIMEOUT is tuned for chat
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"), http_client=openai_http_client("openai_upload"), timeout=600
+)
 
 def get_files_to_upload(priority_only=True):
-    """Get list of files to upload (PDFs and TXTs)."""
-    if priority_only:
-        files = []
-        for name in PRIORITY_FILES:
-            path = PDF_DIR / name
-            if path.exists():
-                files.append(path)
-            else:
-                print(f"⚠️  Not found: {name}")
-        return files
-    else:
-        pdfs = list(PDF_DIR.glob("*.pdf"))
-        txts = list(PDF_DIR.glob("*.txt"))
-        return pdfs + txts
+    """Get the units to upload: the corpus manifest, or every PDF/TXT on disk."""
+    manifest = load_manifest()
+    if not priority_only:
+        on_disk = sorted([*manifest.root.glob("*.pdf"), *manifest.root.glob("*.txt")])
+        manifest = Manifest(manifest.path, manifest.root, [CorpusFile(p.name) for p in on_disk])
+    return units(manifest)
 
 
-def upload_files(file_paths):
-    """Upload files (PDF and TXT) to OpenAI."""
+def upload_files(files):
+    """Upload manifest units to OpenAI."""
     uploaded_file_ids = []
     
-    for file_path in file_paths:
-        print(f"📤 Uploading: {file_path.name}...", end=" ", flush=True)
+    for unit in files:
+        print(f"📤 Uploading: {unit.name}...", end=" ", flush=True)
         try:
-            with open(file_path, "rb") as f:
-                file = client.files.create(file=f, purpose="assistants")
-            uploaded_file_ids.append(file.id)
-            print(f"✅ ({file.id})")
+            # Split parts live outside the corpus directory, so upload from .path
+            file_id = upload_file(client, unit.path, unit.name)
+            uploaded_file_ids.append(file_id)
+            print(f"✅ ({file_id})")
         except Exception as e:
             print(f"❌ Error: {e}")
     
@@ -232,7 +73,7 @@ def create_assistant(file_ids):
     assistant = client.beta.assistants.create(
         name=ASSISTANT_NAME,
         instructions=ASSISTANT_INSTRUCTIONS,
-        model="gpt-4o",
+        model=ASSISTANT_MODEL,
         tools=[{"type": "file_search"}],
     )
     
@@ -251,8 +92,12 @@ def main():
         sys.exit(1)
     
     # Get files to upload
-    print(f"\n📁 Looking for files in: {PDF_DIR}")
-    files_to_upload = get_files_to_upload(priority_only=True)
+    print(f"\n📁 Looking for files listed in: {CORPUS_MANIFEST}")
+    try:
+        files_to_upload = get_files_to_upload(priority_only=True)
+    except CorpusError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     print(f"📚 Found {len(files_to_upload)} priority files\n")
     
     if not files_to_upload:
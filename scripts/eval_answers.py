@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Evaluate answer quality against latency and tokens, per configuration.
+
+Asks every question in the gold set (eval/gold.jsonl) and scores each
+answer by how many of the expected Catechism paragraphs, Scripture verses
+and library files it cites, alongside its latency and token usage. Compare
+configurations (a different assistant with a new file set, or the chat
+backend) side by side:
+
+    python scripts/eval_answers.py --config old=assistants:asst_OLD --config new=assistants:asst_NEW
+
+With --record the raw answers are written to a transcript; --replay scores
+a transcript without calling the API, so a committed transcript can be
+checked offline in CI. Each run is appended to state/eval/history.jsonl;
+with --baseline the script exits non-zero when recall drops or latency
+grows past the allowed margins. The baseline, eval/baseline.json, is
+committed; --save-baseline updates the entries for the configurations
+just run and leaves the others. eval/transcripts/reference.jsonl holds
+hand-written answers citing every gold reference in the styles the
+assistant uses, so replaying it checks the scorer itself:
+
+    python scripts/eval_answers.py --replay eval/transcripts/reference.jsonl --baseline
+    python scripts/eval_answers.py --record eval/transcripts/main.jsonl --save-baseline
+    python scripts/eval_answers.py --replay eval/transcripts/main.jsonl --baseline
+
+To re-run the whole pipeline offline with its recorded latencies instead,
+replay an HTTP cassette (see padregpt/cassette.py):
+
+    HTTP_CASSETTE=eval/cassettes/main.jsonl HTTP_CASSETTE_MODE=record python scripts/eval_answers.py
+    HTTP_CASSETTE=eval/cassettes/main.jsonl python scripts/eval_answers.py --baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from openai import OpenAI
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+
+# Make the shared `padregpt` package importable when run as a script
+sys.path.insert(0, str(REPO_ROOT))
+
+from padregpt.backends import PADRE_BACKEND, Conversation, create_backend  # noqa: E402
+from padregpt.evaluation import GoldQuestion, load_gold, score, summarize  # noqa: E402
+from padregpt.thread_pool import ThreadPool  # noqa: E402
+from padregpt.transport import openai_http_client  # noqa: E402
+
+GOLD_FILE = REPO_ROOT / "eval" / "gold.jsonl"
+RESULTS_DIR = REPO_ROOT / "state" / "eval"
+HISTORY_FILE = RESULTS_DIR / "history.jsonl"
+BASELINE_FILE = REPO_ROOT / "eval" / "baseline.json"
+
+
+def parse_config(spec: str) -> dict[str, Optional[str]]:
+    """Parse `[label=]backend[:assistant_id]`; the label defaults to the backend name."""
+    label, _, target = spec.rpartition("=")
+    backend, _, assistant_id = target.partition(":")
+    if backend not in ("assistants", "chat"):
+        raise argparse.ArgumentTypeError(f"Unknown backend in {spec!r} (expected assistants or chat)")
+    assistant_id = assistant_id or os.getenv("OPENAI_ASSISTANT_ID", "").strip() or None
+    if backend == "assistants" and not assistant_id:
+        raise argparse.ArgumentTypeError(f"{spec!r} needs an assistant ID (or set OPENAI_ASSISTANT_ID)")
+    return {"label": label or backend, "backend": backend, "assistant_id": assistant_id}
+
+
+# ---------------------------------------------------------------------------
+# Collecting answers
+# ---------------------------------------------------------------------------
+
+
+def ask_all(config: dict[str, Optional[str]], gold: list[GoldQuestion]) -> list[dict[str, Any]]:
+    """Ask each gold question once, in a fresh conversation, one at a time."""
+    client = OpenAI(http_client=openai_http_client("openai_eval"))
+    thread_pool = None
+    if config["backend"] == "assistants":
+        # Pre-warmed like production, so latency doesn't include thread creation
+        thread_pool = ThreadPool(client)
+        thread_pool.refill()
+    backend = create_backend(
+        config["assistant_id"], client=client, thread_pool=thread_pool, name=config["backend"]
+    )
+    records = []
+    for item in gold:
+        record: dict[str, Any] = {"config": config["label"], "id": item.id, "question": item.question}
+        start = time.perf_counter()
+        try:
+            reply = backend.ask(Conversation(), item.question)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        else:
+            record["answer"] = reply.text
+            record["usage"] = reply.usage.model_dump() if hasattr(reply.usage, "model_dump") else reply.usage
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        print(f"  [{config['label']}] {item.id}: {record['seconds']:.1f}s", file=sys.stderr)
+        records.append(record)
+    return records
+
+
+def read_transcript(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_transcript(path: Path, records: list[dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_table(summaries: dict[str, dict[str, Any]]) -> None:
+    print(f"\n{'config':<16} {'n':>3} {'err':>4} {'refs':>6} {'files':>6} "
+          f"{'p50 s':>7} {'p95 s':>7} {'in tok':>8} {'out tok':>8}")
+    for label, s in summaries.items():
+        print(
+            f"{label:<16} {s['questions']:>3} {s['errors']:>4} "
+            f"{_fmt(s['reference_recall'], '.0%'):>6} {_fmt(s['source_recall'], '.0%'):>6} "
+            f"{_fmt(s['p50_seconds'], '.2f'):>7} {_fmt(s['p95_seconds'], '.2f'):>7} "
+            f"{_fmt(s['prompt_tokens'], '.0f'):>8} {_fmt(s['completion_tokens'], '.0f'):>8}"
+        )
+
+
+def compare(
+    summaries: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    max_recall_drop: float,
+    threshold: float,
+) -> list[str]:
+    """Human-readable regressions against `baseline`, per configuration."""
+    regressions = []
+    for label, s in summaries.items():
+        before = baseline.get(label)
+        if not before:
+            continue
+        for key in ("reference_recall", "source_recall"):
+            if s[key] is not None and before[key] is not None and before[key] - s[key] > max_recall_drop:
+                regressions.append(f"{label} {key} {before[key]:.0%} -> {s[key]:.0%}")
+        for key in ("p50_seconds", "total_tokens"):
+            if s[key] and before[key] and s[key] / before[key] > threshold:
+                regressions.append(f"{label} {key} {before[key]:.2f} -> {s[key]:.2f}")
+        if s["errors"] > before["errors"]:
+            regressions.append(f"{label} errors {before['errors']} -> {s['errors']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--gold", type=Path, default=GOLD_FILE, help="Gold questions (JSONL).")
+    parser.add_argument("--config", action="append", type=parse_config, default=[],
+                        help="[label=]assistants:ASSISTANT_ID or [label=]chat; repeatable. "
+                             "Defaults to PADRE_BACKEND with OPENAI_ASSISTANT_ID.")
+    parser.add_argument("--only", nargs="*", help="Only these gold question IDs.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--record", type=Path, help="Write the raw answers to this transcript.")
+    source.add_argument("--replay", type=Path, help="Score a recorded transcript instead of asking.")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE_FILE, type=Path,
+                        help="Compare against a saved baseline (default: eval/baseline.json).")
+    parser.add_argument("--max-recall-drop", type=float, default=0.05,
+                        help="Allowed drop in recall (absolute) before it counts as a regression.")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "1.25")),
+                        help="Allowed latency/token growth ratio before it counts as a regression.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline.")
+    parser.add_argument("--no-history", action="store_true", help="Don't append to the history file.")
+    args = parser.parse_args()
+
+    gold = load_gold(args.gold)
+    if args.only:
+        gold = [g for g in gold if g.id in args.only]
+    by_id = {g.id: g for g in gold}
+
+    if args.replay:
+        records = [r for r in read_transcript(args.replay) if r["id"] in by_id]
+        if args.config:
+            labels = {c["label"] for c in args.config}
+            records = [r for r in records if r["config"] in labels]
+    else:
+        try:
+            configs = args.config or [parse_config(PADRE_BACKEND)]
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        records = [r for config in configs for r in ask_all(config, gold)]
+        if args.record:
+            write_transcript(args.record, records)
+            print(f"Recorded {len(records)} answers to {args.record}", file=sys.stderr)
+    if not records:
+        raise SystemExit("Nothing to score")
+
+    grouped: dict[str, list[dict[str, Any]]] = {}
+    for record in records:
+        if "error" not in record:
+            record.update(score(by_id[record["id"]], record["answer"]))
+        grouped.setdefault(record["config"], []).append(record)
+    summaries = {label: summarize(rs) for label, rs in grouped.items()}
+    print_table(summaries)
+
+    missed = [(r["config"], r["id"], r["missed"]) for r in records if r.get("missed")]
+    if missed:
+        print("\nMissed references:")
+        for label, question_id, refs in missed:
+            print(f"  [{label}] {question_id}: {', '.join(refs)}")
+
+    record = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "gold": str(args.gold),
+        "replay": str(args.replay) if args.replay else None,
+        "results": summaries,
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    if not args.no_history:
+        with HISTORY_FILE.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    if args.save_baseline:
+        saved = json.loads(BASELINE_FILE.read_text(encoding="utf-8")) if BASELINE_FILE.exists() else {}
+        # Per configuration, so saving one run keeps the others' baselines
+        baseline = {**record, "results": {**saved.get("results", {}), **summaries}}
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+        print(f"\nSaved baseline for {record['commit']} to {BASELINE_FILE}")
+
+    if args.baseline:
+        if not args.baseline.exists():
+            raise SystemExit(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(f"\nBaseline: {baseline['commit']} ({baseline['timestamp']})")
+        regressions = compare(summaries, baseline["results"], args.max_recall_drop, args.threshold)
+        if regressions:
+            raise SystemExit(f"\n{len(regressions)} regression(s):\n  " + "\n  ".join(regressions))
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,747 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI HTTP API.
+
+A development tool; nothing in `padregpt` imports it. Implements enough
+of threads/messages/runs (polling and streaming), run steps, Chat
+Completions, files (including multipart uploads), vector stores, and
+assistants for the real `openai` SDK to talk to it. Latency is drawn from
+configurable distributions and a fraction of requests can be made to
+fail, so the load tester and benchmarks exercise realistic behavior
+without network access or cost. Every request served is counted by route.
+
+    from fake_openai import FakeOpenAI  # with scripts/ on sys.path
+
+    with FakeOpenAI(run_latency="lognormal:2:0.4") as fake:
+        client = OpenAI(base_url=fake.base_url, api_key="test")
+
+Or standalone: `python scripts/fake_openai.py --port 8787`.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+FAKE_ANSWER = (
+    "The Church teaches this clearly 【4:0†Catechism_of_the_Catholic_Church.pdf】, "
+    "as Scripture also affirms 【4:1†Douay_Rheims_Bible_Complete.txt】."
+)
+
+
+def _now() -> int:
+    return int(time.time())
+
+
+class Latency:
+    """
+    Latency distribution parsed from a spec string:
+
+        "1.5"                  fixed seconds
+        "uniform:0.5:2"        uniform between bounds
+        "lognormal:1.5:0.4"    lognormal with the given median and sigma
+        "exp:1.0"              exponential with the given mean
+    """
+
+    def __init__(self, spec: Union[str, float]) -> None:
+        self.spec = str(spec)
+        kind, *params = self.spec.split(":")
+        self._sample: Callable[[], float]
+        if not params:
+            value = float(kind)
+            self._sample = lambda: value
+        elif kind == "uniform":
+            low, high = map(float, params)
+            self._sample = lambda: random.uniform(low, high)
+        elif kind == "lognormal":
+            median, sigma = map(float, params)
+            self._sample = lambda: random.lognormvariate(math.log(median), sigma)
+        elif kind == "exp":
+            mean = float(params[0])
+            self._sample = lambda: random.expovariate(1 / mean)
+        else:
+            raise ValueError(f"Unknown latency spec: {spec!r}")
+
+    def sample(self) -> float:
+        return max(self._sample(), 0.0)
+
+
+class FakeOpenAI:
+    """Threaded HTTP server emulating the parts of the API PadreGPT uses."""
+
+    def __init__(
+        self,
+        run_latency: Union[str, float] = 1.0,
+        chat_latency: Union[str, float] = 0.3,
+        request_latency: Union[str, float] = 0.0,
+        index_latency: Union[str, float] = 0.5,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        answer: str = FAKE_ANSWER,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.run_latency = Latency(run_latency)
+        self.chat_latency = Latency(chat_latency)
+        self.request_latency = Latency(request_latency)
+        self.index_latency = Latency(index_latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.answer = answer
+        self.requests: Counter = Counter()  # route name -> count
+        self.errors: Counter = Counter()  # route name -> injected failures
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.threads: dict[str, list[dict[str, Any]]] = {}
+        self.runs: dict[str, dict[str, Any]] = {}
+        self.files: dict[str, dict[str, Any]] = {}
+        self.vector_stores: dict[str, dict[str, Any]] = {}
+        self.vector_store_files: dict[str, dict[str, dict[str, Any]]] = {}
+        self.file_batches: dict[str, dict[str, Any]] = {}
+        self.uploads: dict[str, dict[str, Any]] = {}
+        self.assistants: dict[str, dict[str, Any]] = {}
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOpenAI":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(self.requests.values())
+
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids):06d}"
+
+    # -- Threads, messages, runs --------------------------------------------
+
+    def _message(self, thread_id: str, role: str, text: str, run_id: Optional[str] = None) -> dict:
+        return {
+            "id": self._new_id("msg"),
+            "object": "thread.message",
+            "created_at": _now(),
+            "thread_id": thread_id,
+            "role": role,
+            "run_id": run_id,
+            "assistant_id": None,
+            "attachments": [],
+            "metadata": {},
+            "status": "completed",
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        }
+
+    def create_thread(self, body: dict) -> dict:
+        with self._lock:
+            thread_id = self._new_id("thread")
+            self.threads[thread_id] = [
+                self._message(thread_id, m.get("role", "user"), str(m.get("content", "")))
+                for m in body.get("messages") or []
+            ]
+        return {"id": thread_id, "object": "thread", "created_at": _now(), "metadata": {}}
+
+    def create_message(self, thread_id: str, body: dict) -> dict:
+        with self._lock:
+            msg = self._message(thread_id, body.get("role", "user"), str(body.get("content", "")))
+            self.threads.setdefault(thread_id, []).append(msg)
+        return msg
+
+    def list_messages(self, thread_id: str, query: dict[str, list[str]]) -> dict:
+        with self._lock:
+            data = list(self.threads.get(thread_id, []))
+        run_id = query.get("run_id", [None])[0]
+        if run_id:
+            data = [m for m in data if m["run_id"] == run_id]
+        if query.get("order", ["desc"])[0] == "desc":
+            data.reverse()
+        return _page(data, query)
+
+    def create_run(self, thread_id: str, body: dict) -> dict:
+        with self._lock:
+            run = {
+                "id": self._new_id("run"),
+                "object": "thread.run",
+                "created_at": _now(),
+                "thread_id": thread_id,
+                "assistant_id": body.get("assistant_id"),
+                "status": "queued",
+                "required_action": None,
+                "last_error": None,
+                "incomplete_details": None,
+                "usage": None,
+                "started_at": None,
+                "completed_at": None,
+                "_done_at": time.monotonic() + self.run_latency.sample(),
+            }
+            self.runs[run["id"]] = run
+        return _public(run)
+
+    def _complete_run(self, run: dict) -> dict:
+        """Mark a run completed and write its answer (caller holds the lock)."""
+        run["status"] = "completed"
+        run["started_at"] = run["created_at"]
+        run["completed_at"] = _now()
+        run["usage"] = {"prompt_tokens": 1200, "completion_tokens": 300, "total_tokens": 1500}
+        msg = self._message(run["thread_id"], "assistant", self.answer, run["id"])
+        self.threads.setdefault(run["thread_id"], []).append(msg)
+        return msg
+
+    def retrieve_run(self, run_id: str) -> dict:
+        with self._lock:
+            run = self.runs[run_id]
+            if run["status"] in ("queued", "in_progress"):
+                if time.monotonic() >= run["_done_at"]:
+                    self._complete_run(run)
+                else:
+                    run["status"] = "in_progress"
+        return _public(run)
+
+    def stream_run(self, thread_id: str, body: dict) -> list[tuple[str, Any, float]]:
+        """SSE events for `runs.create(stream=True)` as (event, data, delay-before)."""
+        run = self.create_run(thread_id, body)
+        with self._lock:
+            stored = self.runs[run["id"]]
+            wait = max(stored["_done_at"] - time.monotonic(), 0.0)
+            msg = self._complete_run(stored)
+            done = _public(stored)
+        words = re.findall(r"\S+\s*", self.answer)
+        per_word = wait / (len(words) + 1)
+        events: list[tuple[str, Any, float]] = [
+            ("thread.run.created", {**run, "status": "queued"}, 0.0),
+            ("thread.run.in_progress", {**run, "status": "in_progress"}, 0.0),
+            ("thread.message.created", {**msg, "status": "in_progress", "content": []}, per_word),
+        ]
+        for word in words:
+            delta = {
+                "id": msg["id"],
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": word, "annotations": []}}]},
+            }
+            events.append(("thread.message.delta", delta, per_word))
+        events.append(("thread.message.completed", msg, 0.0))
+        events.append(("thread.run.completed", done, 0.0))
+        return events
+
+    def list_run_steps(self, run_id: str, query: dict[str, list[str]]) -> dict:
+        with self._lock:
+            run = self.runs[run_id]
+            if run["status"] == "completed" and "_steps" not in run:
+                common = {
+                    "object": "thread.run.step",
+                    "run_id": run_id,
+                    "thread_id": run["thread_id"],
+                    "assistant_id": run["assistant_id"],
+                    "status": "completed",
+                    "created_at": run["created_at"],
+                    "completed_at": run["completed_at"],
+                    "failed_at": None,
+                    "cancelled_at": None,
+                    "expired_at": None,
+                    "last_error": None,
+                    "usage": None,
+                }
+                run["_steps"] = [
+                    {**common, "id": self._new_id("step"), "type": "tool_calls", "step_details": {
+                        "type": "tool_calls",
+                        "tool_calls": [{"id": self._new_id("call"), "type": "file_search", "file_search": {}}],
+                    }},
+                    {**common, "id": self._new_id("step"), "type": "message_creation", "step_details": {
+                        "type": "message_creation",
+                        "message_creation": {"message_id": self._new_id("msg")},
+                    }},
+                ]
+            steps = list(run.get("_steps", []))
+        return _page(steps, query)
+
+    def cancel_run(self, run_id: str) -> dict:
+        with self._lock:
+            run = self.runs[run_id]
+            if run["status"] in ("queued", "in_progress"):
+                run["status"] = "cancelled"
+        return _public(run)
+
+    # -- Chat Completions ----------------------------------------------------
+
+    def chat_chunks(self, body: dict) -> list[dict]:
+        base = {
+            "id": self._new_id("chatcmpl"),
+            "object": "chat.completion.chunk",
+            "created": _now(),
+            "model": body.get("model", "gpt-4o"),
+        }
+        words = re.findall(r"\S+\s*", self.answer)
+        chunks = [
+            {**base, "choices": [{"index": 0, "delta": {"content": w}, "finish_reason": None}], "usage": None}
+            for w in words
+        ]
+        chunks.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": None})
+        chunks.append({**base, "choices": [], "usage": {
+            "prompt_tokens": 1500, "completion_tokens": len(words), "total_tokens": 1500 + len(words),
+        }})
+        return chunks
+
+    def chat_completion(self, body: dict) -> dict:
+        chunks = self.chat_chunks(body)
+        text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"])
+        return {
+            "id": chunks[0]["id"],
+            "object": "chat.completion",
+            "created": chunks[0]["created"],
+            "model": chunks[0]["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": chunks[-1]["usage"],
+        }
+
+    # -- Files, vector stores, assistants ------------------------------------
+
+    def create_file(self, filename: str, size: int, purpose: str) -> dict:
+        with self._lock:
+            f = {
+                "id": self._new_id("file"),
+                "object": "file",
+                "bytes": size,
+                "created_at": _now(),
+                "filename": filename,
+                "purpose": purpose,
+                "status": "processed",
+            }
+            self.files[f["id"]] = f
+        return f
+
+    def create_upload(self, body: dict) -> dict:
+        with self._lock:
+            upload = {
+                "id": self._new_id("upload"),
+                "object": "upload",
+                "bytes": body["bytes"],
+                "created_at": _now(),
+                "expires_at": _now() + 3600,
+                "filename": body["filename"],
+                "purpose": body["purpose"],
+                "status": "pending",
+                "file": None,
+                "_parts": {},
+            }
+            self.uploads[upload["id"]] = upload
+        return _public(upload)
+
+    def add_upload_part(self, upload_id: str, size: int) -> dict:
+        with self._lock:
+            part = {"id": self._new_id("part"), "object": "upload.part", "created_at": _now(), "upload_id": upload_id}
+            self.uploads[upload_id]["_parts"][part["id"]] = size
+        return part
+
+    def complete_upload(self, upload_id: str, body: dict) -> tuple[int, dict]:
+        upload = self.uploads[upload_id]
+        size = sum(upload["_parts"][part_id] for part_id in body["part_ids"])
+        if size != upload["bytes"]:
+            return 400, {"error": {"message": f"Parts add up to {size} bytes, expected {upload['bytes']}"}}
+        upload["file"] = self.create_file(upload["filename"], size, upload["purpose"])
+        upload["status"] = "completed"
+        return 200, _public(upload)
+
+    def delete_file(self, file_id: str) -> dict:
+        with self._lock:
+            self.files.pop(file_id, None)
+        return {"id": file_id, "object": "file", "deleted": True}
+
+    def create_vector_store(self, body: dict) -> dict:
+        with self._lock:
+            vs = {
+                "id": self._new_id("vs"),
+                "object": "vector_store",
+                "created_at": _now(),
+                "name": body.get("name", ""),
+                "status": "completed",
+                "usage_bytes": 0,
+                "file_counts": {},
+                "last_active_at": None,
+                "metadata": {},
+            }
+            self.vector_stores[vs["id"]] = vs
+            self.vector_store_files[vs["id"]] = {}
+        for file_id in body.get("file_ids") or []:
+            self.attach_file(vs["id"], file_id)
+        return self.retrieve_vector_store(vs["id"])
+
+    def _refresh_vs_file(self, vs_file: dict) -> dict:
+        if vs_file["status"] == "in_progress" and time.monotonic() >= vs_file["_done_at"]:
+            vs_file["status"] = "completed"
+        return vs_file
+
+    def retrieve_vector_store(self, vs_id: str) -> dict:
+        with self._lock:
+            files = [self._refresh_vs_file(f) for f in self.vector_store_files[vs_id].values()]
+            counts = Counter(f["status"] for f in files)
+            vs = self.vector_stores[vs_id]
+            vs["file_counts"] = {
+                "in_progress": counts["in_progress"],
+                "completed": counts["completed"],
+                "failed": counts["failed"],
+                "cancelled": counts["cancelled"],
+                "total": len(files),
+            }
+            return dict(vs)
+
+    def attach_file(self, vs_id: str, file_id: str, batch_id: Optional[str] = None) -> dict:
+        with self._lock:
+            vs_file = {
+                "id": file_id,
+                "object": "vector_store.file",
+                "created_at": _now(),
+                "vector_store_id": vs_id,
+                "status": "in_progress",
+                "usage_bytes": self.files.get(file_id, {}).get("bytes", 0),
+                "last_error": None,
+                "_batch_id": batch_id,
+                "_done_at": time.monotonic() + self.index_latency.sample(),
+            }
+            self.vector_store_files[vs_id][file_id] = vs_file
+        return _public(vs_file)
+
+    def list_vector_store_files(self, vs_id: str, query: dict[str, list[str]]) -> dict:
+        batch_id = query.get("_batch_id", [None])[0]
+        with self._lock:
+            files = [self._refresh_vs_file(f) for f in self.vector_store_files[vs_id].values()]
+        if batch_id:
+            files = [f for f in files if f["_batch_id"] == batch_id]
+        status = query.get("filter", [None])[0]
+        if status:
+            files = [f for f in files if f["status"] == status]
+        return _page([_public(f) for f in files], query)
+
+    def detach_file(self, vs_id: str, file_id: str) -> dict:
+        with self._lock:
+            self.vector_store_files[vs_id].pop(file_id, None)
+        return {"id": file_id, "object": "vector_store.file.deleted", "deleted": True}
+
+    def create_file_batch(self, vs_id: str, body: dict) -> dict:
+        with self._lock:
+            batch_id = self._new_id("vsfb")
+            self.file_batches[batch_id] = {"vector_store_id": vs_id, "file_ids": list(body.get("file_ids") or [])}
+        for file_id in body.get("file_ids") or []:
+            self.attach_file(vs_id, file_id, batch_id)
+        return self.retrieve_file_batch(batch_id)
+
+    def retrieve_file_batch(self, batch_id: str) -> dict:
+        with self._lock:
+            batch = self.file_batches[batch_id]
+            vs_files = self.vector_store_files[batch["vector_store_id"]]
+            files = [self._refresh_vs_file(vs_files[f]) for f in batch["file_ids"] if f in vs_files]
+        counts = Counter(f["status"] for f in files)
+        return {
+            "id": batch_id,
+            "object": "vector_store.files_batch",
+            "created_at": _now(),
+            "vector_store_id": batch["vector_store_id"],
+            "status": "in_progress" if counts["in_progress"] else "completed",
+            "file_counts": {
+                "in_progress": counts["in_progress"],
+                "completed": counts["completed"],
+                "failed": counts["failed"],
+                "cancelled": counts["cancelled"],
+                "total": len(files),
+            },
+        }
+
+    def upsert_assistant(self, assistant_id: Optional[str], body: dict) -> dict:
+        with self._lock:
+            assistant = self.assistants.get(assistant_id or "") or {
+                "id": assistant_id or self._new_id("asst"),
+                "object": "assistant",
+                "created_at": _now(),
+                "model": "gpt-4o",
+                "tools": [],
+                "tool_resources": {},
+                "metadata": {},
+            }
+            assistant.update({k: v for k, v in body.items() if v is not None})
+            self.assistants[assistant["id"]] = assistant
+            return dict(assistant)
+
+
+def _public(obj: dict) -> dict:
+    return {k: v for k, v in obj.items() if not k.startswith("_")}
+
+
+def _page(data: list[dict], query: Optional[dict[str, list[str]]] = None) -> dict:
+    """A cursor page honoring `after` / `before` / `limit` (the SDK paginates on `after`)."""
+    query = query or {}
+    ids = [item["id"] for item in data]
+    after = query.get("after", [None])[0]
+    before = query.get("before", [None])[0]
+    if after in ids:
+        data = data[ids.index(after) + 1:]
+    elif before in ids:
+        data = data[: ids.index(before)]
+    limit = int(query.get("limit", ["20"])[0])
+    has_more = len(data) > limit
+    data = data[:limit]
+    return {
+        "object": "list",
+        "data": data,
+        "first_id": data[0]["id"] if data else None,
+        "last_id": data[-1]["id"] if data else None,
+        "has_more": has_more,
+    }
+
+
+_T = r"(?P<thread>[^/]+)"
+_R = r"(?P<run>[^/]+)"
+_VS = r"(?P<vs>[^/]+)"
+_ROUTES = [
+    ("POST", re.compile(r"^/v1/threads$"), "threads"),
+    ("POST", re.compile(rf"^/v1/threads/{_T}/messages$"), "messages.create"),
+    ("GET", re.compile(rf"^/v1/threads/{_T}/messages$"), "messages.list"),
+    ("POST", re.compile(rf"^/v1/threads/{_T}/runs$"), "runs.create"),
+    ("GET", re.compile(rf"^/v1/threads/{_T}/runs/{_R}$"), "runs.retrieve"),
+    ("POST", re.compile(rf"^/v1/threads/{_T}/runs/{_R}/cancel$"), "runs.cancel"),
+    ("GET", re.compile(rf"^/v1/threads/{_T}/runs/{_R}/steps$"), "runs.steps"),
+    ("POST", re.compile(r"^/v1/chat/completions$"), "chat.completions"),
+    ("POST", re.compile(r"^/v1/files$"), "files.create"),
+    ("GET", re.compile(r"^/v1/files$"), "files.list"),
+    ("GET", re.compile(r"^/v1/files/(?P<file>[^/]+)$"), "files.retrieve"),
+    ("DELETE", re.compile(r"^/v1/files/(?P<file>[^/]+)$"), "files.delete"),
+    ("POST", re.compile(r"^/v1/uploads$"), "uploads.create"),
+    ("POST", re.compile(r"^/v1/uploads/(?P<upload>[^/]+)/parts$"), "uploads.parts"),
+    ("POST", re.compile(r"^/v1/uploads/(?P<upload>[^/]+)/complete$"), "uploads.complete"),
+    ("POST", re.compile(r"^/v1/vector_stores$"), "vector_stores.create"),
+    ("GET", re.compile(rf"^/v1/vector_stores/{_VS}$"), "vector_stores.retrieve"),
+    ("POST", re.compile(rf"^/v1/vector_stores/{_VS}/files$"), "vector_stores.files.create"),
+    ("GET", re.compile(rf"^/v1/vector_stores/{_VS}/files$"), "vector_stores.files.list"),
+    ("DELETE", re.compile(rf"^/v1/vector_stores/{_VS}/files/(?P<file>[^/]+)$"), "vector_stores.files.delete"),
+    ("POST", re.compile(rf"^/v1/vector_stores/{_VS}/file_batches$"), "file_batches.create"),
+    ("GET", re.compile(rf"^/v1/vector_stores/{_VS}/file_batches/(?P<batch>[^/]+)$"), "file_batches.retrieve"),
+    ("GET", re.compile(rf"^/v1/vector_stores/{_VS}/file_batches/(?P<batch>[^/]+)/files$"), "file_batches.files"),
+    ("POST", re.compile(r"^/v1/assistants$"), "assistants.create"),
+    ("POST", re.compile(r"^/v1/assistants/(?P<assistant>[^/]+)$"), "assistants.update"),
+    ("GET", re.compile(r"^/v1/assistants/(?P<assistant>[^/]+)$"), "assistants.retrieve"),
+]
+
+
+def _multipart_file(content_type: str, body: bytes) -> tuple[str, int, str]:
+    """(filename, size, purpose) from a multipart upload, without buffering twice."""
+    boundary = content_type.split("boundary=")[-1].strip('"').encode()
+    filename, size, purpose = "upload.bin", 0, "assistants"
+    for part in body.split(b"--" + boundary):
+        head, _, data = part.partition(b"\r\n\r\n")
+        name = re.search(rb'name="([^"]+)"', head)
+        if not name:
+            continue
+        if name.group(1) == b"purpose":
+            purpose = data.strip().decode()
+        elif name.group(1) in (b"file", b"data"):  # data: an Uploads API part
+            match = re.search(rb'filename="([^"]*)"', head)
+            filename = match.group(1).decode() if match else filename
+            size = len(data) - 2  # trailing CRLF before the next boundary
+    return filename, size, purpose
+
+
+def _make_handler(fake: FakeOpenAI) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:  # quiet
+            pass
+
+        def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _start_sse(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_chat_sse(self, chunks: list[dict]) -> None:
+            self._start_sse()
+            for chunk in chunks:
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _send_run_sse(self, events: list[tuple[str, Any, float]]) -> None:
+            self._start_sse()
+            for event, data, delay in events:
+                if delay:
+                    time.sleep(delay)
+                self._write_chunk(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+            self._write_chunk(b"event: done\ndata: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _dispatch(self, method: str) -> None:
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            for route_method, pattern, name in _ROUTES:
+                match = pattern.match(url.path)
+                if route_method == method and match:
+                    break
+            else:
+                return self._send_json(404, {"error": {"message": f"No fake for {method} {url.path}"}})
+
+            with fake._lock:
+                fake.requests[name] += 1
+            delay = fake.request_latency.sample()
+            if delay:
+                time.sleep(delay)
+            if fake.error_rate and random.random() < fake.error_rate:
+                with fake._lock:
+                    fake.errors[name] += 1
+                headers = {"retry-after": "1"} if fake.error_status == 429 else None
+                return self._send_json(
+                    fake.error_status,
+                    {"error": {"message": "Injected failure", "type": "fake_error"}},
+                    headers,
+                )
+
+            content_type = self.headers.get("Content-Type", "")
+            if content_type.startswith("application/json") and raw:
+                body = json.loads(raw)
+            else:
+                body = {}
+            try:
+                self._handle(name, match.groupdict(), parse_qs(url.query), body, raw, content_type)
+            except KeyError as e:
+                self._send_json(404, {"error": {"message": f"No such object: {e}"}})
+
+        def _handle(self, name: str, p: dict, query: dict, body: dict, raw: bytes, content_type: str) -> None:
+            if name == "threads":
+                return self._send_json(200, fake.create_thread(body))
+            if name == "messages.create":
+                return self._send_json(200, fake.create_message(p["thread"], body))
+            if name == "messages.list":
+                return self._send_json(200, fake.list_messages(p["thread"], query))
+            if name == "runs.create":
+                if body.get("stream"):
+                    return self._send_run_sse(fake.stream_run(p["thread"], body))
+                return self._send_json(200, fake.create_run(p["thread"], body))
+            if name == "runs.retrieve":
+                return self._send_json(200, fake.retrieve_run(p["run"]))
+            if name == "runs.steps":
+                return self._send_json(200, fake.list_run_steps(p["run"], query))
+            if name == "runs.cancel":
+                return self._send_json(200, fake.cancel_run(p["run"]))
+            if name == "chat.completions":
+                time.sleep(fake.chat_latency.sample())
+                if body.get("stream"):
+                    return self._send_chat_sse(fake.chat_chunks(body))
+                return self._send_json(200, fake.chat_completion(body))
+            if name == "files.create":
+                return self._send_json(200, fake.create_file(*_multipart_file(content_type, raw)))
+            if name == "files.list":
+                return self._send_json(200, _page(list(fake.files.values()), query))
+            if name == "files.retrieve":
+                return self._send_json(200, fake.files[p["file"]])
+            if name == "files.delete":
+                return self._send_json(200, fake.delete_file(p["file"]))
+            if name == "uploads.create":
+                return self._send_json(200, fake.create_upload(body))
+            if name == "uploads.parts":
+                return self._send_json(200, fake.add_upload_part(p["upload"], _multipart_file(content_type, raw)[1]))
+            if name == "uploads.complete":
+                return self._send_json(*fake.complete_upload(p["upload"], body))
+            if name == "vector_stores.create":
+                return self._send_json(200, fake.create_vector_store(body))
+            if name == "vector_stores.retrieve":
+                return self._send_json(200, fake.retrieve_vector_store(p["vs"]))
+            if name == "vector_stores.files.create":
+                return self._send_json(200, fake.attach_file(p["vs"], body["file_id"]))
+            if name == "vector_stores.files.list":
+                return self._send_json(200, fake.list_vector_store_files(p["vs"], query))
+            if name == "vector_stores.files.delete":
+                return self._send_json(200, fake.detach_file(p["vs"], p["file"]))
+            if name == "file_batches.create":
+                return self._send_json(200, fake.create_file_batch(p["vs"], body))
+            if name == "file_batches.retrieve":
+                return self._send_json(200, fake.retrieve_file_batch(p["batch"]))
+            if name == "file_batches.files":
+                return self._send_json(200, fake.list_vector_store_files(p["vs"], {**query, "_batch_id": [p["batch"]]}))
+            if name == "assistants.create":
+                return self._send_json(200, fake.upsert_assistant(None, body))
+            if name == "assistants.update":
+                return self._send_json(200, fake.upsert_assistant(p["assistant"], body))
+            if name == "assistants.retrieve":
+                return self._send_json(200, dict(fake.assistants[p["assistant"]]))
+
+        def do_GET(self) -> None:
+            self._dispatch("GET")
+
+        def do_POST(self) -> None:
+            self._dispatch("POST")
+
+        def do_DELETE(self) -> None:
+            self._dispatch("DELETE")
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--run-latency", default="lognormal:2.0:0.4", help="Run duration spec.")
+    parser.add_argument("--chat-latency", default="lognormal:0.6:0.3", help="Completion latency spec.")
+    parser.add_argument("--request-latency", default="0.02", help="Per-request overhead spec.")
+    parser.add_argument("--index-latency", default="0.5", help="Vector store indexing time spec.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests to fail.")
+    parser.add_argument("--error-status", type=int, default=500, help="Status for injected failures.")
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(
+        run_latency=args.run_latency,
+        chat_latency=args.chat_latency,
+        request_latency=args.request_latency,
+        index_latency=args.index_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Fake OpenAI API listening on {fake.base_url} (Ctrl+C to stop)")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
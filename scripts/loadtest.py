@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Load-test the Telegram bot handlers or the web chat flow.
+
+By default a local fake OpenAI server (scripts/fake_openai.py) is started
+in-process with the given latency/error distributions; pass --base-url to
+aim at a fake (or real) server elsewhere. Virtual users run closed-loop at
+the target concurrency, each asking questions in its own conversation.
+
+    python scripts/loadtest.py --target telegram --concurrency 50 --requests 500
+    python scripts/loadtest.py --target web --backend chat --run-latency lognormal:2:0.5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import logging
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+
+from openai import AsyncOpenAI, OpenAI
+
+# Make the shared `padregpt` package and sibling scripts importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_openai import FakeOpenAI  # noqa: E402
+from padregpt.backends import Conversation, create_backend  # noqa: E402
+from padregpt.thread_pool import ThreadPool  # noqa: E402
+from padregpt.transport import openai_async_http_client, openai_http_client  # noqa: E402
+
+QUESTIONS = [
+    "What are the seven sacraments?",
+    "Explain the Holy Trinity",
+    "Who was St. Thomas Aquinas?",
+    "What is the Immaculate Conception?",
+    "How do I pray the Rosary?",
+    "What are the works of mercy?",
+    "Explain papal infallibility",
+    "What is the Real Presence?",
+]
+
+FAKE_ASSISTANT_ID = "asst_loadtest"
+
+
+@dataclass
+class Results:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+            if not ok:
+                self.errors += 1
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+# ---------------------------------------------------------------------------
+# Telegram target: drive the real handlers with stub Update objects
+# ---------------------------------------------------------------------------
+
+
+class _StubChat:
+    async def send_action(self, action: str) -> None:
+        pass
+
+
+class _StubMessage:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.chat = _StubChat()
+        self.replies: list[str] = []
+
+    async def reply_text(self, text: str, **kwargs: object) -> None:
+        self.replies.append(text)
+
+
+def _stub_update(user_id: int, text: str) -> SimpleNamespace:
+    message = _StubMessage(text)
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id, first_name="Load"),
+        effective_chat=SimpleNamespace(id=user_id),
+        message=message,
+    )
+
+
+async def _run_telegram(args: argparse.Namespace, base_url: str, results: Results) -> None:
+    import telegram_chatgpt_bot as bot
+
+    # The bot logs every HTTP request at INFO; far too noisy under load
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    bot.OPENAI_ASSISTANT_ID = FAKE_ASSISTANT_ID
+    bot.RATE_LIMIT_PER_HOUR = 10**9
+    bot.openai_client = AsyncOpenAI(
+        base_url=base_url, api_key="fake", http_client=openai_async_http_client()
+    )
+    thread_pool = ThreadPool(OpenAI(base_url=base_url, api_key="fake"))
+    thread_pool.refill()
+    bot.backend = create_backend(
+        FAKE_ASSISTANT_ID,
+        async_client=bot.openai_client,
+        thread_pool=thread_pool,
+        name=args.backend,
+    )
+    context = SimpleNamespace(bot=None)
+    counter = itertools.count()
+
+    async def virtual_user(user_id: int) -> None:
+        asked = 0
+        while next(counter) < args.requests:
+            if asked and asked % args.turns_per_user == 0:
+                bot._clear_thread(user_id)
+            update = _stub_update(user_id, QUESTIONS[asked % len(QUESTIONS)])
+            start = time.perf_counter()
+            await bot.handle_message(update, context)
+            ok = bool(update.message.replies) and not update.message.replies[-1].startswith("❌")
+            results.record(time.perf_counter() - start, ok)
+            asked += 1
+
+    await asyncio.gather(*(virtual_user(1_000_000 + i) for i in range(args.concurrency)))
+
+
+# ---------------------------------------------------------------------------
+# Web target: the same backend call path app.py makes, one thread per session
+# ---------------------------------------------------------------------------
+
+
+def _run_web(args: argparse.Namespace, base_url: str, results: Results) -> None:
+    client = OpenAI(base_url=base_url, api_key="fake", http_client=openai_http_client())
+    thread_pool = ThreadPool(client)
+    thread_pool.refill()
+    backend = create_backend(
+        FAKE_ASSISTANT_ID, client=client, thread_pool=thread_pool, name=args.backend
+    )
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def session() -> None:
+        conversation = Conversation()
+        asked = 0
+        while True:
+            with lock:
+                if next(counter) >= args.requests:
+                    return
+            if asked and asked % args.turns_per_user == 0:
+                conversation = Conversation()
+            start = time.perf_counter()
+            try:
+                backend.ask(conversation, QUESTIONS[asked % len(QUESTIONS)])
+                ok = True
+            except Exception:
+                ok = False
+            results.record(time.perf_counter() - start, ok)
+            asked += 1
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for _ in range(args.concurrency):
+            executor.submit(session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test PadreGPT against a fake OpenAI API.")
+    parser.add_argument("--target", choices=["telegram", "web"], default="telegram")
+    parser.add_argument("--backend", choices=["assistants", "chat"], default="assistants")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent virtual users.")
+    parser.add_argument("--requests", type=int, default=200, help="Total questions to ask.")
+    parser.add_argument("--turns-per-user", type=int, default=3, help="Questions per conversation.")
+    parser.add_argument("--base-url", default=None, help="Use an already-running server.")
+    parser.add_argument("--run-latency", default="lognormal:2.0:0.4", help="Fake run duration spec.")
+    parser.add_argument("--chat-latency", default="lognormal:0.6:0.3", help="Fake completion latency spec.")
+    parser.add_argument("--request-latency", default="0.02", help="Fake per-request overhead spec.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake injected failure rate.")
+    args = parser.parse_args()
+
+    fake = None
+    if args.base_url is None:
+        fake = FakeOpenAI(
+            run_latency=args.run_latency,
+            chat_latency=args.chat_latency,
+            request_latency=args.request_latency,
+            error_rate=args.error_rate,
+        )
+    results = Results()
+
+    with fake or contextlib.nullcontext():
+        base_url = args.base_url or fake.base_url
+        print(f"Load test: target={args.target} backend={args.backend} "
+              f"concurrency={args.concurrency} requests={args.requests} api={base_url}")
+        start = time.perf_counter()
+        if args.target == "telegram":
+            asyncio.run(_run_telegram(args, base_url, results))
+        else:
+            _run_web(args, base_url, results)
+        elapsed = time.perf_counter() - start
+
+    lat = results.latencies
+    print("-" * 60)
+    print(f"Completed:   {len(lat)} ({results.errors} errors) in {elapsed:.1f}s")
+    print(f"Throughput:  {len(lat) / elapsed:.2f} answers/s")
+    if lat:
+        print(f"Latency:     p50 {_percentile(lat, 50):.3f}s  p95 {_percentile(lat, 95):.3f}s  "
+              f"p99 {_percentile(lat, 99):.3f}s  max {max(lat):.3f}s  mean {statistics.mean(lat):.3f}s")
+    if fake is not None:
+        calls = sum(fake.requests.values())
+        print(f"API calls:   {calls} ({calls / max(len(lat), 1):.1f} per answer), "
+              f"{sum(fake.errors.values())} injected failures")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,19 @@ uploaded PDFs (e.g., Catholic library documents from Telegram).
 import asyncio
 import logging
 import os
+import sys
 from collections import defaultdict
 from dataclasses import dataclass, field
+from functools import partial
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional
 
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 from telegram import Update
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -24,6 +29,17 @@ from telegram.ext import (
     filters,
 )
 
+# Make the shared `padregpt` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from padregpt import fallback, metrics, telegram_format, tracing  # noqa: E402
+from padregpt.admission import AdmissionController, Overloaded  # noqa: E402
+from padregpt.backends import PADRE_BACKEND, Conversation, create_backend  # noqa: E402
+from padregpt.outbox import Outbox  # noqa: E402
+from padregpt.runs import RunFailedError  # noqa: E402
+from padregpt.thread_pool import get_thread_pool  # noqa: E402
+from padregpt.transport import openai_async_http_client, telegram_request  # noqa: E402
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -39,6 +55,13 @@ OPENAI_ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID", "").strip()
 # Rate limiting (messages per user per hour)
 RATE_LIMIT_PER_HOUR = int(os.getenv("RATE_LIMIT_PER_HOUR", "60"))
 
+# Local Prometheus /metrics endpoint (0 disables)
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", "9464"))
+
+# Updates handled concurrently (PTB processes them one at a time by default);
+# each user's messages are still handled in order, see UserState.lock
+TELEGRAM_CONCURRENT_UPDATES = int(os.getenv("TELEGRAM_CONCURRENT_UPDATES", "256"))
+
 # ---------------------------------------------------------------------------
 # Logging
 # ---------------------------------------------------------------------------
@@ -56,10 +79,12 @@ logger = logging.getLogger(__name__)
 
 @dataclass
 class UserState:
-    """Tracks conversation thread and rate limiting per user."""
+    """Tracks conversation and rate limiting per user."""
 
-    thread_id: Optional[str] = None  # OpenAI thread ID for this user
+    conversation: Conversation = field(default_factory=Conversation)
     request_times: list[datetime] = field(default_factory=list)
+    # Updates run concurrently; a user's own messages are answered one at a time
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
 
 
 # In-memory state (will reset on restart — could extend to Redis/DB if needed)
@@ -86,7 +111,7 @@ def _record_request(user_id: int) -> None:
 
 def _clear_thread(user_id: int) -> None:
     """Clear a user's conversation thread (start fresh)."""
-    user_states[user_id].thread_id = None
+    user_states[user_id].conversation = Conversation()
 
 
 # ---------------------------------------------------------------------------
@@ -94,72 +119,92 @@ def _clear_thread(user_id: int) -> None:
 # ---------------------------------------------------------------------------
 
 openai_client: Optional[AsyncOpenAI] = None
+backend = None
+outbox: Optional[Outbox] = None
+admission: Optional[AdmissionController] = None
 
 
 def get_openai_client() -> AsyncOpenAI:
     global openai_client
     if openai_client is None:
-        openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        openai_client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY, http_client=openai_async_http_client()
+        )
     return openai_client
 
 
-async def get_or_create_thread(user_id: int) -> str:
-    """Get existing thread for user or create a new one."""
-    state = user_states[user_id]
-    if state.thread_id:
-        return state.thread_id
-
-    client = get_openai_client()
-    thread = await client.beta.threads.create()
-    state.thread_id = thread.id
-    logger.info(f"Created new thread {thread.id} for user {user_id}")
-    return thread.id
+def get_backend():
+    """Answer engine selected by PADRE_BACKEND (Assistants API by default)."""
+    global backend
+    if backend is None:
+        backend = create_backend(
+            OPENAI_ASSISTANT_ID,
+            async_client=get_openai_client(),
+            thread_pool=get_thread_pool() if PADRE_BACKEND == "assistants" else None,
+        )
+    return backend
 
 
+@tracing.traced("telegram.chat_with_assistant")
 async def chat_with_assistant(user_id: int, user_message: str) -> str:
     """Send user message to the Assistant and get response."""
-    client = get_openai_client()
+    try:
+        reply = await get_backend().aask(user_states[user_id].conversation, user_message)
+    except RunFailedError as e:
+        logger.error(f"Run failed with status: {e.run.status}")
+        if e.run.last_error:
+            logger.error(f"Error: {e.run.last_error}")
+        raise
 
-    # Get or create a thread for this user
-    thread_id = await get_or_create_thread(user_id)
+    return reply.text or "I couldn't generate a response."
 
-    # Add the user's message to the thread
-    await client.beta.threads.messages.create(
-        thread_id=thread_id,
-        role="user",
-        content=user_message,
-    )
 
-    # Run the assistant on the thread
-    run = await client.beta.threads.runs.create_and_poll(
-        thread_id=thread_id,
-        assistant_id=OPENAI_ASSISTANT_ID,
-    )
+def get_admission() -> AdmissionController:
+    """Process-wide gate in front of the answer backend."""
+    global admission
+    if admission is None:
+        admission = AdmissionController()
+    return admission
+
+
+def get_outbox() -> Outbox:
+    """Process-wide outbound queue for Telegram messages."""
+    global outbox
+    if outbox is None:
+        outbox = Outbox()
+    return outbox
+
+
+async def _send_chunk(message, chunk: str) -> None:
+    try:
+        await message.reply_text(chunk, parse_mode=ParseMode.HTML)
+    except BadRequest as e:
+        # Escaped HTML should always parse; deliver unformatted rather than not at all
+        logger.warning(f"Telegram rejected formatted chunk ({e}); resending as plain text")
+        await message.reply_text(telegram_format.to_plain(chunk))
+
+
+async def _send_reply(chat_id: int, message, text: str) -> None:
+    """Queue text as Telegram HTML messages and wait until all are delivered."""
+    # Chunks are queued as they are rendered; the chat's worker sends them in order
+    deliveries = [
+        get_outbox().submit(chat_id, partial(_send_chunk, message, chunk))
+        for chunk in telegram_format.iter_messages(text)
+    ]
+    await asyncio.gather(*deliveries)
 
-    if run.status != "completed":
-        logger.error(f"Run failed with status: {run.status}")
-        if run.last_error:
-            logger.error(f"Error: {run.last_error}")
-        raise RuntimeError(f"Assistant run failed: {run.status}")
-
-    # Get the assistant's response (most recent message)
-    messages = await client.beta.threads.messages.list(
-        thread_id=thread_id,
-        order="desc",
-        limit=1,
-    )
 
-    if not messages.data:
-        raise RuntimeError("No response from assistant")
+def _announce_queued(chat_id: int, message, position: int, eta: float) -> None:
+    """Tell a queued user where they stand (queued ahead of their answer)."""
+    wait = f" (about {eta:.0f}s)" if eta >= 1 else ""
+    text = f"⏳ Lots of questions right now — you're #{position} in line{wait}."
+    get_outbox().submit(chat_id, partial(_send_chunk, message, telegram_format.split_message(text)[0]))
 
-    # Extract text content from the response
-    response_message = messages.data[0]
-    text_parts = []
-    for block in response_message.content:
-        if block.type == "text":
-            text_parts.append(block.text.value)
 
-    return "\n".join(text_parts) if text_parts else "I couldn't generate a response."
+async def _drain_outbox(application: Application) -> None:
+    """Deliver queued messages before the bot's HTTP client is shut down."""
+    if outbox is not None:
+        await outbox.close()
 
 
 # ---------------------------------------------------------------------------
@@ -203,22 +248,37 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def new_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /new command — clears conversation history."""
     user_id = update.effective_user.id
-    _clear_thread(user_id)
+    async with user_states[user_id].lock:  # After any answer still in progress
+        _clear_thread(user_id)
     await update.message.reply_text(
         "🧹 Conversation cleared! Let's start fresh. What would you like to know?"
     )
 
 
+@tracing.traced("telegram.handle_message")
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle incoming text messages."""
+    """Handle incoming text messages, one at a time per user."""
+    # A second message sent while the first is being answered would otherwise
+    # post to a thread with an active run (rejected by the API) and race on the
+    # conversation and rate-limit state
+    async with user_states[update.effective_user.id].lock:
+        await _answer_message(update)
+
+
+async def _answer_message(update: Update) -> None:
     user_id = update.effective_user.id
     user_message = update.message.text
 
+    chat_id = update.effective_chat.id
+
     # Rate limiting check
     if _is_rate_limited(user_id):
-        await update.message.reply_text(
+        metrics.RATE_LIMITED.inc(frontend="telegram")
+        await _send_reply(
+            chat_id,
+            update.message,
             f"⏳ You've hit the rate limit ({RATE_LIMIT_PER_HOUR} messages/hour). "
-            "Please wait a bit before sending more messages."
+            "Please wait a bit before sending more messages.",
         )
         return
 
@@ -229,22 +289,31 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await update.message.chat.send_action("typing")
 
     try:
-        response = await chat_with_assistant(user_id, user_message)
-
-        # Telegram has a 4096 char limit per message
-        if len(response) > 4000:
-            # Split into chunks
-            chunks = [response[i : i + 4000] for i in range(0, len(response), 4000)]
-            for chunk in chunks:
-                await update.message.reply_text(chunk, parse_mode="Markdown")
-        else:
-            await update.message.reply_text(response, parse_mode="Markdown")
-
+        async with get_admission().admit(partial(_announce_queued, chat_id, update.message)):
+            response = await chat_with_assistant(user_id, user_message)
+    except Overloaded as e:
+        logger.warning(f"Shedding message from user {user_id}: {e}")
+        response = await fallback.answer(user_message) or (
+            "🙏 I'm getting more questions than I can answer right now. "
+            "Please try again in a few minutes."
+        )
     except Exception as e:
         logger.error(f"Error handling message from user {user_id}: {e}")
-        await update.message.reply_text(
-            "❌ Oops! Something went wrong. Please try again in a moment."
+        await _send_reply(
+            chat_id, update.message, "❌ Oops! Something went wrong. Please try again in a moment."
         )
+        return
+    else:
+        if user_states[user_id].conversation.turns == 1:
+            fallback.remember(user_message, response)
+
+    # The outbox retries flood waits and unsent requests; permanent errors, and
+    # ones after which the message may already be posted, reach here
+    with metrics.stage("telegram_send"):
+        try:
+            await _send_reply(chat_id, update.message, response)
+        except TelegramError as e:
+            logger.error(f"Could not deliver answer to user {user_id}: {e}")
 
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -271,17 +340,31 @@ def main() -> None:
             "Get an API key from https://platform.openai.com/api-keys"
         )
 
-    if not OPENAI_ASSISTANT_ID:
+    if PADRE_BACKEND == "assistants" and not OPENAI_ASSISTANT_ID:
         raise SystemExit(
             "Missing OPENAI_ASSISTANT_ID. "
             "Create an Assistant at https://platform.openai.com/assistants "
             "and add the ID to your .env file."
         )
 
-    logger.info(f"Starting PadreGPT bot with Assistant: {OPENAI_ASSISTANT_ID}")
+    logger.info(f"Starting PadreGPT bot with {PADRE_BACKEND} backend: {OPENAI_ASSISTANT_ID}")
+
+    metrics.start_http_server(BOT_METRICS_PORT)
+
+    # Warm the thread pool (Assistants backend) or load the retrieval index
+    # (chat backend) so first messages don't pay for either
+    get_backend().warm()
 
     # Build application
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    app = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(telegram_request("telegram"))
+        .get_updates_request(telegram_request("telegram_updates", pool_size=1))
+        .concurrent_updates(TELEGRAM_CONCURRENT_UPDATES)
+        .post_stop(_drain_outbox)
+        .build()
+    )
 
     # Add handlers
     app.add_handler(CommandHandler("start", start_command))
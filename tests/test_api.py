@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from padregpt import api
+from padregpt.admission import AdmissionController
+from padregpt.backends import Reply
+from padregpt.sessions import SessionStore, new_session_id
+
+
+class StubBackend:
+    name = "stub"
+
+    async def aask(self, conversation, question):
+        conversation.turns += 1
+        return Reply(f"Answer {conversation.turns}")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # No lifespan: the state it would build is set up here instead
+    monkeypatch.setattr(api, "PADRE_API_KEY", "test-key")
+    monkeypatch.setattr(api.state, "backend", StubBackend())
+    monkeypatch.setattr(api.state, "store", SessionStore(tmp_path / "sessions.sqlite3"))
+    monkeypatch.setattr(api.state, "admission", AdmissionController())
+    return TestClient(api.app, headers={"Authorization": "Bearer test-key"})
+
+
+def test_conversation_keeps_its_history(client):
+    conversation_id = client.post("/v1/conversations").json()["conversation_id"]
+    client.post("/v1/ask", json={"question": "One?", "conversation_id": conversation_id})
+    reply = client.post("/v1/ask", json={"question": "Two?", "conversation_id": conversation_id})
+    assert reply.status_code == 200
+    assert reply.json()["answer"] == "Answer 2"
+
+
+def test_ask_without_id_starts_a_conversation(client):
+    reply = client.post("/v1/ask", json={"question": "One?"}).json()
+    follow_up = client.post("/v1/ask", json={"question": "Two?", "conversation_id": reply["conversation_id"]})
+    assert follow_up.json()["answer"] == "Answer 2"
+
+
+@pytest.mark.parametrize("conversation_id", ["not-an-id", new_session_id()])
+def test_unknown_conversation_is_404(client, conversation_id):
+    reply = client.post("/v1/ask", json={"question": "Hello?", "conversation_id": conversation_id})
+    assert reply.status_code == 404
+    assert client.get(f"/v1/conversations/{conversation_id}/citations").status_code == 404
+    assert client.delete(f"/v1/conversations/{conversation_id}").status_code == 404
+    # The ID is not turned into a stored conversation
+    assert api.state.store.get(conversation_id) is None
+
+
+def test_expired_conversation_is_404(client):
+    conversation_id = client.post("/v1/conversations").json()["conversation_id"]
+    api.state.store.idle_seconds = -1
+    assert api.state.store.evict_idle() == 1
+    reply = client.post("/v1/ask", json={"question": "Hello?", "conversation_id": conversation_id})
+    assert reply.status_code == 404
+    assert reply.json() == {"error": "Unknown conversation"}
+
+
+def test_missing_api_key_is_401(client):
+    assert client.post("/v1/conversations", headers={"Authorization": ""}).status_code == 401
@@ -0,0 +1,82 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from padregpt.corpus import CorpusFile, Unit, plan_sync
+
+
+class StubClient:
+    """Just enough of the OpenAI client for plan_sync: uploaded files and one store."""
+
+    def __init__(self, remote: dict[str, tuple[str, int]], in_store: list[str]) -> None:
+        files = [SimpleNamespace(id=i, filename=name, bytes=size) for i, (name, size) in remote.items()]
+        self.files = SimpleNamespace(list=lambda purpose: files)
+        store = [SimpleNamespace(id=i) for i in in_store]
+        self.beta = SimpleNamespace(vector_stores=SimpleNamespace(files=SimpleNamespace(list=lambda vs_id: store)))
+
+
+def unit(name: str, size: int = 100) -> Unit:
+    return Unit(name, Path(name), f"sha-{name}", size, CorpusFile(name))
+
+
+def state(**files: str) -> dict:
+    """Sync state recording `files` (name -> file ID) as uploaded by a sync."""
+    return {
+        "vector_store_id": "vs",
+        "files": {f"sha-{name}": {"file_id": file_id, "name": name, "size": 100} for name, file_id in files.items()},
+    }
+
+
+def test_new_file_is_uploaded_and_known_one_unchanged():
+    client = StubClient({"f1": ("a.pdf", 100)}, ["f1"])
+    plan = plan_sync(client, "vs", [unit("a.pdf"), unit("b.pdf")], state(**{"a.pdf": "f1"}))
+    assert [u.name for u in plan.upload] == ["b.pdf"]
+    assert plan.unchanged == 1
+    assert not plan.attach
+
+
+def test_uploaded_but_unattached_file_is_attached():
+    client = StubClient({"f1": ("a.pdf", 100)}, [])
+    plan = plan_sync(client, "vs", [unit("a.pdf")], state(**{"a.pdf": "f1"}))
+    assert plan.attach == ["f1"]
+    assert not plan.upload
+
+
+def test_without_prune_extras_are_kept():
+    client = StubClient({"f1": ("a.pdf", 100), "f2": ("old.pdf", 100)}, ["f1", "f2"])
+    plan = plan_sync(client, "vs", [unit("a.pdf")], state(**{"a.pdf": "f1", "old.pdf": "f2"}))
+    assert plan.extra == ["f2"]
+    assert not plan.detach and not plan.delete
+    assert plan.empty
+
+
+def test_prune_detaches_and_deletes_own_uploads():
+    client = StubClient({"f1": ("a.pdf", 100), "f2": ("old.pdf", 100)}, ["f1", "f2"])
+    plan = plan_sync(client, "vs", [unit("a.pdf")], state(**{"a.pdf": "f1", "old.pdf": "f2"}), prune=True)
+    assert plan.detach == ["f2"]
+    assert plan.delete == ["f2"]
+
+
+def test_prune_never_deletes_adopted_files():
+    # Uploaded some other way: matched by name and size on the first sync
+    client = StubClient({"f1": ("a.pdf", 100), "f2": ("b.pdf", 100)}, ["f1", "f2"])
+    sync_state = state()
+    plan_sync(client, "vs", [unit("a.pdf"), unit("b.pdf")], sync_state)
+    assert sync_state["files"]["sha-b.pdf"]["adopted"]
+    plan = plan_sync(client, "vs", [unit("a.pdf")], sync_state, prune=True)
+    assert plan.detach == ["f2"]
+    assert plan.delete == []
+
+
+def test_prune_leaves_store_files_it_does_not_know_undeleted():
+    client = StubClient({"f1": ("a.pdf", 100), "f9": ("manual.pdf", 5)}, ["f1", "f9"])
+    plan = plan_sync(client, "vs", [unit("a.pdf")], state(**{"a.pdf": "f1"}), prune=True)
+    assert plan.detach == ["f9"]
+    assert plan.delete == []
+
+
+def test_files_deleted_outside_a_sync_are_forgotten():
+    client = StubClient({}, [])
+    sync_state = state(**{"a.pdf": "gone"})
+    plan = plan_sync(client, "vs", [unit("a.pdf")], sync_state)
+    assert [u.name for u in plan.upload] == ["a.pdf"]
+    assert sync_state["files"] == {}
@@ -0,0 +1,45 @@
+from padregpt.evaluation import GoldQuestion, references, score
+
+
+def test_scripture_verse_and_range():
+    assert references("As John 6:53-55 says") == {"John 6:53", "John 6:54", "John 6:55"}
+
+
+def test_abbreviations_and_book_numbers():
+    assert references("1 Cor 11:27 and 2 Pet 1:4") == {"1 Corinthians 11:27", "2 Peter 1:4"}
+
+
+def test_roman_numeral_book_numbers():
+    assert references("II Kings 2:11; I Samuel 3:10") == {"2 Kings 2:11", "1 Samuel 3:10"}
+
+
+def test_minor_prophets_and_ezra_nehemiah():
+    text = "Jonah 2:1, Habakkuk 2:4, Zechariah 9:9, Ezra 3:2, Neh 8:10 and Obadiah 1:15"
+    assert references(text) == {
+        "Jonah 2:1", "Habakkuk 2:4", "Zechariah 9:9", "Ezra 3:2", "Nehemiah 8:10", "Obadiah 1:15",
+    }
+
+
+def test_times_and_ratios_are_not_books():
+    assert references("I am 5:30 late; the ratio is 3:2, or am 1:1") == set()
+
+
+def test_two_letter_abbreviations_need_capitals():
+    assert references("Is 7:14 and Am 5:24") == {"Isaiah 7:14", "Amos 5:24"}
+
+
+def test_ccc_lists_and_ranges():
+    assert references("CCC 1374, 1376-1378 and 2558") == {
+        "CCC 1374", "CCC 1376", "CCC 1377", "CCC 1378", "CCC 2558",
+    }
+
+
+def test_ccc_list_stops_before_a_book_number():
+    assert references("CCC 1374, 1 Cor 11:27") == {"CCC 1374", "1 Corinthians 11:27"}
+
+
+def test_score_recall():
+    gold = GoldQuestion(id="q1", question="?", references=["CCC 1374", "John 6:53"])
+    result = score(gold, "See CCC 1374.")
+    assert result["reference_recall"] == 0.5
+    assert result["missed"] == ["John 6:53"]
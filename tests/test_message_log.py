@@ -0,0 +1,46 @@
+from padregpt.message_log import MESSAGE_HOT_MESSAGES, Message, MessageLog
+
+LONG = "Grace builds on nature. " * 100
+
+
+def test_short_messages_are_not_compressed():
+    message = Message("user", "Hello")
+    message.compress()
+    assert message.nbytes == 5
+    assert message.content == "Hello"
+
+
+def test_compressed_message_reads_back():
+    message = Message("assistant", LONG)
+    message.compress()
+    assert message.nbytes < len(LONG)
+    assert message.content == LONG
+
+
+def test_older_messages_are_compressed_recent_ones_are_not():
+    log = MessageLog(window=0)
+    for _ in range(MESSAGE_HOT_MESSAGES + 2):
+        log.append("assistant", LONG)
+    sizes = [m.nbytes for m in log]
+    assert all(size < len(LONG) for size in sizes[:2])
+    assert all(size == len(LONG) for size in sizes[2:])
+    assert all(m.content == LONG for m in log)
+
+
+def test_window_pages_out_oldest_messages():
+    log = MessageLog(window=3)
+    for i in range(5):
+        log.append("user", f"m{i}")
+    assert [m.content for m in log] == ["m2", "m3", "m4"]
+    assert [m.content for m in log.pending_pages] == ["m0", "m1"]
+    assert log.paged_out == 2
+
+
+def test_json_round_trip():
+    log = MessageLog(window=3)
+    for i in range(5):
+        log.append("user" if i % 2 else "assistant", f"m{i} {LONG}")
+    restored = MessageLog.from_json(log.to_json())
+    assert [(m.role, m.content) for m in restored] == [(m.role, m.content) for m in log]
+    assert restored.paged_out == 2
+    assert restored.pending_pages == []
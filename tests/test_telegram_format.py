@@ -0,0 +1,74 @@
+import random
+import re
+
+from padregpt.telegram_format import MESSAGE_LIMIT, _units, render_inline, split_message, to_plain
+
+
+def balanced(message: str) -> bool:
+    stack = []
+    for closing, name in re.findall(r"<(/?)(\w+)[^>]*>", message):
+        if not closing:
+            stack.append(name)
+        elif not stack or stack.pop() != name:
+            return False
+    return not stack
+
+
+def test_short_answer_is_one_message():
+    assert split_message("**Grace** is a _gift_.") == ["<b>Grace</b> is a <i>gift</i>."]
+
+
+def test_empty_answer_still_sends_something():
+    assert split_message("") == ["…"]
+
+
+def test_markdown_specials_are_escaped():
+    assert render_inline("a < b & c") == "a &lt; b &amp; c"
+
+
+def test_limit_counts_utf16_units():
+    # Each emoji is one character but two UTF-16 code units
+    text = " ".join(["🙏🙏🙏🙏"] * 600)
+    messages = split_message(text, limit=500)
+    assert len(messages) > 1
+    assert all(_units(m) <= 500 for m in messages)
+    assert to_plain(" ".join(messages)).split() == text.split()
+
+
+def test_split_pieces_reopen_open_tags():
+    text = "**" + " ".join(f"word{i}" for i in range(400)) + "**"
+    messages = split_message(text, limit=200)
+    assert len(messages) > 1
+    for message in messages:
+        assert _units(message) <= 200
+        assert message.startswith("<b>") and message.endswith("</b>")
+
+
+def test_link_with_huge_url_degrades_to_text():
+    url = "https://example.com/" + "x" * 5000
+    messages = split_message(f"See [the Catechism]({url}) for more.")
+    assert all(_units(m) <= MESSAGE_LIMIT for m in messages)
+    assert "<a " not in "".join(messages)
+    plain = [to_plain(m) for m in messages]
+    assert plain[0] == "See the Catechism"  # The URL follows, split across messages
+    assert plain[1].startswith("(https://example.com/")
+    assert url in "".join(plain)
+
+
+def test_short_link_is_kept():
+    messages = split_message("See [CCC 1374](https://example.com/ccc/1374).")
+    assert messages == ['See <a href="https://example.com/ccc/1374">CCC 1374</a>.']
+
+
+def test_random_documents_split_within_limit_and_balanced():
+    rng = random.Random(7)
+    words = ["grace", "**faith**", "_hope_", "`code`", "[link](https://example.com/a)", "🙏", "a&b", "<x>"]
+    for _ in range(100):
+        lines = []
+        for _ in range(rng.randint(1, 30)):
+            prefix = rng.choice(["", "", "- ", "> ", "# "])
+            lines.append(prefix + " ".join(rng.choice(words) for _ in range(rng.randint(0, 60))))
+        limit = rng.choice([120, 300, 1000])
+        for message in split_message("\n".join(lines), limit=limit):
+            assert _units(message) <= limit
+            assert balanced(message)